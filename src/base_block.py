@@ -0,0 +1,123 @@
+from src.merkle import hash_leaf, merkle_proof, merkle_root as compute_merkle_root
+from src.encoding import encode_body, iter_body_records
+
+
+def _read_only(self, *args, **kwargs):
+    raise TypeError("Les transactions d'un bloc sont en lecture seule")
+
+
+class FrozenList(list):
+    """
+    Liste en lecture seule : se compare et s'encode (json) comme une liste, mais refuse toute modification.
+    """
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _read_only
+    append = extend = insert = pop = remove = clear = sort = reverse = _read_only
+
+    def copy(self):
+        return list(self)
+
+    def __reduce__(self):
+        return FrozenList, (list(self),)
+
+
+class FrozenDict(dict):
+    """
+    Dictionnaire en lecture seule : se compare et s'encode (json) comme un dictionnaire, mais refuse toute
+    modification. copy() retourne un dictionnaire ordinaire, modifiable.
+    """
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    pop = popitem = setdefault = update = clear = _read_only
+
+    def copy(self):
+        return dict(self)
+
+    def __reduce__(self):
+        return FrozenDict, (dict(self),)
+
+
+def freeze(value):
+    """
+    Retourne une copie en lecture seule d'une valeur de transaction (listes et dictionnaires imbriqués compris).
+    Une valeur déjà gelée est retournée telle quelle.
+    """
+    if isinstance(value, (FrozenList, FrozenDict)):
+        return value
+    if isinstance(value, dict):
+        frozen = FrozenDict(value)
+        # Seules les valeurs imbriquées sont recopiées (le cas courant n'a que des scalaires)
+        for key, item in value.items():
+            if isinstance(item, (dict, list, tuple)):
+                dict.__setitem__(frozen, key, freeze(item))
+        return frozen
+    if isinstance(value, list):
+        frozen = FrozenList(value)
+        # Comme pour un dictionnaire, seules les valeurs imbriquées sont recopiées (liste d'identifiants d'une création)
+        for position, item in enumerate(value):
+            if isinstance(item, (dict, list, tuple)):
+                list.__setitem__(frozen, position, freeze(item))
+        return frozen
+    if isinstance(value, tuple):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+class BaseBlock:
+    """
+    Partie commune aux blocs PoS (Block) et PoW (BlockPow) : corps encodé et racine de Merkle mis en cache,
+    preuves d'inclusion, et signalement des modifications à la chaîne qui a validé le bloc.
+    Les transactions sont gelées (FrozenList de FrozenDict) dès leur affectation : le corps encodé mis en cache
+    ne peut pas diverger d'une liste modifiée sur place, seule une réaffectation peut les changer.
+    Chaque sous-classe définit _HASHED_FIELDS, l'en-tête et le calcul du hash.
+    """
+    # Champs couverts par le hash : les modifier sur un bloc validé impose de le revérifier
+    _HASHED_FIELDS = frozenset()
+
+    def __setattr__(self, name, value):
+        # Toute modification des transactions invalide le corps encodé mis en cache
+        if name == "transactions":
+            self.invalidate_cache()
+            value = freeze(value)
+        # La réaffectation d'un champ haché d'un bloc déjà validé est signalée à la chaîne qui l'a validé
+        # (validation incrémentale) ; les transactions étant gelées, c'est la seule modification possible
+        if name in self._HASHED_FIELDS:
+            watcher = self.__dict__.get("_watcher")
+            if watcher is not None:
+                watcher.invalidate_validation(self.__dict__.get("index", 0))
+        super().__setattr__(name, value)
+
+    def invalidate_cache(self):
+        """
+        Oublie le corps encodé et la racine de Merkle mis en cache, pour forcer leur recalcul (audit complet).
+        """
+        self.__dict__.pop("_body_bytes", None)
+        self.__dict__.pop("_merkle_root", None)
+
+    def body_bytes(self):
+        """
+        Retourne le corps encodé (transactions) du bloc.
+        L'encodage est mis en cache : il n'est recalculé que si les transactions sont réassignées.
+        """
+        body = self.__dict__.get("_body_bytes")
+        if body is None:
+            body = self._body_bytes = encode_body(self.transactions)
+        return body
+
+    @property
+    def merkle_root(self):
+        """
+        Racine de Merkle (hexadécimal) des transactions du bloc, calculée une seule fois
+        à partir du corps encodé et incluse dans l'en-tête.
+        """
+        root = self.__dict__.get("_merkle_root")
+        if root is None:
+            leaves = (hash_leaf(record) for record in iter_body_records(self.body_bytes()))
+            root = self._merkle_root = compute_merkle_root(leaves).hex()
+        return root
+
+    def get_transaction_proof(self, position):
+        """
+        Construit la preuve d'inclusion de la transaction à la position donnée.
+        :return: liste de couples (hash du frère, côté) à vérifier avec merkle.verify_proof
+        """
+        leaves = [hash_leaf(record) for record in iter_body_records(self.body_bytes())]
+        return merkle_proof(leaves, position)
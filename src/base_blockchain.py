@@ -0,0 +1,178 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from src.encoding import encode_transaction
+from src.merkle import hash_leaf, verify_proof
+
+class BaseBlockchain:
+    """
+    Partie commune aux chaînes PoS (Blockchain) et PoW (BlockchainPow) : preuves d'inclusion,
+    index de recherche par hash et par horodatage, élagage et watermark de validation incrémentale.
+    Les sous-classes renseignent self.chain et self.store, puis appellent _init_validation et _init_lookup_index.
+    """
+
+    def _init_validation(self):
+        # Watermark de validation : hauteur jusqu'à laquelle la chaîne a déjà été vérifiée, et hash du bloc à cette hauteur
+        self._verified_height = 0
+        self._verified_hash = self.chain[0].hash
+        # Les blocs d'une chaîne stockée sont rattachés à la chaîne dès leur chargement, sans les parcourir ici
+        if self.store is not None:
+            self.store.watcher = self
+
+    def _init_lookup_index(self):
+        # Index de recherche : hash -> index du bloc, et horodatages des blocs (croissants) pour les plages de temps.
+        # Construits à la première recherche : rouvrir un stockage ne relit ni ne rehache aucun en-tête
+        self._hash_index = None
+        self._timestamps = None
+
+    def _build_lookup_index(self):
+        """
+        Construit les index de recherche à partir des en-têtes de la chaîne (une seule fois, à la première recherche).
+        """
+        if self._hash_index is not None:
+            return
+        hash_index = {}
+        timestamps = array("d")
+        headers = self.store.iter_headers() if self.store is not None else ((b.hash, b.timestamp) for b in self.chain)
+        for index, (block_hash, timestamp) in enumerate(headers):
+            hash_index[block_hash] = index
+            timestamps.append(timestamp)
+        self._hash_index, self._timestamps = hash_index, timestamps
+
+    def get_last_block(self):
+        """
+        Retourne le dernier bloc de la chaîne.
+        """
+        return self.chain[-1]
+
+    def get_transaction_proof(self, block_index, tx_position):
+        """
+        Construit la preuve d'inclusion (Merkle) d'une transaction d'un bloc de la chaîne.
+        :param block_index: index du bloc contenant la transaction
+        :param tx_position: position de la transaction dans le bloc
+        :return: dictionnaire contenant la racine de Merkle de l'en-tête, le hash de la feuille et le chemin
+        """
+        if not 0 <= block_index < len(self.chain):
+            raise ValueError(f"Bloc {block_index} inexistant")
+        block = self.chain[block_index]
+        if not 0 <= tx_position < len(block.transactions):
+            raise ValueError(f"Transaction {tx_position} inexistante dans le bloc {block_index}")
+        return {
+            "block_index": block_index,
+            "block_hash": block.hash,
+            "tx_position": tx_position,
+            "merkle_root": block.merkle_root,
+            "leaf": hash_leaf(encode_transaction(block.transactions[tx_position])).hex(),
+            "path": block.get_transaction_proof(tx_position)
+        }
+
+    def verify_proof(self, transaction, proof):
+        """
+        Vérifie en O(log n) qu'une transaction est incluse dans le bloc désigné par la preuve,
+        en se fiant uniquement à la racine de Merkle de l'en-tête de ce bloc.
+        :param transaction: la transaction à vérifier, ou None pour ne vérifier que la feuille de la preuve
+        :param proof: preuve produite par get_transaction_proof
+        """
+        block_index = proof["block_index"]
+        if not 0 <= block_index < len(self.chain):
+            return False
+        root = self.chain[block_index].merkle_root
+        if root != proof["merkle_root"]:
+            return False
+        leaf = bytes.fromhex(proof["leaf"])
+        if transaction is not None and hash_leaf(encode_transaction(transaction)) != leaf:
+            return False
+        return verify_proof(leaf, proof["path"], root)
+
+    def prune(self, depth=None):
+        """
+        Archive les corps des blocs situés à plus de `depth` blocs du dernier : seuls leurs en-têtes
+        restent dans le journal, les corps sont relus à la demande depuis l'archive compressée.
+        À utiliser une fois l'état sauvegardé (snapshot) : le rejeu des blocs élagués relit l'archive.
+        :param depth: profondeur conservée, prune_depth par défaut
+        :return: le nombre de blocs nouvellement élagués
+        """
+        if self.store is None:
+            raise ValueError("L'élagage des blocs nécessite un BlockStore")
+        depth = self.prune_depth if depth is None else depth
+        return self.store.prune(len(self.chain) - max(depth, 1))
+
+    def _maybe_prune(self):
+        """
+        Élague par lots, lorsque 2 * prune_depth blocs ne sont pas élagués : chaque élagage n'écrit que les
+        prune_depth en-têtes et corps archivés (le reste du journal n'est pas réécrit) et supprime les segments vidés.
+        """
+        if self.prune_depth is not None and len(self.chain) - self.store.pruned_height >= 2 * max(self.prune_depth, 1):
+            self.prune()
+
+    def _index_block(self, block):
+        """
+        Ajoute le dernier bloc de la chaîne aux index de recherche (hash et horodatage), s'ils sont déjà construits.
+        """
+        if self._hash_index is None:
+            return
+        self._hash_index[block.hash] = block.index
+        self._timestamps.append(block.timestamp)
+
+    def get_block_by_hash(self, block_hash):
+        """
+        Retourne le bloc de hash donné en O(1) (une fois l'index construit), ou None s'il n'est pas dans la chaîne.
+        """
+        self._build_lookup_index()
+        index = self._hash_index.get(block_hash)
+        if index is None or index >= len(self.chain) or self.chain[index].hash != block_hash:
+            return None
+        return self.chain[index]
+
+    def get_blocks_between(self, start_time, end_time):
+        """
+        Retourne les blocs dont l'horodatage est compris entre start_time et end_time (inclus),
+        trouvés par dichotomie sur les horodatages (croissants le long de la chaîne).
+        """
+        self._build_lookup_index()
+        first = bisect_left(self._timestamps, start_time)
+        last = bisect_right(self._timestamps, end_time)
+        return [self.chain[index] for index in range(first, last)]
+
+    def _validate_pruned_headers(self, start, check_target=False):
+        """
+        Valide les blocs élagués à partir de leurs seuls en-têtes (hash, chaînage, horodatage) :
+        la racine de Merkle de chaque en-tête engage le corps archivé, vérifié à sa relecture.
+        :param check_target: vérifier aussi que chaque hash respecte la cible de son en-tête (PoW)
+        :return: (index du premier bloc restant à vérifier, index du premier bloc invalide ou None)
+        """
+        if self.store is None or start >= self.store.pruned_height:
+            return start, None
+        invalid_index = self.store.find_invalid_header(start, self.store.pruned_height, check_target)
+        return self.store.pruned_height, invalid_index
+
+    def invalidate_validation(self, index):
+        """
+        Abaisse le watermark de validation sous le bloc `index` : appelé par un bloc déjà validé
+        lorsqu'un de ses champs hachés est modifié, ce bloc sera revérifié au prochain is_chain_valid.
+        """
+        if index <= self._verified_height:
+            self._verified_height = max(index - 1, 0)
+            self._verified_hash = self.chain[self._verified_height].hash
+
+    def _validation_start(self, full):
+        """
+        Retourne l'index du premier bloc à vérifier : juste après le watermark, ou 1 pour une
+        validation complète (demandée, ou si le bloc du watermark n'est plus celui qui a été validé).
+        """
+        height = self._verified_height
+        if full or height >= len(self.chain) or self.chain[height].hash != self._verified_hash:
+            return 1
+        return height + 1
+
+    def _set_watermark(self, height, start):
+        """
+        Enregistre la hauteur validée (et son hash) et demande aux blocs nouvellement validés
+        de signaler toute modification ultérieure.
+        """
+        # Une chaîne stockée rattache ses blocs au chargement (BlockStore.watcher) : les recharger ici
+        # désérialiserait toute la plage validée une seconde fois
+        if self.store is None:
+            for i in range(start, height + 1):
+                self.chain[i]._watcher = self
+        self._verified_height = height
+        self._verified_hash = self.chain[height].hash
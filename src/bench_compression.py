@@ -0,0 +1,75 @@
+import lzma
+import random
+import sys
+import time
+import uuid
+import zlib
+from src.compression import compress_body, decompress_body
+from src.encoding import encode_body
+from src.token_ import Token
+
+# Usage : python -m src.bench_compression [nombre de blocs] [transactions par bloc]
+
+WALLETS = ["wallet_creator", "wallet_Lina", "wallet_Mathis", "wallet_JJ"] + [f"wallet_user{i}" for i in range(20)]
+
+
+def make_transactions(count):
+    """
+    Génère des transactions au format de BlockchainManager (transferts surtout, quelques stakes/unstakes).
+    """
+    transactions = []
+    for _ in range(count):
+        token_id = str(uuid.uuid4())
+        action = random.choices(["transfer", "stake", "unstake"], weights=[8, 1, 1])[0]
+        if action == "transfer":
+            sender, receiver = random.sample(WALLETS, 2)
+            transactions.append({"action": "transfer", "token_id": token_id, "from": sender, "to": receiver,
+                                 "timestamp": time.time()})
+        else:
+            transactions.append({"action": action, "token_id": token_id, "address": random.choice(WALLETS),
+                                 "timestamp": time.time()})
+    return transactions
+
+
+def make_creation(count):
+    """
+    Génère une transaction de création de tokens (bloc d'offre initiale).
+    """
+    tokens = [Token() for _ in range(count)]
+    return [{"action": "token_creation", "owner": "wallet_creator", "tokens": [t.to_dict() for t in tokens]}]
+
+
+def measure(name, bodies, compress, decompress):
+    """
+    Mesure le taux de compression et les débits de compression/décompression (Mo/s de corps non compressé).
+    """
+    raw_size = sum(len(body) for body in bodies)
+    started = time.perf_counter()
+    compressed = [compress(body) for body in bodies]
+    encode_time = time.perf_counter() - started
+    started = time.perf_counter()
+    for data, body in zip(compressed, bodies):
+        if decompress(data) != body:
+            raise ValueError(f"{name} : décompression incorrecte")
+    decode_time = time.perf_counter() - started
+    compressed_size = sum(len(data) for data in compressed)
+    megabytes = raw_size / 1_000_000
+    print(f"{name:<22} {raw_size / compressed_size:>6.2f}x {megabytes / encode_time:>10.1f} {megabytes / decode_time:>10.1f}")
+
+
+def run(blocks=500, per_block=10):
+    random.seed(0)
+    workloads = {
+        f"{blocks} blocs de {per_block} transactions": [encode_body(make_transactions(per_block)) for _ in range(blocks)],
+        "offre initiale (10 000 tokens)": [encode_body(make_creation(10_000))],
+    }
+    for title, bodies in workloads.items():
+        print(f"\n--- {title} : {sum(len(b) for b in bodies) / 1000:.0f} ko ---")
+        print(f"{'méthode':<22} {'taux':>7} {'comp. Mo/s':>10} {'déc. Mo/s':>10}")
+        measure("zlib", bodies, zlib.compress, zlib.decompress)
+        measure("zlib + dictionnaire", bodies, compress_body, decompress_body)
+        measure("lzma", bodies, lzma.compress, lzma.decompress)
+
+
+if __name__ == "__main__":
+    run(*(int(arg) for arg in sys.argv[1:3]))
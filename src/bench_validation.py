@@ -0,0 +1,54 @@
+import os
+import sys
+import tempfile
+import time
+from src.bench_compression import make_transactions
+from src.block_store import BlockStore
+from src.blockchain import Blockchain
+from src.validation import _iter_tasks, find_first_invalid_block
+
+# Usage : python -m src.bench_validation [nombre de blocs] [transactions par bloc] [processus]
+
+
+def build_chain(blockchain, blocks, per_block):
+    for _ in range(blocks):
+        blockchain.add_block("Alice", "PBFT", block=blockchain.create_candidate_block(make_transactions(per_block)))
+
+
+def timed(function):
+    started = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - started
+
+
+def measure(name, blockchain, workers):
+    """
+    Compare la validation complète séquentielle, la préparation des tranches dans le processus principal
+    (seule partie non parallélisée) et la validation parallèle complète.
+    """
+    chain = blockchain.chain
+    _, serial = timed(lambda: blockchain.is_chain_valid(full=True))
+    _, prepare = timed(lambda: sum(1 for _ in _iter_tasks(chain, max(1, len(chain) // (4 * workers)), False)))
+    result, parallel = timed(lambda: find_first_invalid_block(chain, workers))
+    if result is not None:
+        raise ValueError(f"{name} : bloc {result} invalide")
+    print(f"{name:<10} {serial:>12.3f} {prepare:>12.3f} {parallel:>12.3f}")
+
+
+def run(blocks=300, per_block=200, workers=os.cpu_count() or 2):
+    workers = max(2, workers)
+    print(f"{blocks} blocs de {per_block} transactions, {workers} processus (secondes)")
+    print(f"{'chaîne':<10} {'séquentiel':>12} {'préparation':>12} {'parallèle':>12}")
+    blockchain = Blockchain()
+    build_chain(blockchain, blocks, per_block)
+    measure("mémoire", blockchain, workers)
+    with tempfile.TemporaryDirectory() as path:
+        store = BlockStore(path)
+        blockchain = Blockchain(store=store)
+        build_chain(blockchain, blocks, per_block)
+        measure("stockage", blockchain, workers)
+        store.close()
+
+
+if __name__ == "__main__":
+    run(*(int(arg) for arg in sys.argv[1:4]))
@@ -1,9 +1,17 @@
 import hashlib
-import json
 import time
+from src.base_block import BaseBlock
+from src.encoding import (
+    ENCODING_BINARY, ENCODING_JSON, encode_header, encode_record,
+    decode_header, decode_body, split_record, encode_legacy_json
+)
 
-class Block:
-    def __init__(self, index, previous_hash, transactions, timestamp=None, validator=None, pbft_signature=None):
+class Block(BaseBlock):
+    # Champs couverts par le hash : les modifier sur un bloc validé impose de le revérifier
+    _HASHED_FIELDS = frozenset(("index", "previous_hash", "timestamp", "transactions", "validator", "pbft_signature", "hash"))
+
+    def __init__(self, index, previous_hash, transactions, timestamp=None, validator=None, pbft_signature=None,
+                 encoding=ENCODING_BINARY):
         """
         Initialise un bloc de la blockchain en configurant ses données et en calculant son hash.
         Les attributs validator et pbft_signature sont initialisés à None.
@@ -11,7 +19,9 @@ class Block:
         :param previous_hash: le hash du bloc précédent
         :param transactions: la liste des transactions à inclure dans le bloc
         :param timestamp: l'horodatage du bloc, ou le temps actuel si None
+        :param encoding: ENCODING_BINARY (par défaut) ou ENCODING_JSON pour vérifier les anciennes chaînes
         """
+        self.encoding = encoding
         self.index = index
         self.previous_hash = previous_hash
         self.timestamp = timestamp or time.time()
@@ -22,21 +32,84 @@ class Block:
         # Calcule immédiatement le hash sans processus de minage
         self.hash = self.calculate_hash()
 
+    def header_bytes(self):
+        """
+        Retourne l'en-tête encodé du bloc (partie fixe et chaînes préfixées par leur longueur).
+        """
+        return encode_header(self.index, self.timestamp, self.previous_hash, self.merkle_root,
+                             self.validator, self.pbft_signature)
+
+    def to_bytes(self, compress=False):
+        """
+        Sérialise le bloc dans le format binaire canonique (en-tête + corps préfixé par sa longueur).
+        Cette forme sert au hachage, au stockage et au transport.
+        :param compress: si True, le corps est compressé (stockage, transport) ; from_bytes le décompresse
+        """
+        return encode_record(self.header_bytes(), self.body_bytes(), compress)
+
+    @classmethod
+    def header_size(cls, data):
+        """
+        Retourne la taille de l'en-tête d'un bloc sérialisé (position du début du corps).
+        """
+        return decode_header(data)[1]
+
+    @classmethod
+    def from_bytes(cls, data, encoding=ENCODING_BINARY):
+        """
+        Reconstruit un bloc à partir de sa forme sérialisée (voir to_bytes).
+        Le corps encodé est réutilisé tel quel comme cache, sans réencodage.
+        """
+        fields, offset = decode_header(data)
+        body, _ = split_record(data, offset)
+        transactions, _ = decode_body(body)
+        block = cls.__new__(cls)
+        block.encoding = encoding
+        block.index = fields["index"]
+        block.previous_hash = fields["previous_hash"]
+        block.timestamp = fields["timestamp"]
+        block.transactions = transactions
+        block._body_bytes = body
+        if block.merkle_root != fields["merkle_root"]:
+            raise ValueError(f"Racine de Merkle invalide pour le bloc {fields['index']}")
+        block.validator = fields["validator"]
+        block.pbft_signature = fields["pbft_signature"]
+        block.hash = block.calculate_hash()
+        return block
+
+    def seal(self, validator, pbft_signature, timestamp=None):
+        """
+        Scelle un bloc candidat : renseigne le validateur, la signature PBFT et l'horodatage,
+        puis recalcule le hash. Seul le petit en-tête est rehaché, le corps et sa racine de Merkle
+        restent en cache.
+        :param timestamp: horodatage du scellement, ou le temps actuel si None
+        """
+        self.validator = validator
+        self.pbft_signature = pbft_signature
+        self.timestamp = timestamp or time.time()
+        self.hash = self.calculate_hash()
+        return self
+
     def calculate_hash(self):
         """
-        Calcule le hash du bloc en utilisant SHA-256 sur un dictionnaire des données du bloc.
+        Calcule le hash SHA-256 de l'en-tête binaire canonique du bloc. Le corps n'est pas rehaché :
+        il est engagé par la racine de Merkle de l'en-tête, calculée une seule fois.
         Les attributs validator et pbft_signature sont inclus pour garantir l'intégrité dans le contexte PoS/PBFT.
+        En mode ENCODING_JSON, le hash est calculé à l'ancienne sur un dictionnaire sérialisé avec json.dumps.
         :return: Le hash du bloc sous forme de chaîne hexadécimale.
         """
-        block_string = json.dumps({
-            "index": self.index,
-            "timestamp": self.timestamp,
-            "transactions": self.transactions,
-            "previous_hash": self.previous_hash,
-            "validator": self.validator,
-            "pbft_signature": self.pbft_signature
-        }, sort_keys=True).encode()
-        
+        if self.encoding == ENCODING_JSON:
+            block_string = encode_legacy_json({
+                "index": self.index,
+                "timestamp": self.timestamp,
+                "transactions": self.transactions,
+                "previous_hash": self.previous_hash,
+                "validator": self.validator,
+                "pbft_signature": self.pbft_signature
+            })
+        else:
+            # L'en-tête contient la racine de Merkle : il engage déjà tout le corps
+            block_string = self.header_bytes()
         return hashlib.sha256(block_string).hexdigest()
 
     def print_block(self):
@@ -48,6 +121,7 @@ class Block:
         print(f'Date : {self.timestamp}')
         print(f'Nombre de transactions : {len(self.transactions)}')
         print(f'Transactions : {self.transactions}')
+        print(f'Racine de Merkle : {self.merkle_root[:10]}')
         print(f'Hash du bloc: {self.hash[:10]}')
         print(f'Validateur : {self.validator}')
         print(f'Signature PBFT : {self.pbft_signature}')
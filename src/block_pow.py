@@ -1,41 +1,146 @@
 import hashlib
-import json
 import time
+from src.miner import mine, mine_parallel, difficulty_to_target, hash_meets_target
+from src.base_block import BaseBlock
+from src.encoding import (
+    ENCODING_BINARY, ENCODING_JSON, encode_header, encode_record, encode_nonce, encode_target,
+    decode_header, decode_body, decode_nonce, decode_target, split_record, encode_legacy_json
+)
 
-class BlockPow:
-    def __init__(self, index, previous_hash, transactions, difficulty=2, timestamp=None):
+class BlockPow(BaseBlock):
+    # Champs couverts par le hash : les modifier sur un bloc validé impose de le revérifier
+    _HASHED_FIELDS = frozenset(("index", "previous_hash", "timestamp", "transactions", "nonce", "target", "hash"))
+
+    def __init__(self, index, previous_hash, transactions, difficulty=2, timestamp=None, nonce=None,
+                 encoding=ENCODING_BINARY, workers=1, target=None):
+        """
+        Initialise un bloc PoW et le mine dès sa création.
+        Si un nonce est fourni (bloc déjà miné, par exemple relu depuis le disque), le bloc n'est pas miné
+        et son hash est simplement recalculé.
+        :param difficulty: nombre de zéros hexadécimaux de tête, utilisé si aucune cible n'est fournie
+        :param target: cible numérique sur 256 bits (le hash doit lui être inférieur), incluse dans l'en-tête
+        :param encoding: ENCODING_BINARY (par défaut) ou ENCODING_JSON pour vérifier les anciennes chaînes
+        :param workers: nombre de processus utilisés pour le minage (1 = minage sur un seul cœur)
+        """
+        self.encoding = encoding
         self.index = index
         self.previous_hash = previous_hash
         self.timestamp = timestamp or time.time()
         self.transactions = transactions
-        self.nonce = 0
         self.difficulty = difficulty 
-        self.hash = self.mine_block()  # On mine le bloc dès sa création
+        self.target = target if target is not None else difficulty_to_target(difficulty)
+        self.hashrate = None  # Hashs par seconde mesurés lors du minage
+        if nonce is None:
+            self.nonce = 0
+            self.hash = self.mine_block(workers)  # On mine le bloc dès sa création
+        else:
+            self.nonce = nonce
+            self.hash = self.calculate_hash()
+
+    def mining_prefix(self):
+        """
+        Retourne l'en-tête encodé sans le nonce (cible comprise) : partie fixe pendant toute la recherche du nonce.
+        """
+        return encode_header(self.index, self.timestamp, self.previous_hash, self.merkle_root) + encode_target(self.target)
+
+    def header_bytes(self):
+        """
+        Retourne l'en-tête encodé du bloc, nonce compris (placé en dernier).
+        """
+        return self.mining_prefix() + encode_nonce(self.nonce)
 
+    def to_bytes(self, compress=False):
+        """
+        Sérialise le bloc dans le format binaire canonique (en-tête + corps préfixé par sa longueur).
+        :param compress: si True, le corps est compressé (stockage, transport) ; from_bytes le décompresse
+        """
+        return encode_record(self.header_bytes(), self.body_bytes(), compress)
+
+    @classmethod
+    def header_size(cls, data):
+        """
+        Retourne la taille de l'en-tête d'un bloc sérialisé, cible et nonce compris (position du début du corps).
+        """
+        _, offset = decode_header(data)
+        _, offset = decode_target(data, offset)
+        _, offset = decode_nonce(data, offset)
+        return offset
+
+    @classmethod
+    def from_bytes(cls, data, difficulty=2, encoding=ENCODING_BINARY):
+        """
+        Reconstruit un bloc déjà miné à partir de sa forme sérialisée (voir to_bytes).
+        """
+        fields, offset = decode_header(data)
+        target, offset = decode_target(data, offset)
+        nonce, offset = decode_nonce(data, offset)
+        body, _ = split_record(data, offset)
+        transactions, _ = decode_body(body)
+        block = cls.__new__(cls)
+        block.encoding = encoding
+        block.index = fields["index"]
+        block.previous_hash = fields["previous_hash"]
+        block.timestamp = fields["timestamp"]
+        block.transactions = transactions
+        block._body_bytes = body
+        if block.merkle_root != fields["merkle_root"]:
+            raise ValueError(f"Racine de Merkle invalide pour le bloc {fields['index']}")
+        block.difficulty = difficulty
+        block.target = target
+        block.hashrate = None
+        block.nonce = nonce
+        block.hash = block.calculate_hash()
+        return block
 
     def calculate_hash(self):
         """
-        Génère le hash du bloc à partir de son contenu.
+        Génère le hash du bloc à partir de son en-tête binaire canonique (racine de Merkle et nonce compris),
+        ou de l'ancien encodage JSON en mode ENCODING_JSON.
         """
-        block_string = json.dumps({
-            "index": self.index,
-            "timestamp": self.timestamp,
-            "transactions": self.transactions,
-            "previous_hash": self.previous_hash,
-            "nonce": self.nonce
-        }, sort_keys=True).encode()
+        if self.encoding == ENCODING_JSON:
+            block_string = encode_legacy_json({
+                "index": self.index,
+                "timestamp": self.timestamp,
+                "transactions": self.transactions,
+                "previous_hash": self.previous_hash,
+                "nonce": self.nonce
+            })
+        else:
+            # L'en-tête contient la racine de Merkle : il engage déjà tout le corps
+            block_string = self.header_bytes()
         return hashlib.sha256(block_string).hexdigest()
     
-    def mine_block(self):
+    def mine_block(self, workers=1, interrupt=None):
         """
-        Trouve un hash valide respectant la difficulté (Proof of Work).
+        Trouve un hash valide respectant la cible (Proof of Work) : sa valeur entière doit être inférieure à target.
+        Avec workers > 1, l'espace des nonces est réparti sur un pool de processus ; le nonce retenu
+        est toujours le plus petit nonce valide, identique à celui du minage sur un seul cœur.
+        :param interrupt: threading.Event optionnel permettant d'interrompre le minage
+        :return: le hash trouvé, ou None si le minage a été interrompu
         """
-        while True:
-            hash_attempt = self.calculate_hash()
-            if hash_attempt[:self.difficulty] == "0" * self.difficulty:
-                print(f"Bloc {self.index} miné : {hash_attempt}")
-                return hash_attempt
-            self.nonce += 1
+        if self.encoding == ENCODING_JSON:
+            while True:
+                if interrupt is not None and interrupt.is_set():
+                    return None
+                hash_attempt = self.calculate_hash()
+                # Même critère qu'en mode binaire : la cible (éventuellement réajustée) et non la difficulté initiale
+                if hash_meets_target(hash_attempt, self.target):
+                    print(f"Bloc {self.index} miné : {hash_attempt}")
+                    return hash_attempt
+                self.nonce += 1
+        prefix = self.mining_prefix()
+        started = time.perf_counter()
+        if workers > 1:
+            result = mine_parallel(prefix, self.target, workers, start=self.nonce, interrupt=interrupt)
+        else:
+            result = mine(prefix, self.target, start=self.nonce, interrupt=interrupt)
+        if result is None:
+            return None
+        self.nonce, hash_attempt, attempts = result
+        elapsed = time.perf_counter() - started
+        self.hashrate = attempts / elapsed if elapsed > 0 else float(attempts)
+        print(f"Bloc {self.index} miné : {hash_attempt} ({self.hashrate:,.0f} H/s)")
+        return hash_attempt
     
     def print_block(self):
         print('__Block n°', self.index,"__")
@@ -43,8 +148,12 @@ class BlockPow:
         print('Date : ', self.timestamp)
         print("Nombre de transactions : ", len(self.transactions))
         print(self.transactions)
+        print('Racine de Merkle :', self.merkle_root[:10])
         print('Hash block:', self.hash[:10])
         print('Nonce : ', self.nonce)
+        print(f'Cible : {self.target:064x}')
+        if self.hashrate is not None:
+            print(f'Hashrate : {self.hashrate:,.0f} H/s')
         print('_______________\n')
 
 
@@ -0,0 +1,414 @@
+import hashlib
+import mmap
+import os
+import re
+import struct
+import sys
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from src.block import Block
+from src.compression import compress_body, decompress_body
+from src.encoding import ENCODING_BINARY, ENCODING_JSON, decode_header, decode_target, encode_record, split_record
+from src.miner import hash_meets_target
+
+# Chaque enregistrement du journal est préfixé par sa longueur
+_RECORD_LEN = struct.Struct(">I")
+# Chaque entrée de l'index est la position (offset) d'un enregistrement dans le journal
+_OFFSET = struct.Struct(">Q")
+# Un bloc élagué garde son en-tête, suivi de cette référence à son corps archivé :
+# marqueur (à la place de la longueur du corps), position et taille du corps compressé dans l'archive
+_ARCHIVE_REF = struct.Struct(">IQI")
+_PRUNED = 0xFFFFFFFF
+# Bit de poids fort d'une entrée de l'index : l'enregistrement (élagué) est dans headers.log et non dans un segment
+_IN_HEADERS = 1 << 63
+# Nom des segments du journal : index du premier bloc du segment
+_SEGMENT_NAME = re.compile(r"blocks\.(\d+)\.log$")
+# Nombre maximal de projections mémoire ouvertes en même temps (chaque projection garde un descripteur de fichier)
+_MAX_MAPS = 8
+
+
+class BlockStore:
+    """
+    Stockage persistant des blocs en ajout seul :
+      - blocks.<premier index>.log : segments du journal, chacun couvrant segment_size blocs consécutifs
+        (enregistrements préfixés par leur longueur : forme binaire canonique des blocs, corps compressé
+        avec le dictionnaire du schéma des transactions),
+      - blocks.idx : position de chaque enregistrement dans son segment, sur 8 octets, dans l'ordre des index.
+    Les écritures sont synchronisées sur disque par groupes (fsync tous les sync_every blocs) et
+    les lectures passent par une projection mémoire (mmap) des segments. L'ouverture d'un stockage
+    existant ne charge que l'index des positions : aucun bloc n'est désérialisé.
+    Les corps des blocs anciens peuvent être élagués (prune) : ils sont déplacés, compressés, dans
+    bodies.archive et relus à la demande ; leur en-tête, dont la racine de Merkle engage le corps archivé,
+    est recopié dans headers.log. Seul le préfixe élagué est écrit : les entrées de l'index de ces blocs
+    sont réécrites sur place et les segments entièrement élagués sont supprimés, sans réécrire le reste du journal.
+    Le stockage se comporte comme une séquence de blocs (len, indexation, itération, append)
+    et peut donc servir directement de Blockchain.chain. Les blocs sont chargés à la demande et
+    les plus sollicités sont gardés dans un cache LRU borné : la mémoire reste constante quelle
+    que soit la hauteur de la chaîne.
+    """
+
+    def __init__(self, path, block_cls=Block, encoding=ENCODING_BINARY, sync_every=16, cache_size=256,
+                 compress=True, segment_size=1024):
+        """
+        :param path: répertoire du stockage (créé s'il n'existe pas)
+        :param block_cls: classe des blocs stockés (Block ou BlockPow)
+        :param encoding: mode de hachage des blocs relus
+        :param sync_every: nombre de blocs ajoutés entre deux fsync
+        :param cache_size: nombre maximal de blocs désérialisés gardés en mémoire (au moins 1, le dernier bloc)
+        :param compress: compresse le corps des blocs ajoutés (zlib avec le dictionnaire du schéma des transactions) ;
+                         les corps sont décompressés de façon transparente à la lecture
+        :param segment_size: nombre de blocs par segment du journal ; un segment n'est supprimé qu'une fois
+                             tous ses blocs élagués
+        """
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.block_cls = block_cls
+        self.encoding = encoding
+        self.sync_every = sync_every
+        self.compress = compress
+        self.segment_size = max(1, segment_size)
+        self.index_path = os.path.join(path, "blocks.idx")
+        self.headers_path = os.path.join(path, "headers.log")
+        self.archive_path = os.path.join(path, "bodies.archive")
+        # Index du premier bloc de chaque segment, par ordre croissant
+        self._segments = sorted(int(match.group(1)) for match in map(_SEGMENT_NAME.match, os.listdir(path)) if match)
+        if not self._segments:
+            self._segments = [0]
+        self._offsets = self._load_offsets()
+        self._log = open(self.segment_path(self._segments[-1]), "ab")
+        self._index = open(self.index_path, "ab")
+        self._maps = OrderedDict()
+        self._unsynced = 0
+        self.cache_size = max(1, cache_size)
+        self._cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._archive = None
+        # Chaîne à prévenir si un champ haché d'un bloc chargé est réaffecté (voir BaseBlock.__setattr__)
+        self.watcher = None
+        # Fonctions appelées après chaque fsync du journal (index secondaires synchronisés avec les blocs)
+        self.on_sync = []
+        self.pruned_height = self._find_pruned_height()
+        # Segments entièrement élagués restés sur disque (élagage interrompu avant leur suppression)
+        self._drop_pruned_segments()
+
+    def segment_path(self, first_index):
+        """
+        Retourne le chemin du segment du journal qui commence au bloc first_index.
+        """
+        return os.path.join(self.path, f"blocks.{first_index:010d}.log")
+
+    def _load_offsets(self):
+        """
+        Charge l'index des positions et élimine une éventuelle fin incomplète du dernier segment
+        (écriture interrompue avant le fsync).
+        """
+        data = b""
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "rb") as index_file:
+                data = index_file.read()
+        data = data[:len(data) - len(data) % _OFFSET.size]
+        offsets = array("Q")
+        offsets.frombytes(data)
+        if sys.byteorder == "little":
+            offsets.byteswap()
+        # Le dernier segment se termine au dernier enregistrement complet référencé par l'index
+        first = self._segments[-1]
+        log_path = self.segment_path(first)
+        log_size = os.path.getsize(log_path) if os.path.exists(log_path) else 0
+        with open(log_path, "ab+") as log_file:
+            end = 0
+            while len(offsets) > first:
+                last = offsets[-1]
+                if last & _IN_HEADERS:
+                    # Bloc élagué : le segment garde encore son enregistrement complet
+                    end = log_size
+                    break
+                if last + _RECORD_LEN.size <= log_size:
+                    log_file.seek(last)
+                    (length,) = _RECORD_LEN.unpack(log_file.read(_RECORD_LEN.size))
+                    end = last + _RECORD_LEN.size + length
+                    if end <= log_size:
+                        break
+                end = 0
+                offsets.pop()
+            if end < log_size:
+                log_file.truncate(end)
+        with open(self.index_path, "ab+") as index_file:
+            index_file.truncate(len(offsets) * _OFFSET.size)
+        return offsets
+
+    def _find_pruned_height(self):
+        """
+        Les blocs élagués forment un préfixe de la chaîne, marqué dans l'index : sa longueur est trouvée par dichotomie.
+        """
+        low, high = 0, len(self._offsets)
+        while low < high:
+            middle = (low + high) // 2
+            if self._offsets[middle] & _IN_HEADERS:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _drop_pruned_segments(self):
+        """
+        Supprime les segments dont tous les blocs sont élagués (leurs en-têtes sont dans headers.log,
+        leurs corps dans l'archive). Le dernier segment n'est jamais supprimé.
+        """
+        while len(self._segments) > 1 and self._segments[1] <= self.pruned_height:
+            path = self.segment_path(self._segments.pop(0))
+            view = self._maps.pop(path, None)
+            if view is not None:
+                view.close()
+            os.remove(path)
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def __iter__(self):
+        # Un parcours complet ne passe pas par le cache : il n'en chasserait que les blocs utiles
+        for i in range(len(self._offsets)):
+            block = self._cache.get(i)
+            yield block if block is not None else self._load(i)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self._offsets)))]
+        if index < 0:
+            index += len(self._offsets)
+        if not 0 <= index < len(self._offsets):
+            raise IndexError("Index de bloc hors limites")
+        block = self._cache.get(index)
+        if block is not None:
+            self.hits += 1
+            self._cache.move_to_end(index)
+            return block
+        self.misses += 1
+        block = self._load(index)
+        self._remember(index, block)
+        return block
+
+    def _load(self, index):
+        """
+        Désérialise le bloc à l'index donné depuis le journal et le rattache à la chaîne qui surveille le stockage.
+        """
+        block = self.block_cls.from_bytes(self.read_record(index), encoding=self.encoding)
+        if self.watcher is not None:
+            block._watcher = self.watcher
+        return block
+
+    def _remember(self, index, block):
+        """
+        Place un bloc dans le cache LRU en évinçant le moins récemment utilisé si le cache est plein.
+        """
+        self._cache[index] = block
+        self._cache.move_to_end(index)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def read_record(self, index):
+        """
+        Retourne la forme binaire complète du bloc à l'index donné, lue via la projection mémoire du journal.
+        Le corps d'un bloc élagué est relu et décompressé depuis l'archive.
+        """
+        record = self._raw_record(index)
+        if index >= self.pruned_height:
+            return record
+        header = record[:-_ARCHIVE_REF.size]
+        _, archive_offset, length = _ARCHIVE_REF.unpack_from(record, len(header))
+        if self._archive is None:
+            self._archive = open(self.archive_path, "rb")
+        self._archive.seek(archive_offset)
+        return encode_record(header, decompress_body(self._archive.read(length)))
+
+    def read_header(self, index):
+        """
+        Retourne l'en-tête encodé du bloc à l'index donné, sans lire son corps (ni l'archive).
+        """
+        record = self._raw_record(index)
+        if index < self.pruned_height:
+            return record[:-_ARCHIVE_REF.size]
+        return record[:self.block_cls.header_size(record)]
+
+    def iter_headers(self):
+        """
+        Itère sur (hash, horodatage) de chaque bloc en ne lisant que les en-têtes (ni corps, ni archive).
+        En mode ENCODING_JSON, le hash dépend du corps : les blocs sont alors entièrement relus.
+        """
+        if self.encoding == ENCODING_JSON:
+            for block in self:
+                yield block.hash, block.timestamp
+            return
+        for index in range(len(self._offsets)):
+            header = self.read_header(index)
+            yield hashlib.sha256(header).hexdigest(), decode_header(header)[0]["timestamp"]
+
+    def is_pruned(self, index):
+        """
+        Indique si le corps du bloc à l'index donné a été déplacé dans l'archive.
+        """
+        return index < self.pruned_height
+
+    def _raw_record(self, index):
+        """
+        Retourne l'enregistrement stocké du bloc à l'index donné : dans headers.log pour un bloc élagué,
+        dans son segment du journal sinon.
+        """
+        entry = self._offsets[index]
+        if entry & _IN_HEADERS:
+            path, offset = self.headers_path, entry & ~_IN_HEADERS
+        else:
+            path, offset = self.segment_path(self._segments[bisect_right(self._segments, index) - 1]), entry
+        view = self._mapped(path, offset + _RECORD_LEN.size)
+        (length,) = _RECORD_LEN.unpack_from(view, offset)
+        start = offset + _RECORD_LEN.size
+        view = self._mapped(path, start + length)
+        return view[start:start + length]
+
+    def _mapped(self, path, end):
+        """
+        Retourne une projection mémoire du fichier couvrant au moins `end` octets, en la recréant si
+        le fichier a grandi depuis la dernière projection. Seules les _MAX_MAPS dernières projections
+        utilisées restent ouvertes.
+        """
+        view = self._maps.get(path)
+        if view is None or len(view) < end:
+            if path == self._log.name:
+                self._log.flush()
+            if view is not None:
+                view.close()
+            with open(path, "rb") as mapped_file:
+                view = self._maps[path] = mmap.mmap(mapped_file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._maps.move_to_end(path)
+        while len(self._maps) > _MAX_MAPS:
+            self._maps.popitem(last=False)[1].close()
+        return view
+
+    def append(self, block):
+        """
+        Ajoute un bloc à la fin du journal. Le fsync est groupé : il a lieu tous les sync_every blocs
+        (ou lors d'un appel explicite à flush/close).
+        """
+        if block.index != len(self._offsets):
+            raise ValueError(f"Le bloc {block.index} ne suit pas le dernier bloc stocké ({len(self._offsets) - 1})")
+        if len(self._offsets) - self._segments[-1] >= self.segment_size:
+            self._start_segment(len(self._offsets))
+        record = block.to_bytes(compress=self.compress)
+        offset = self._log.tell()
+        self._log.write(_RECORD_LEN.pack(len(record)))
+        self._log.write(record)
+        self._index.write(_OFFSET.pack(offset))
+        self._offsets.append(offset)
+        if self.watcher is not None:
+            block._watcher = self.watcher
+        # Le nouveau dernier bloc, sollicité à chaque ajout, entre directement dans le cache
+        self._remember(block.index, block)
+        self._unsynced += 1
+        if self._unsynced >= self.sync_every:
+            self.flush()
+
+    def _start_segment(self, first_index):
+        """
+        Ferme le segment courant (synchronisé avec l'index) et ouvre un nouveau segment à partir du bloc first_index.
+        """
+        self.flush()
+        self._log.close()
+        self._segments.append(first_index)
+        self._log = open(self.segment_path(first_index), "ab")
+
+    def flush(self):
+        """
+        Écrit sur disque (fsync) les blocs ajoutés depuis la dernière synchronisation.
+        Le journal est synchronisé avant l'index ; à la réouverture, les entrées d'index qui pointent
+        au-delà de la fin du journal sont de toute façon ignorées.
+        """
+        self._log.flush()
+        os.fsync(self._log.fileno())
+        self._index.flush()
+        os.fsync(self._index.fileno())
+        self._unsynced = 0
+        for callback in self.on_sync:
+            callback()
+
+    def prune(self, height):
+        """
+        Élague les blocs d'index inférieur à `height` : leur corps est compressé et ajouté à l'archive,
+        leur en-tête (suivi de la référence au corps archivé) est ajouté à headers.log, puis leurs entrées
+        de l'index sont réécrites sur place et les segments entièrement élagués sont supprimés.
+        Seul le préfixe nouvellement élagué est lu et écrit, quelle que soit la taille du journal.
+        Le dernier bloc n'est jamais élagué. Les corps restent accessibles (relus à la demande) et
+        leur intégrité est garantie par la racine de Merkle de leur en-tête.
+        :return: le nombre de blocs nouvellement élagués
+        """
+        if self.encoding == ENCODING_JSON:
+            raise ValueError("L'élagage n'est pas possible en mode ENCODING_JSON : le hash dépend du corps")
+        height = min(height, len(self._offsets) - 1)
+        if height <= self.pruned_height:
+            return 0
+        self.flush()
+        entries = array("Q")
+        # L'archive et headers.log sont synchronisés avant l'index : une interruption ne laisse
+        # que des données non référencées à leur fin
+        with open(self.archive_path, "ab") as archive, open(self.headers_path, "ab") as headers:
+            for index in range(self.pruned_height, height):
+                record = self._raw_record(index)
+                header_size = self.block_cls.header_size(record)
+                body, _ = split_record(record, header_size)
+                compressed = compress_body(body)
+                pruned_record = record[:header_size] + _ARCHIVE_REF.pack(_PRUNED, archive.tell(), len(compressed))
+                archive.write(compressed)
+                entries.append(_IN_HEADERS | headers.tell())
+                headers.write(_RECORD_LEN.pack(len(pruned_record)))
+                headers.write(pruned_record)
+            for handle in (archive, headers):
+                handle.flush()
+                os.fsync(handle.fileno())
+        with open(self.index_path, "r+b") as index_file:
+            index_file.seek(self.pruned_height * _OFFSET.size)
+            index_file.write(b"".join(_OFFSET.pack(entry) for entry in entries))
+            index_file.flush()
+            os.fsync(index_file.fileno())
+        self._offsets[self.pruned_height:height] = entries
+        pruned = height - self.pruned_height
+        self.pruned_height = height
+        self._drop_pruned_segments()
+        return pruned
+
+    def find_invalid_header(self, start, end, check_target=False):
+        """
+        Valide les blocs élagués d'index [start, end) à partir de leurs seuls en-têtes, sans lire l'archive :
+        hash de l'en-tête, chaînage, horodatage et, pour une chaîne PoW, respect de la cible de l'en-tête.
+        :return: l'index du premier bloc invalide, ou None
+        """
+        previous = self.read_header(start - 1)
+        previous_hash = hashlib.sha256(previous).hexdigest()
+        previous_timestamp = decode_header(previous)[0]["timestamp"]
+        for index in range(start, min(end, self.pruned_height)):
+            header = self.read_header(index)
+            fields, offset = decode_header(header)
+            block_hash = hashlib.sha256(header).hexdigest()
+            if fields["index"] != index or fields["previous_hash"] != previous_hash:
+                return index
+            if fields["timestamp"] < previous_timestamp:
+                return index
+            if check_target and not hash_meets_target(block_hash, decode_target(header, offset)[0]):
+                return index
+            previous_hash, previous_timestamp = block_hash, fields["timestamp"]
+        return None
+
+    def close(self):
+        """
+        Synchronise et ferme le stockage.
+        """
+        if self._log.closed:
+            return
+        self.flush()
+        while self._maps:
+            self._maps.popitem()[1].close()
+        if self._archive is not None:
+            self._archive.close()
+            self._archive = None
+        self._log.close()
+        self._index.close()
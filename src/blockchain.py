@@ -1,13 +1,35 @@
 from src.block import Block
+from src.base_blockchain import BaseBlockchain
+from src.encoding import ENCODING_BINARY
+from src.validation import find_first_invalid_block
 import time
 import random
 
-class Blockchain:
-    def __init__(self):
-
-        self.chain = [self.create_genesis_block()]
+class Blockchain(BaseBlockchain):
+    def __init__(self, encoding=ENCODING_BINARY, store=None, prune_depth=None):
+        """
+        :param encoding: mode de hachage des blocs (ENCODING_JSON pour recréer/vérifier une chaîne hachée à l'ancienne)
+        :param store: BlockStore optionnel ; la chaîne est alors persistée sur disque à chaque add_block
+                      et un stockage existant est rouvert sans recréer le bloc génésis. self.chain est alors une
+                      vue sur le stockage : les blocs sont chargés à la demande et gardés dans un cache LRU borné
+        :param prune_depth: si renseigné (avec un store), seuls les corps des prune_depth derniers blocs restent
+                            dans le journal ; les plus anciens sont archivés (voir prune)
+        """
+        if prune_depth is not None and store is None:
+            raise ValueError("L'élagage des blocs nécessite un BlockStore")
+        self.encoding = encoding
+        self.store = store
+        self.prune_depth = prune_depth
+        if store is None:
+            self.chain = [self.create_genesis_block()]
+        else:
+            if len(store) == 0:
+                store.append(self.create_genesis_block())
+            self.chain = store
         self.pending_transactions = []
         self.pending_rollbacks = []  # liste des fonctions à appeler pour undo
+        self._init_validation()
+        self._init_lookup_index()
 
     def create_genesis_block(self):
         """
@@ -17,7 +39,8 @@ class Blockchain:
             index=0,
             previous_hash="0",
             transactions=["Genesis Block"],
-            timestamp=time.time()
+            timestamp=time.time(),
+            encoding=self.encoding
         )
     
     def create_candidate_block(self, transactions):
@@ -30,17 +53,12 @@ class Blockchain:
             index=last_block.index + 1,
             previous_hash=last_block.hash,
             transactions=transactions,
-            timestamp=time.time()
+            timestamp=time.time(),
+            encoding=self.encoding
         )
         return candidate
 
 
-    def get_last_block(self):
-        """
-        Retourne le dernier bloc de la chaîne.
-        """
-        return self.chain[-1]
-
     def add_transaction(self, transaction):
         """
         Ajoute une transaction à la liste des transactions en attente.
@@ -48,51 +66,84 @@ class Blockchain:
         """
         self.pending_transactions.append(transaction)
 
-
-
-    def add_block(self, validator, pbft_signature):
+    def add_block(self, validator, pbft_signature, block=None):
         """
         Ajoute un nouveau bloc à la chaîne à partir des transactions en attente.
         Le bloc est validé par le validateur sélectionné et reçoit une signature issue du consensus PBFT.
+        Si un bloc candidat (create_candidate_block) est fourni, il est scellé et ajouté tel quel :
+        son corps n'est ni recopié ni rehaché, seul l'en-tête l'est.
         Après ajout, la liste des transactions en attente est vidée.
         :param validator: Identifiant du validateur ayant validé le bloc
         :param pbft_signature: Signature générée via le consensus PBFT
+        :param block: Bloc candidat déjà construit, ou None pour le construire depuis les transactions en attente
         """
         last_block = self.get_last_block()
-        new_block = Block(
-            index=last_block.index + 1,
-            previous_hash=last_block.hash,
-            transactions=self.pending_transactions,
-            timestamp=time.time(),
-            validator = validator,
-            pbft_signature = pbft_signature
-        )
+        if block is None:
+            block = self.create_candidate_block(self.pending_transactions)
+        elif block.index != last_block.index + 1 or block.previous_hash != last_block.hash:
+            raise ValueError(f"Le bloc candidat {block.index} ne prolonge pas le dernier bloc de la chaîne")
         # Ajout des attributs spécifiques à PoS et PBFT
+        new_block = block.seal(validator, pbft_signature)
         
         self.chain.append(new_block)
+        self._index_block(new_block)
         self.pending_transactions = []
         self.pending_rollbacks = []
+        self._maybe_prune()
         print(f"Block {new_block.index} ajouté avec succès !")
 
-    def is_chain_valid(self):
+    def find_invalid_block(self, workers=2):
+        """
+        Valide toute la chaîne en parallèle sur un pool de processus (audit).
+        :param workers: nombre de processus
+        :return: l'index du premier bloc invalide, ou None si la chaîne est valide
+        """
+        return find_first_invalid_block(self.chain, workers)
+
+    def is_chain_valid(self, full=False, workers=1):
         """
         Vérifie l'intégrité de la blockchain en s'assurant que :
           - Le hash de chaque bloc correspond bien au recalcul de ses données.
           - Les timestamps sont cohérents (le bloc courant est créé après le précédent).
           - Chaque bloc référence correctement le hash du bloc précédent.
+        La validation est incrémentale : seuls les blocs situés après le watermark (dernière hauteur validée)
+        sont vérifiés. Réaffecter un champ haché d'un bloc déjà validé abaisse le watermark (le bloc sera revérifié) ;
+        ses transactions, gelées, ne peuvent pas être modifiées sur place.
+        :param full: si True, revalide toute la chaîne depuis le génésis en réencodant chaque bloc (audit)
+        :param workers: si supérieur à 1, la validation complète est répartie sur ce nombre de processus
         :return: True si la blockchain est valide, False sinon.
         """
-        for i in range(1, len(self.chain)):
+        if workers > 1:
+            invalid_index = self.find_invalid_block(workers)
+            if invalid_index is not None:
+                print(f"Invalid block at index {invalid_index}")
+                self._set_watermark(invalid_index - 1, 1)
+                return False
+            self._set_watermark(len(self.chain) - 1, 1)
+            return True
+        start = self._validation_start(full)
+        first_unpruned, invalid_index = self._validate_pruned_headers(start)
+        if invalid_index is not None:
+            print(f"Invalid header at block {invalid_index}")
+            self._set_watermark(invalid_index - 1, start)
+            return False
+        for i in range(first_unpruned, len(self.chain)):
             current = self.chain[i]
             previous = self.chain[i - 1]
+            if full:
+                current.invalidate_cache()
             if current.hash != current.calculate_hash():
                 print(f"Hash mismatch at block {current.index}")
+                self._set_watermark(i - 1, start)
                 return False
                 
             if current.timestamp < previous.timestamp:
                 print(f"Timestamp mismatch at block {current.index}")
+                self._set_watermark(i - 1, start)
                 return False
             if current.previous_hash != previous.hash:
                 print(f"Previous hash mismatch at block {current.index}")
+                self._set_watermark(i - 1, start)
                 return False
+        self._set_watermark(len(self.chain) - 1, start)
         return True
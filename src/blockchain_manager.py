@@ -1,30 +1,73 @@
+import json
+import os
 import time
 from src.blockchain import Blockchain
+from src.chain_index import ChainIndex, address_keys, token_keys
 from src.token_manager import TokenManager
+from src.token_table import creation_identifiers
 from src.wallet_manager import WalletManager
 from src.pbft import PBFT  
+from src.replay import ReplayEngine, apply_transaction, iter_blocks
 import random
 
 class BlockchainManager(Blockchain):
-    def __init__(self, initial_supply=100, origin_wallet="wallet_creator", transaction_threshold=2):
-        super().__init__()
+    def __init__(self, initial_supply=100, origin_wallet="wallet_creator", transaction_threshold=2, store=None,
+                 ledger=None, snapshots=None, prune_depth=None, fungible=False, mint_seed=None, mint_workers=None):
+        """
+        :param store: BlockStore optionnel pour persister la chaîne. Si le stockage contient déjà des blocs,
+                      la chaîne est rouverte telle quelle, l'offre initiale n'est pas recréée et l'état est
+                      reconstruit par restore_state.
+        :param ledger: LedgerStore optionnel (SQLite) tenu à jour à chaque bloc committé ; les historiques
+                       par token sont alors lus via ses index au lieu de parcourir la chaîne
+        :param snapshots: SnapshotStore optionnel ; l'état (wallets, tokens, stakes) y est écrit périodiquement
+                          et, à la réouverture, le dernier snapshot est chargé puis seuls les blocs suivants sont rejoués
+        :param prune_depth: profondeur au-delà de laquelle les corps des blocs sont archivés (voir Blockchain.prune)
+        :param fungible: si True, les tokens sont comptés comme des unités interchangeables : l'offre initiale
+                         crédite un montant au wallet d'origine et les crédits des wallets se font par transfer_amount
+                         (une transaction par mouvement, quel que soit le nombre d'unités)
+        :param mint_seed: graine optionnelle pour des identifiants de tokens initiaux déterministes
+        :param mint_workers: nombre de processus pour hacher l'offre initiale (voir TokenManager.bulk_mint)
+        """
+        reopened = store is not None and len(store) > 0
+        super().__init__(store=store, prune_depth=prune_depth)
+        # Index token -> (bloc, position) et wallet -> (bloc, position) des transactions,
+        # persistés à côté des blocs s'il y a un stockage
+        self.token_index = ChainIndex(token_keys, os.path.join(store.path, "tokens.idx") if store is not None else None)
+        self.address_index = ChainIndex(address_keys,
+                                        os.path.join(store.path, "addresses.idx") if store is not None else None)
+        if store is not None:
+            store.on_sync.extend((self.token_index.sync, self.address_index.sync))
+        self.update_indexes()
         self.token_manager = TokenManager(max_tokens=initial_supply)  # Gestionnaire de tokens
-        self.wallet_manager = WalletManager() 
+        self.wallet_manager = WalletManager(registry=self.token_manager.registry)
         self.validators = []             # Liste des validateurs
         self.manual_votes = {}           # Dictionnaire pour les votes manuels des validateurs
         self.stakes = {}                 # Dictionnaire associant validateur et montant staké
         self.pbft = PBFT(self.validators, self.stakes) 
         self.transaction_threshold = transaction_threshold  # Seuil d'automatisme de commit
         self.origin_wallet = origin_wallet
-        
-
+        self.fungible = fungible
+        self.mint_seed = mint_seed
+        self.mint_workers = mint_workers
+        self.ledger = ledger
+        self.snapshots = snapshots
+        if reopened:
+            self.restore_state()
+        if ledger is not None:
+            # Le registre est synchronisé à chaque bloc, le stockage par groupes : après un arrêt brutal, les blocs
+            # enregistrés au-delà de la fin du stockage sont retirés du registre
+            ledger.rollback(len(self.chain), self.wallet_manager)
+            # Rattrapage des blocs déjà présents dans la chaîne (génésis, ou stockage rouvert), une fois l'état
+            # reconstruit : l'état final d'un wallet est aussi celui qui suit le dernier bloc rattrapé qui le touche
+            for index in range(len(ledger), len(self.chain)):
+                ledger.record_block(self.chain[index], self.wallet_manager)
         # Création (ou récupération) du wallet d'origine
         try:
             self.wallet_manager.get_wallet(self.origin_wallet)
         except ValueError:
             self.wallet_manager.create_wallet(self.origin_wallet)
         # Création de l'offre initiale et commit immédiat des transactions de création si token n'est pas à 0
-        if initial_supply > 0:
+        if initial_supply > 0 and not reopened:
             self.create_initial_supply(count=initial_supply + 3 , origin_wallet=self.origin_wallet)
         
     def add_transaction(self, transaction):
@@ -41,6 +84,78 @@ class BlockchainManager(Blockchain):
         if len(self.pending_transactions) >= self.transaction_threshold:
             self.commit_pending_transactions()
             
+    def add_block(self, validator, pbft_signature, block=None):
+        """
+        Ajoute le bloc à la chaîne puis, si un registre SQLite est configuré, y enregistre le bloc,
+        ses transactions et l'état des wallets touchés (une transaction SQL par bloc).
+        """
+        super().add_block(validator, pbft_signature, block=block)
+        last_block = self.get_last_block()
+        self.token_index.add_block(last_block)
+        self.address_index.add_block(last_block)
+        if self.ledger is not None:
+            self.ledger.record_block(last_block, self.wallet_manager)
+        if self.snapshots is not None and self.snapshots.should_snapshot(last_block.index):
+            self.save_snapshot()
+
+    def save_snapshot(self):
+        """
+        Écrit un snapshot de l'état courant, étiqueté par le dernier bloc de la chaîne.
+        """
+        if self.snapshots is None:
+            raise ValueError("Aucun répertoire de snapshots n'est configuré pour cette blockchain")
+        last_block = self.get_last_block()
+        self.snapshots.save(last_block.index, last_block.hash, self.token_manager,
+                            self.wallet_manager, self.validators, self.stakes)
+
+    def restore_state(self):
+        """
+        Reconstruit l'état (wallets, tokens, validateurs et stakes) d'une chaîne rouverte :
+        chargement du dernier snapshot cohérent avec la chaîne, puis rejeu des seuls blocs suivants.
+        Sans snapshot, toute la chaîne est rejouée.
+        :return: la hauteur à partir de laquelle les blocs ont été rejoués
+        """
+        state = self.snapshots.load_latest(self.chain) if self.snapshots is not None else None
+        start = 1
+        if state is not None:
+            self.token_manager.max_tokens = state["max_tokens"]
+            self.token_manager.load_tokens(state["tokens"])
+            self.wallet_manager.wallets = {}
+            for address, (available, staked) in state["wallets"].items():
+                wallet = self.wallet_manager.create_wallet(address)
+                wallet.available_tokens.update(available)
+                wallet.staked_tokens.update(staked)
+                wallet.available_amount, wallet.staked_amount = state["amounts"].get(address, (0, 0))
+            self.validators[:] = state["validators"]
+            self.stakes.clear()
+            self.stakes.update(state["stakes"])
+            start = state["height"] + 1
+        for block in iter_blocks(self.chain, start):
+            self.apply_block(block)
+        return start
+
+    def apply_block(self, block):
+        """
+        Applique les transactions d'un bloc déjà validé à l'état (rejeu de la chaîne).
+        """
+        for transaction in block.transactions:
+            if isinstance(transaction, dict):
+                self.apply_transaction(transaction)
+
+    def apply_transaction(self, transaction):
+        """
+        Applique une transaction committée à l'état, sans l'ajouter à la file d'attente.
+        """
+        apply_transaction(transaction, self.wallet_manager, self.validators, self.stakes, self.token_manager)
+
+    def verify_wallets(self):
+        """
+        Reconstruit en flux l'état des wallets à partir de la chaîne seule et le compare aux wallets courants.
+        Les transactions encore en attente ne sont pas dans la chaîne : elles apparaissent comme des écarts.
+        :return: liste des écarts (vide si les wallets correspondent à la chaîne), voir ReplayEngine.verify
+        """
+        return ReplayEngine().run(self.chain).verify(self.wallet_manager)
+
     def commit_pending_transactions(self):
         """
         Exécute le processus de consensus PBFT pour valider et ajouter le bloc contenant les transactions en attente.
@@ -52,8 +167,9 @@ class BlockchainManager(Blockchain):
 
         print("\n⛓️ Lancement du consensus PBFT...")
 
-        # Création du bloc candidat en utilisant la méthode dédiée de la classe Blockchain
-        candidate_block = self.create_candidate_block(self.pending_transactions.copy())
+        # Création du bloc candidat en utilisant la méthode dédiée de la classe Blockchain.
+        # La liste en attente est reprise telle quelle : elle est remplacée (et non vidée) après le commit.
+        candidate_block = self.create_candidate_block(self.pending_transactions)
 
         # Affichage des transactions du bloc candidat avec leur type
         print("Transactions dans le bloc candidat :")
@@ -68,6 +184,18 @@ class BlockchainManager(Blockchain):
                 print("  - Staking du token {} pour {}".format(tx.get("token_id"), tx.get("address")))
             elif action == "unstake":
                 print("  - Unstaking du token {} pour {}".format(tx.get("token_id"), tx.get("address")))
+            elif action == "transfer_batch":
+                print("  - Transfert de {} tokens de {} vers {}".format(len(tx.get("token_ids", [])), tx.get("from"), tx.get("to")))
+            elif action == "stake_batch":
+                print("  - Staking de {} tokens pour {}".format(len(tx.get("token_ids", [])), tx.get("address")))
+            elif action == "unstake_batch":
+                print("  - Unstaking de {} tokens pour {}".format(len(tx.get("token_ids", [])), tx.get("address")))
+            elif action == "transfer_amount":
+                print("  - Transfert de {} unités de {} vers {}".format(tx.get("amount"), tx.get("from"), tx.get("to")))
+            elif action == "stake_amount":
+                print("  - Staking de {} unités pour {}".format(tx.get("amount"), tx.get("address")))
+            elif action == "unstake_amount":
+                print("  - Unstaking de {} unités pour {}".format(tx.get("amount"), tx.get("address")))
             else:
                 print("  - Transaction de type {}: {}".format(action, tx))
 
@@ -90,7 +218,8 @@ class BlockchainManager(Blockchain):
 
         if success:
             signature = self.pbft.get_consensus_signature(candidate_block)
-            self.add_block(leader, signature)
+            # Le bloc candidat est scellé (en-tête seulement) plutôt que reconstruit
+            self.add_block(leader, signature, block=candidate_block)
             print(f"✅ Bloc {candidate_block.index} ajouté !\n")
             #Print hash 
             print(f"Hash du bloc {candidate_block.index} : {candidate_block.hash}\n")
@@ -102,8 +231,8 @@ class BlockchainManager(Blockchain):
                     undo()
                 except Exception as e:
                     print(f"[ROLLBACK ERREUR] {e}")
-            self.pending_transactions.clear()
-            self.pending_rollbacks.clear()
+            self.pending_transactions = []
+            self.pending_rollbacks = []
 
 
     def decide_vote(self, validator, block):
@@ -131,20 +260,26 @@ class BlockchainManager(Blockchain):
         self.transaction_threshold = 10**9  # Valeur très élevée pour éviter les commits intermédiaires
 
         # --- Création des tokens initiaux ---
-        tokens = self.token_manager.create_initial_tokens(count)
+        # Création en bloc : identifiants et hashes par lots, table en colonnes (pas d'objet Token par token)
+        tokens = self.token_manager.bulk_mint(count, seed=self.mint_seed, workers=self.mint_workers)
         try:
             owner_wallet = self.wallet_manager.get_wallet(origin_wallet)
         except ValueError:
             owner_wallet = self.wallet_manager.create_wallet(origin_wallet)
-        for token in tokens:
-            owner_wallet.deposit_token(token.identifier, stake=False)
-        token_data = [token.to_dict() for token in tokens]
-        # Ajout de la transaction de création des tokens
-        self.pending_transactions.append({
+        if self.fungible:
+            owner_wallet.deposit_amount(len(tokens))
+        else:
+            owner_wallet.deposit_tokens(tokens.identifiers)
+        # Ajout de la transaction de création des tokens, en colonnes (un dictionnaire par token coûterait
+        # autant d'objets à construire puis à geler dans le bloc)
+        creation = {
             "action": "token_creation",
-            "owner": origin_wallet,
-            "tokens": token_data
-        })
+            "owner": origin_wallet
+        }
+        creation.update(tokens.to_columns())
+        if self.fungible:
+            creation["fungible"] = True
+        self.pending_transactions.append(creation)
         
         # --- Création et staking des wallets initiaux ---
         # On crée et crédite trois wallets de base, puis on stake 1 token pour chacun.
@@ -177,7 +312,8 @@ class BlockchainManager(Blockchain):
         def undo():
             w_to = self.wallet_manager.get_wallet(to_address)
             w_from = self.wallet_manager.get_wallet(from_address)
-            w_to.withdraw_token(token_id)
+            if not w_to.withdraw_token(token_id):
+                raise ValueError(f"Retour arrière impossible : le token {token_id} n'est plus dans le wallet {to_address}")
             w_from.deposit_token(token_id, stake=False)
         self.pending_rollbacks.append(undo)
         tx = {
@@ -200,7 +336,8 @@ class BlockchainManager(Blockchain):
             raise ValueError(f"Token {token_id} n'est pas disponible dans le wallet {address} pour être staké")
         wallet.stake_token(token_id)
         def undo():
-            self.wallet_manager.get_wallet(address).unstake_token(token_id)
+            if not self.wallet_manager.get_wallet(address).unstake_token(token_id):
+                raise ValueError(f"Retour arrière impossible : le token {token_id} n'est plus staké par {address}")
         self.pending_rollbacks.append(undo)
         transaction = {
             "action": "stake",
@@ -208,8 +345,10 @@ class BlockchainManager(Blockchain):
             "address": address,
             "timestamp": time.time()
         }
-        self.add_transaction(transaction)
+        # Le validateur est inscrit avant la mise en file : un commit automatique (et un éventuel snapshot)
+        # voit ainsi déjà ce stake
         self.register_validator(address, stake=1)
+        self.add_transaction(transaction)
         return transaction
 
     def unstake_token(self, token_id, address):
@@ -222,7 +361,8 @@ class BlockchainManager(Blockchain):
             raise ValueError(f"Token {token_id} n'est pas en staking dans le wallet {address}")
         wallet.unstake_token(token_id)
         def undo():
-            self.wallet_manager.get_wallet(address).stake_token(token_id)
+            if not self.wallet_manager.get_wallet(address).stake_token(token_id):
+                raise ValueError(f"Retour arrière impossible : le token {token_id} n'est plus disponible dans {address}")
         self.pending_rollbacks.append(undo)
         transaction = {
             "action": "unstake",
@@ -233,44 +373,283 @@ class BlockchainManager(Blockchain):
         self.add_transaction(transaction)
         return transaction
 
-    def get_token_history(self, token_id):
-        """Retourne l'historique des transactions pour un token spécifique."""
+    @staticmethod
+    def _batch(token_ids):
+        """Retourne la liste des tokens d'un lot, sans doublon ; un lot vide est refusé."""
+        token_ids = list(dict.fromkeys(token_ids))
+        if not token_ids:
+            raise ValueError("Aucun token dans le lot")
+        return token_ids
+
+    def transfer_tokens(self, token_ids, from_address, to_address):
+        """
+        Transfère un lot de tokens d'un wallet à un autre. Les soldes sont vérifiés avant tout mouvement :
+        si un seul token n'est pas disponible, rien n'est transféré. Le lot est enregistré comme une seule
+        transaction transfer_batch, avec un seul retour arrière.
+        """
+        token_ids = self._batch(token_ids)
+        from_w = self.wallet_manager.get_wallet(from_address)
+        to_w = self.wallet_manager.get_wallet(to_address)
+        if not from_w.withdraw_tokens(token_ids):
+            missing = sum(1 for token_id in token_ids if token_id not in from_w.available_tokens)
+            raise ValueError(f"{missing} token(s) du lot non disponible(s) dans le wallet {from_address}")
+        to_w.deposit_tokens(token_ids)
+        def undo():
+            if not self.wallet_manager.get_wallet(to_address).withdraw_tokens(token_ids):
+                raise ValueError(f"Retour arrière impossible : le lot n'est plus dans le wallet {to_address}")
+            self.wallet_manager.get_wallet(from_address).deposit_tokens(token_ids)
+        self.pending_rollbacks.append(undo)
+        transaction = {
+            "action": "transfer_batch",
+            "token_ids": token_ids,
+            "from": from_address,
+            "to": to_address,
+            "timestamp": time.time()
+        }
+        self.add_transaction(transaction)
+        return transaction
+
+    def stake_tokens(self, token_ids, address):
+        """
+        Stake un lot de tokens du wallet spécifié en une seule transaction stake_batch (tout ou rien).
+        """
+        token_ids = self._batch(token_ids)
+        wallet = self.wallet_manager.get_wallet(address)
+        if not wallet.stake_tokens(token_ids):
+            missing = sum(1 for token_id in token_ids if token_id not in wallet.available_tokens)
+            raise ValueError(f"{missing} token(s) du lot non disponible(s) dans le wallet {address} pour être stakés")
+        def undo():
+            if not self.wallet_manager.get_wallet(address).unstake_tokens(token_ids):
+                raise ValueError(f"Retour arrière impossible : le lot n'est plus staké par {address}")
+        self.pending_rollbacks.append(undo)
+        transaction = {
+            "action": "stake_batch",
+            "token_ids": token_ids,
+            "address": address,
+            "timestamp": time.time()
+        }
+        self.register_validator(address, stake=len(token_ids))
+        self.add_transaction(transaction)
+        return transaction
+
+    def unstake_tokens(self, token_ids, address):
+        """
+        Unstake un lot de tokens du wallet spécifié en une seule transaction unstake_batch (tout ou rien).
+        """
+        token_ids = self._batch(token_ids)
+        wallet = self.wallet_manager.get_wallet(address)
+        if not wallet.unstake_tokens(token_ids):
+            missing = sum(1 for token_id in token_ids if token_id not in wallet.staked_tokens)
+            raise ValueError(f"{missing} token(s) du lot ne sont pas en staking dans le wallet {address}")
+        def undo():
+            if not self.wallet_manager.get_wallet(address).stake_tokens(token_ids):
+                raise ValueError(f"Retour arrière impossible : le lot n'est plus disponible dans {address}")
+        self.pending_rollbacks.append(undo)
+        transaction = {
+            "action": "unstake_batch",
+            "token_ids": token_ids,
+            "address": address,
+            "timestamp": time.time()
+        }
+        self.add_transaction(transaction)
+        return transaction
+
+    def transfer_amount(self, from_address, to_address, amount):
+        """
+        Transfère un montant d'unités fongibles d'un wallet à un autre, enregistré comme une seule transaction
+        (et un seul retour arrière) quel que soit le montant.
+        """
+        if amount <= 0:
+            raise ValueError(f"Montant invalide : {amount}")
+        from_w = self.wallet_manager.get_wallet(from_address)
+        to_w = self.wallet_manager.get_wallet(to_address)
+        if not from_w.withdraw_amount(amount):
+            raise ValueError(f"Solde insuffisant dans le wallet {from_address} pour transférer {amount} unités")
+        to_w.deposit_amount(amount)
+        def undo():
+            if not self.wallet_manager.get_wallet(to_address).withdraw_amount(amount):
+                raise ValueError(f"Retour arrière impossible : le wallet {to_address} n'a plus {amount} unités")
+            self.wallet_manager.get_wallet(from_address).deposit_amount(amount)
+        self.pending_rollbacks.append(undo)
+        transaction = {
+            "action": "transfer_amount",
+            "amount": amount,
+            "from": from_address,
+            "to": to_address,
+            "timestamp": time.time()
+        }
+        self.add_transaction(transaction)
+        return transaction
+
+    def stake_amount(self, address, amount):
+        """
+        Déplace un montant d'unités fongibles du solde disponible vers le solde staké, en une transaction.
+        """
+        if amount <= 0:
+            raise ValueError(f"Montant invalide : {amount}")
+        wallet = self.wallet_manager.get_wallet(address)
+        if not wallet.stake_amount(amount):
+            raise ValueError(f"Solde insuffisant dans le wallet {address} pour staker {amount} unités")
+        def undo():
+            if not self.wallet_manager.get_wallet(address).unstake_amount(amount):
+                raise ValueError(f"Retour arrière impossible : le wallet {address} n'a plus {amount} unités stakées")
+        self.pending_rollbacks.append(undo)
+        transaction = {
+            "action": "stake_amount",
+            "amount": amount,
+            "address": address,
+            "timestamp": time.time()
+        }
+        self.register_validator(address, stake=amount)
+        self.add_transaction(transaction)
+        return transaction
+
+    def unstake_amount(self, address, amount):
+        """
+        Déplace un montant d'unités fongibles du solde staké vers le solde disponible, en une transaction.
+        """
+        if amount <= 0:
+            raise ValueError(f"Montant invalide : {amount}")
+        wallet = self.wallet_manager.get_wallet(address)
+        if not wallet.unstake_amount(amount):
+            raise ValueError(f"Le wallet {address} n'a pas {amount} unités en staking")
+        def undo():
+            if not self.wallet_manager.get_wallet(address).stake_amount(amount):
+                raise ValueError(f"Retour arrière impossible : le wallet {address} n'a plus {amount} unités disponibles")
+        self.pending_rollbacks.append(undo)
+        transaction = {
+            "action": "unstake_amount",
+            "amount": amount,
+            "address": address,
+            "timestamp": time.time()
+        }
+        self.add_transaction(transaction)
+        return transaction
+
+    def get_token_history(self, token_id, with_proofs=False):
+        """
+        Retourne l'historique des transactions pour un token spécifique.
+        Les transactions sont retrouvées via l'index des tokens : seuls les blocs concernés sont lus.
+        :param with_proofs: si True, chaque événement est accompagné de la preuve d'inclusion (Merkle)
+                            de sa transaction, vérifiable avec verify_proof sans rehacher le bloc
+        """
+        if self.ledger is not None:
+            return self._get_token_history_from_ledger(token_id, with_proofs)
         token_transactions = []
-        for block in self.chain:
-            for transaction in block.transactions:
-                # Si la transaction individuelle concerne ce token
-                if isinstance(transaction, dict) and transaction.get("token_id") == token_id:
-                    t = transaction.copy()
-                    t["block_hash"] = block.hash
-                    t["block_index"] = block.index
-                    token_transactions.append(t)
-                # Pour une transaction groupée de création
-                elif (isinstance(transaction, dict) and 
-                      transaction.get("action") == "token_creation" and 
-                      "tokens" in transaction):
-                    for token_data in transaction["tokens"]:
-                        if token_data.get("identifier") == token_id:
-                            creation_info = {
-                                "action": "creation",
-                                "token_id": token_id,
-                                "timestamp": block.timestamp,
-                                "block_hash": block.hash,
-                                "block_index": block.index
-                            }
-                            token_transactions.append(creation_info)
+        for block_index, position in self.token_index.get(token_id):
+            block = self.chain[block_index]
+            transaction = block.transactions[position]
+            if transaction.get("action") == "token_creation":
+                event = {
+                    "action": "creation",
+                    "token_id": token_id,
+                    "timestamp": block.timestamp,
+                    "block_hash": block.hash,
+                    "block_index": block.index
+                }
+            else:
+                event = transaction.copy()
+                if "token_ids" in transaction:
+                    # Transaction par lot : l'événement est rattaché au token demandé
+                    event["token_id"] = token_id
+                event["block_hash"] = block.hash
+                event["block_index"] = block.index
+            if with_proofs:
+                event["proof"] = self.get_transaction_proof(block.index, position)
+            token_transactions.append(event)
         return token_transactions
 
+    def update_indexes(self, rebuild=False):
+        """
+        Met à jour les index des tokens et des wallets avec les blocs de la chaîne non encore indexés.
+        :param rebuild: si True (ou si un index persisté ne correspond plus à la chaîne : plus haut qu'elle, ou
+                        hash du dernier bloc indexé différent), l'index est reconstruit depuis la chaîne
+        """
+        for index in (self.token_index, self.address_index):
+            if rebuild or not index.matches(self.chain):
+                index.rebuild(self.chain)
+            else:
+                index.update(self.chain)
+
+    def get_wallet_history(self, address, since_block=None, limit=100, offset=0):
+        """
+        Retourne, page par page, les transactions committées qui concernent un wallet (émetteur, destinataire,
+        adresse de stake/unstake ou propriétaire d'une création de tokens), dans l'ordre de la chaîne.
+        Grâce à l'index des wallets, le coût d'une page ne dépend que de sa taille, pas de l'activité du wallet.
+        :param since_block: index du premier bloc à considérer (inclus), ou None depuis le génésis
+        :param limit: nombre maximal de transactions retournées
+        :param offset: nombre de transactions à sauter à partir de since_block (page suivante dans un même bloc)
+        :return: liste de transactions complétées par block_index, block_hash et tx_position ; une création
+                 de tokens est résumée par le nombre de tokens créés
+        """
+        history = []
+        for block_index, position in self.address_index.get_page(address, since_block, offset, limit):
+            block = self.chain[block_index]
+            transaction = block.transactions[position]
+            if transaction.get("action") == "token_creation":
+                event = {
+                    "action": "token_creation",
+                    "owner": transaction.get("owner"),
+                    "token_count": len(creation_identifiers(transaction)),
+                    "timestamp": block.timestamp
+                }
+            else:
+                event = transaction.copy()
+            event["block_index"] = block_index
+            event["block_hash"] = block.hash
+            event["tx_position"] = position
+            history.append(event)
+        return history
+
+    def _get_token_history_from_ledger(self, token_id, with_proofs):
+        """
+        Historique d'un token lu dans le registre SQLite (recherche indexée), au même format que get_token_history.
+        """
+        token_transactions = []
+        block_hashes = {}
+        for row in self.ledger.get_token_history(token_id):
+            if row["block_index"] not in block_hashes:
+                block_hashes[row["block_index"]] = self.ledger.get_block(row["block_index"])["hash"]
+            block_hash = block_hashes[row["block_index"]]
+            if row["action"] == "creation":
+                event = {
+                    "action": "creation",
+                    "token_id": token_id,
+                    "timestamp": row["timestamp"],
+                    "block_hash": block_hash,
+                    "block_index": row["block_index"]
+                }
+            elif row["payload"] is None:
+                # Transaction par lot : non recopiée dans le registre, relue dans son bloc
+                event = self.chain[row["block_index"]].transactions[row["tx_position"]].copy()
+                event["token_id"] = token_id
+                event["block_hash"] = block_hash
+                event["block_index"] = row["block_index"]
+            else:
+                event = json.loads(row["payload"])
+                event["block_hash"] = block_hash
+                event["block_index"] = row["block_index"]
+            if with_proofs:
+                event["proof"] = self.get_transaction_proof(row["block_index"], row["tx_position"])
+            token_transactions.append(event)
+        return token_transactions
+
+    def get_wallet_transactions(self, address):
+        """
+        Retourne les mouvements de tokens impliquant un wallet, lus dans le registre SQLite.
+        """
+        if self.ledger is None:
+            raise ValueError("Aucun registre SQLite n'est configuré pour cette blockchain")
+        return self.ledger.get_wallet_transactions(address)
+
     def get_token_by_index(self, index):
         """Récupère un token par son index dans la liste des tokens."""
-        all_tokens = self.token_manager.get_all_tokens()
-        if 0 <= index < len(all_tokens):
-            return all_tokens[index]
-        return None
+        return self.token_manager.get_token_at(index)
 
     def get_staking_stats(self):
         all_tokens = self.token_manager.get_all_tokens()
         total_tokens = len(all_tokens)
-        total_staked = sum(len(wallet.staked_tokens) for wallet in self.wallet_manager.wallets.values())
+        total_staked = sum(wallet.staked_balance() for wallet in self.wallet_manager.wallets.values())
         staking_percentage = (total_staked / total_tokens * 100) if total_tokens > 0 else 0
         total_value = self.token_manager.get_tokens_value()
         single_value = total_value / total_tokens if total_tokens > 0 else 0
@@ -287,14 +666,21 @@ class BlockchainManager(Blockchain):
         Crée un nouveau wallet pour un utilisateur et le crédite automatiquement avec un nombre fixe de tokens
         provenant du wallet d'origine.
         """
-        new_wallet = self.wallet_manager.create_wallet(user_address)
+        if initial_credit < 0:
+            raise ValueError(f"Crédit initial invalide : {initial_credit}")
         origin = self.origin_wallet
         origin_wallet = self.wallet_manager.get_wallet(origin)
-        available_tokens = list(origin_wallet.available_tokens)
-        if len(available_tokens) < initial_credit:
+        # Vérification avant la création : un échec ne laisse pas de wallet créé mais non crédité
+        available = origin_wallet.available_amount if self.fungible else len(origin_wallet.available_tokens)
+        if available < initial_credit:
             raise ValueError("Tokens insuffisants dans le wallet d'origine pour créditer le nouveau wallet")
-        for token_id in available_tokens[:initial_credit]:
-            self.transfer_token(token_id, origin, user_address)
+        new_wallet = self.wallet_manager.create_wallet(user_address)
+        if initial_credit == 0:
+            return new_wallet
+        if self.fungible:
+            self.transfer_amount(origin, user_address, initial_credit)
+        else:
+            self.transfer_tokens(origin_wallet.first(initial_credit), origin, user_address)
         return new_wallet
     
     def create_initial_wallet(self, user_address, initial_credit=5):
@@ -304,23 +690,34 @@ class BlockchainManager(Blockchain):
         Cette fonction est destinée à être utilisée lors de l'initialisation de la blockchain
         et ajoute les transferts dans pending_transactions sans déclencher de commit.
         """
-        new_wallet = self.wallet_manager.create_wallet(user_address)
         origin = self.origin_wallet
         origin_wallet = self.wallet_manager.get_wallet(origin)
-        available_tokens = list(origin_wallet.available_tokens)
-        if len(available_tokens) < initial_credit:
+        available = origin_wallet.available_amount if self.fungible else len(origin_wallet.available_tokens)
+        if not 0 <= initial_credit <= available:
             raise ValueError("Tokens insuffisants dans le wallet d'origine pour créditer " + user_address)
-        for token_id in available_tokens[:initial_credit]:
-            origin_wallet.withdraw_token(token_id)
-            new_wallet.deposit_token(token_id, stake=False)
-            transaction = {
-                "action": "transfer",
-                "token_id": token_id,
+        new_wallet = self.wallet_manager.create_wallet(user_address)
+        if initial_credit == 0:
+            return new_wallet
+        if self.fungible:
+            origin_wallet.withdraw_amount(initial_credit)
+            new_wallet.deposit_amount(initial_credit)
+            self.pending_transactions.append({
+                "action": "transfer_amount",
+                "amount": initial_credit,
                 "from": origin,
                 "to": user_address,
                 "timestamp": time.time()
-            }
-            self.pending_transactions.append(transaction)
+            })
+            return new_wallet
+        token_ids = origin_wallet.take(initial_credit)
+        new_wallet.deposit_tokens(token_ids)
+        self.pending_transactions.append({
+            "action": "transfer_batch",
+            "token_ids": token_ids,
+            "from": origin,
+            "to": user_address,
+            "timestamp": time.time()
+        })
         return new_wallet
 
     
@@ -335,9 +732,15 @@ class BlockchainManager(Blockchain):
         """
         # Crée le wallet et effectue les transferts directs (sans commit)
         wallet = self.create_initial_wallet(user_address, initial_credit)
+        if self.fungible:
+            # Crédit nul ou stake_count à 0 : rien à staker (stake_amount refuse un montant nul)
+            amount = min(stake_count, wallet.available_amount)
+            if amount > 0:
+                self.stake_amount(user_address, amount)
+            return wallet
         # Pour chaque token à staker (au nombre de stake_count), on effectue le staking
         for _ in range(stake_count):
-            available = list(wallet.available_tokens)
+            available = wallet.first(1)
             if not available:
                 break
             token_id = available[0]  # On choisit le premier token disponible
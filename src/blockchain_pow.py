@@ -10,14 +10,70 @@
 
 
 from src.block_pow import BlockPow
+from src.miner import difficulty_to_target, hash_meets_target, retarget
+from src.base_blockchain import BaseBlockchain
+from src.encoding import ENCODING_BINARY, decode_header, decode_target
+from src.validation import find_first_invalid_block
 
+import asyncio
+import threading
 import time
 import hashlib
+from array import array
+from concurrent.futures import ThreadPoolExecutor
 
-class BlockchainPow:
-    def __init__(self, difficulty=2):
+
+class _MiningJob:
+    """
+    Minage en arrière-plan d'un bloc : transactions à inclure et signal d'interruption.
+    L'interruption sert à la fois à l'annulation et au redémarrage sur un nouveau dernier bloc.
+    """
+    def __init__(self, transactions):
+        self.transactions = transactions
+        self.interrupt = threading.Event()
+        self.cancelled = False
+
+
+class BlockchainPow(BaseBlockchain):
+    def __init__(self, difficulty=2, encoding=ENCODING_BINARY, workers=1, block_interval=None, retarget_interval=10,
+                 store=None, prune_depth=None):
+        """
+        :param difficulty: nombre de zéros hexadécimaux exigés en tête du hash (cible initiale)
+        :param encoding: mode de hachage des blocs (ENCODING_JSON pour les chaînes hachées à l'ancienne)
+        :param workers: nombre de processus utilisés pour miner chaque bloc
+        :param block_interval: intervalle visé entre deux blocs (secondes) ; None désactive l'ajustement de la cible
+        :param retarget_interval: nombre de blocs entre deux ajustements de la cible
+        :param store: BlockStore optionnel (block_cls=BlockPow) ; la chaîne est alors persistée sur disque
+                      et un stockage existant est rouvert sans miner de nouveau bloc génésis
+        :param prune_depth: si renseigné (avec un store), seuls les corps des prune_depth derniers blocs restent
+                            dans le journal ; les plus anciens sont archivés (voir prune)
+        """
+        if prune_depth is not None and store is None:
+            raise ValueError("L'élagage des blocs nécessite un BlockStore")
+        if block_interval is not None and block_interval <= 0:
+            raise ValueError(f"L'intervalle visé entre deux blocs doit être positif ({block_interval})")
+        if retarget_interval <= 0:
+            raise ValueError(f"Le nombre de blocs entre deux ajustements doit être positif ({retarget_interval})")
         self.difficulty = difficulty
-        self.chain = [self.create_genesis_block()]
+        self.initial_target = difficulty_to_target(difficulty)
+        self.block_interval = block_interval
+        self.retarget_interval = retarget_interval
+        self.encoding = encoding
+        self.workers = workers
+        self.store = store
+        self.prune_depth = prune_depth
+        if store is None:
+            self.chain = [self.create_genesis_block()]
+        else:
+            if len(store) == 0:
+                store.append(self.create_genesis_block())
+            self.chain = store
+        self._init_validation()
+        self._init_lookup_index()
+        # Minage en arrière-plan : un seul bloc miné à la fois, dans un thread dédié
+        self._lock = threading.RLock()
+        self._executor = None
+        self._mining_job = None
 
     def create_genesis_block(self):
         """
@@ -27,49 +83,257 @@ class BlockchainPow:
             index=0,
             previous_hash="0",
             transactions=["Genesis Block"],
-            difficulty=self.difficulty
+            difficulty=self.difficulty,
+            target=self.initial_target,
+            encoding=self.encoding,
+            workers=self.workers
         )
     
-    def get_last_block(self):
+    def expected_target(self, height):
         """
-        Retourne le dernier bloc de la chaîne.
+        Retourne la cible exigée pour le bloc de hauteur `height`, déduite des en-têtes précédents.
+        Tous les retarget_interval blocs, la cible est ajustée d'après la durée réelle des
+        retarget_interval derniers blocs comparée à la durée visée (block_interval par bloc).
         """
-        return self.chain[-1]
+        if height == 0:
+            return self.initial_target
+        return self._scheduled_target(height, self.chain[height - 1].target, lambda i: self.chain[i].timestamp)
+
+    def _scheduled_target(self, height, previous_target, timestamp_at):
+        """
+        Applique le calendrier d'ajustement de la cible au bloc de hauteur `height` (> 0).
+        :param previous_target: cible du bloc précédent
+        :param timestamp_at: fonction retournant l'horodatage du bloc d'index donné (blocs précédents seulement)
+        """
+        interval = self.retarget_interval
+        if self.block_interval is None or height <= interval or (height - 1) % interval:
+            return previous_target
+        actual_span = timestamp_at(height - 1) - timestamp_at(height - 1 - interval)
+        return retarget(previous_target, actual_span, interval * self.block_interval)
+
+    def _iter_targets(self):
+        """
+        Itère sur (cible, horodatage) de chaque bloc. Pour une chaîne stockée, seuls les en-têtes sont lus :
+        aucun bloc n'est désérialisé.
+        """
+        if self.store is None:
+            for block in self.chain:
+                yield block.target, block.timestamp
+            return
+        for index in range(len(self.store)):
+            header = self.store.read_header(index)
+            fields, offset = decode_header(header)
+            yield decode_target(header, offset)[0], fields["timestamp"]
+
+    def next_target(self):
+        """
+        Retourne la cible du prochain bloc à miner.
+        """
+        return self.expected_target(len(self.chain))
 
     def add_block(self, transactions):
         """
         Ajoute un nouveau bloc avec une liste de transactions.
+        Le minage est bloquant ; un éventuel minage en arrière-plan est redémarré sur le nouveau bloc.
         """
-        last_block = self.get_last_block()
-        new_block = BlockPow(
-            index=last_block.index + 1,
-            previous_hash=last_block.hash,
-            transactions=transactions,
-            difficulty=self.difficulty
-        )
-        self.chain.append(new_block)
+        with self._lock:
+            last_block = self.get_last_block()
+            new_block = BlockPow(
+                index=last_block.index + 1,
+                previous_hash=last_block.hash,
+                transactions=transactions,
+                difficulty=self.difficulty,
+                encoding=self.encoding,
+                workers=self.workers,
+                target=self.next_target()
+            )
+            self.chain.append(new_block)
+            self._index_block(new_block)
+            self._maybe_prune()
+            self._interrupt_mining()
 
-    def is_chain_valid(self):
+    def receive_block(self, block):
         """
-        Vérifie que la blockchain est valide (chaînage correct des hashes).
+        Reçoit un bloc concurrent (miné ailleurs) et l'ajoute s'il prolonge la chaîne.
+        Le minage en arrière-plan en cours est alors redémarré sur ce nouveau dernier bloc.
+        :return: True si le bloc a été ajouté, False s'il est invalide ou ne prolonge pas la chaîne
         """
-        for i in range(1, len(self.chain)):
-            current = self.chain[i]
-            previous = self.chain[i - 1]
-
-            # Vérifie si le hash du bloc est bien calculé
-            if current.hash != current.calculate_hash():
-                return False
-            
-            # Vérifie si le block de pointe est crée après le précédent
-            if current.timestamp < previous.timestamp:
-                return False
-            
-            # Vérifie si le bloc pointe correctement vers le précédent
-            if current.previous_hash != previous.hash:
+        with self._lock:
+            last_block = self.get_last_block()
+            if block.index != last_block.index + 1 or not self._is_block_valid(block, last_block):
                 return False
+            self.chain.append(block)
+            self._index_block(block)
+            self._maybe_prune()
+            self._interrupt_mining()
+        return True
+
+    def start_mining(self, transactions):
+        """
+        Lance le minage d'un bloc en arrière-plan et rend la main immédiatement.
+        Un minage déjà en cours est annulé. Si le dernier bloc change pendant le minage
+        (add_block, receive_block), le minage redémarre automatiquement sur le nouveau dernier bloc.
+        :return: concurrent.futures.Future résolu avec le bloc ajouté, ou None si le minage est annulé
+        """
+        return self._start_mining_job(transactions)[1]
+
+    async def mine_async(self, transactions):
+        """
+        Version asyncio de start_mining : annuler la tâche annule le minage.
+        :return: le bloc miné et ajouté à la chaîne, ou None si le minage a été annulé
+        """
+        job, future = self._start_mining_job(transactions)
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            self._cancel_mining_job(job)
+            raise
+
+    def cancel_mining(self):
+        """
+        Annule le minage en arrière-plan en cours (s'il y en a un).
+        Les processus de minage s'arrêtent en quelques millisecondes.
+        """
+        job = self._mining_job
+        if job is not None:
+            self._cancel_mining_job(job)
+
+    def _start_mining_job(self, transactions):
+        self.cancel_mining()
+        job = _MiningJob(transactions)
+        self._mining_job = job
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="miner")
+        return job, self._executor.submit(self._mine_in_background, job)
+
+    def _cancel_mining_job(self, job):
+        job.cancelled = True
+        job.interrupt.set()
+        if self._mining_job is job:
+            self._mining_job = None
+
+    def _interrupt_mining(self):
+        """
+        Signale au minage en arrière-plan que le dernier bloc a changé.
+        """
+        job = self._mining_job
+        if job is not None:
+            job.interrupt.set()
+
+    def _mine_in_background(self, job):
+        """
+        Boucle de minage exécutée dans le thread dédié : mine sur le dernier bloc courant
+        et recommence si celui-ci change avant que le bloc ne soit ajouté.
+        """
+        while not job.cancelled:
+            with self._lock:
+                job.interrupt.clear()
+                last_block = self.get_last_block()
+                target = self.next_target()
+            # Bloc non miné (nonce fourni) : le minage est lancé juste après, de façon interruptible
+            block = BlockPow(
+                index=last_block.index + 1,
+                previous_hash=last_block.hash,
+                transactions=job.transactions,
+                difficulty=self.difficulty,
+                nonce=0,
+                encoding=self.encoding,
+                target=target
+            )
+            hash_found = block.mine_block(self.workers, interrupt=job.interrupt)
+            if hash_found is None:
+                continue
+            block.hash = hash_found
+            with self._lock:
+                if not job.cancelled and self.get_last_block().hash == last_block.hash:
+                    self.chain.append(block)
+                    self._index_block(block)
+                    self._maybe_prune()
+                    if self._mining_job is job:
+                        self._mining_job = None
+                    return block
+        return None
+
+    def _is_block_valid(self, current, previous):
+        """
+        Vérifie un bloc par rapport au bloc qui le précède (hash, difficulté, horodatage, chaînage).
+        """
+        # Vérifie si le hash du bloc est bien calculé
+        if current.hash != current.calculate_hash():
+            return False
+
+        # Vérifie que la cible est celle imposée par l'ajustement de difficulté
+        # et que le hash lui est inférieur (comparaison entière sur 256 bits)
+        if current.target != self.expected_target(current.index):
+            return False
+        if not hash_meets_target(current.hash, current.target):
+            return False
+        
+        # Vérifie si le block de pointe est crée après le précédent
+        if current.timestamp < previous.timestamp:
+            return False
+        
+        # Vérifie si le bloc pointe correctement vers le précédent
+        if current.previous_hash != previous.hash:
+            return False
 
         return True
-    
 
+    def find_invalid_block(self, workers=2):
+        """
+        Valide toute la chaîne en parallèle sur un pool de processus (audit) : hashs, chaînage et cibles.
+        Le calendrier des cibles ne dépend que des en-têtes : il est vérifié ici (sans désérialiser les blocs
+        d'une chaîne stockée), le recalcul des hashs est réparti sur les processus.
+        :return: l'index du premier bloc invalide, ou None si la chaîne est valide
+        """
+        invalid_index = None
+        timestamps = array("d")
+        previous_target = None
+        for index, (target, timestamp) in enumerate(self._iter_targets()):
+            if index == 0:
+                expected = self.initial_target
+            else:
+                expected = self._scheduled_target(index, previous_target, timestamps.__getitem__)
+            if target != expected:
+                invalid_index = index
+                break
+            timestamps.append(timestamp)
+            previous_target = target
+        if invalid_index == 0:
+            return 0
+        # Seuls les blocs précédant une cible invalide restent à vérifier
+        hash_invalid_index = find_first_invalid_block(self.chain, workers, check_target=True, end=invalid_index)
+        return hash_invalid_index if hash_invalid_index is not None else invalid_index
+
+    def is_chain_valid(self, full=False, workers=1):
+        """
+        Vérifie que la blockchain est valide (chaînage correct des hashes, respect des cibles).
+        La validation est incrémentale : seuls les blocs situés après le watermark (dernière hauteur validée)
+        sont vérifiés. Réaffecter un champ haché d'un bloc déjà validé abaisse le watermark (le bloc sera revérifié) ;
+        ses transactions, gelées, ne peuvent pas être modifiées sur place.
+        :param full: si True, revalide toute la chaîne depuis le génésis en réencodant chaque bloc (audit)
+        :param workers: si supérieur à 1, la validation complète est répartie sur ce nombre de processus
+        """
+        if workers > 1:
+            invalid_index = self.find_invalid_block(workers)
+            if invalid_index is not None:
+                self._set_watermark(max(invalid_index - 1, 0), 1)
+                return False
+            self._set_watermark(len(self.chain) - 1, 1)
+            return True
+        start = self._validation_start(full)
+        if start == 1 and self.chain[0].target != self.initial_target:
+            return False
+        first_unpruned, invalid_index = self._validate_pruned_headers(start, check_target=True)
+        if invalid_index is not None:
+            self._set_watermark(invalid_index - 1, start)
+            return False
+        for i in range(first_unpruned, len(self.chain)):
+            if full:
+                self.chain[i].invalidate_cache()
+            if not self._is_block_valid(self.chain[i], self.chain[i - 1]):
+                self._set_watermark(i - 1, start)
+                return False
 
+        self._set_watermark(len(self.chain) - 1, start)
+        return True
@@ -0,0 +1,194 @@
+import mmap
+import os
+import struct
+from bisect import bisect_left
+from src.encoding import encode_str, decode_str
+from src.token_table import creation_identifiers
+
+# En-tête de chaque bloc dans le journal d'un index : index du bloc, hash du bloc et nombre d'entrées
+_BLOCK_ENTRY = struct.Struct(">Q32sI")
+_U32 = struct.Struct(">I")
+
+
+def token_keys(transaction):
+    """
+    Retourne les tokens concernés par une transaction : son token_id, chaque token d'une transaction
+    par lot (token_ids), ou chaque token créé pour une transaction token_creation.
+    """
+    if transaction.get("action") == "token_creation":
+        return list(creation_identifiers(transaction))
+    if "token_ids" in transaction:
+        return list(transaction["token_ids"])
+    token_id = transaction.get("token_id")
+    return [token_id] if token_id is not None else []
+
+
+def address_keys(transaction):
+    """
+    Retourne les wallets concernés par une transaction (champs from, to, address et owner), sans doublon.
+    """
+    addresses = []
+    for field in ("from", "to", "address", "owner"):
+        address = transaction.get(field)
+        if address is not None and address not in addresses:
+            addresses.append(address)
+    return addresses
+
+
+class ChainIndex:
+    """
+    Index secondaire de la chaîne : associe une clé (par exemple un token) à la liste des
+    positions (index du bloc, position de la transaction) des transactions qui la concernent,
+    dans l'ordre de la chaîne. Il est tenu à jour bloc par bloc, peut être reconstruit depuis la chaîne
+    et, si un fichier est fourni, persisté dans un journal en ajout seul à côté des blocs. Le journal
+    enregistre le hash de chaque bloc indexé : à la réouverture, un index qui ne correspond plus à la
+    chaîne (hauteur ou hash du dernier bloc) est détecté par matches et reconstruit.
+    """
+
+    def __init__(self, key_function, path=None):
+        """
+        :param key_function: fonction retournant les clés d'une transaction (voir token_keys)
+        :param path: fichier du journal de l'index, ou None pour un index uniquement en mémoire
+        """
+        self.key_function = key_function
+        self.path = path
+        self.entries = {}
+        # Nombre de blocs indexés (le prochain bloc attendu) et hash du dernier bloc indexé
+        self.height = 0
+        self.tip_hash = None
+        self._log = None
+        if path is not None:
+            self._load()
+            self._log = open(path, "ab")
+
+    def _load(self):
+        """
+        Relit le journal de l'index via une projection mémoire (sans en copier le contenu) ;
+        une fin incomplète (écriture interrompue) est éliminée.
+        """
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            return
+        with open(self.path, "rb") as index_file:
+            data = mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            valid_end = self._parse(data)
+            size = len(data)
+        finally:
+            data.close()
+        if valid_end < size:
+            with open(self.path, "r+b") as index_file:
+                index_file.truncate(valid_end)
+
+    def _parse(self, data):
+        """
+        Charge les entrées du journal bloc par bloc.
+        :return: la fin du dernier bloc complet
+        """
+        offset = 0
+        valid_end = 0
+        try:
+            while offset < len(data):
+                block_index, block_hash, count = _BLOCK_ENTRY.unpack_from(data, offset)
+                offset += _BLOCK_ENTRY.size
+                block_entries = []
+                for _ in range(count):
+                    key, offset = decode_str(data, offset)
+                    (position,) = _U32.unpack_from(data, offset)
+                    offset += _U32.size
+                    block_entries.append((key, position))
+                if offset > len(data) or block_index != self.height:
+                    break
+                for key, position in block_entries:
+                    self.entries.setdefault(key, []).append((block_index, position))
+                self.height = block_index + 1
+                self.tip_hash = block_hash.hex()
+                valid_end = offset
+        except (struct.error, UnicodeDecodeError):
+            pass
+        return valid_end
+
+    def matches(self, chain):
+        """
+        Indique si l'index porte sur un préfixe de la chaîne : pas plus de blocs indexés que la chaîne n'en a,
+        et même hash pour le dernier bloc indexé. Sinon (fin de la chaîne perdue ou remplacée après un arrêt
+        brutal), l'index doit être reconstruit.
+        """
+        if self.height > len(chain):
+            return False
+        return self.height == 0 or chain[self.height - 1].hash == self.tip_hash
+
+    def add_block(self, block):
+        """
+        Indexe les transactions d'un bloc (qui doit suivre le dernier bloc indexé).
+        """
+        if block.index != self.height:
+            raise ValueError(f"Le bloc {block.index} ne suit pas le dernier bloc indexé ({self.height - 1})")
+        block_entries = []
+        for position, transaction in enumerate(block.transactions):
+            if isinstance(transaction, dict):
+                for key in self.key_function(transaction):
+                    if key is not None:
+                        block_entries.append((key, position))
+        for key, position in block_entries:
+            self.entries.setdefault(key, []).append((block.index, position))
+        self.height = block.index + 1
+        self.tip_hash = block.hash
+        if self._log is not None:
+            parts = [_BLOCK_ENTRY.pack(block.index, bytes.fromhex(block.hash), len(block_entries))]
+            for key, position in block_entries:
+                parts.append(encode_str(key))
+                parts.append(_U32.pack(position))
+            self._log.write(b"".join(parts))
+            self._log.flush()
+
+    def update(self, chain):
+        """
+        Indexe les blocs de la chaîne qui ne le sont pas encore (après une réouverture, par exemple).
+        """
+        for index in range(self.height, len(chain)):
+            self.add_block(chain[index])
+
+    def rebuild(self, chain):
+        """
+        Reconstruit entièrement l'index à partir de la chaîne.
+        """
+        self.entries = {}
+        self.height = 0
+        self.tip_hash = None
+        if self._log is not None:
+            self._log.truncate(0)
+        self.update(chain)
+
+    def get(self, key):
+        """
+        Retourne les positions (index du bloc, position de la transaction) des transactions concernant la clé.
+        """
+        return self.entries.get(key, [])
+
+    def get_page(self, key, since_block=None, offset=0, limit=None):
+        """
+        Retourne une page des positions concernant la clé, sans parcourir les positions antérieures :
+        la première position du bloc since_block est trouvée par dichotomie.
+        :param since_block: index du premier bloc à considérer (inclus), ou None depuis le génésis
+        :param offset: nombre de positions à sauter à partir de since_block
+        :param limit: nombre maximal de positions retournées, ou None pour toutes
+        """
+        positions = self.entries.get(key, [])
+        start = bisect_left(positions, (since_block, -1)) if since_block is not None else 0
+        start += offset
+        end = len(positions) if limit is None else min(start + limit, len(positions))
+        return positions[start:end]
+
+    def sync(self):
+        """
+        Écrit le journal de l'index sur disque (fsync). Appelé à chaque synchronisation du BlockStore,
+        pour que l'index persisté suive les blocs persistés.
+        """
+        if self._log is not None and not self._log.closed:
+            self._log.flush()
+            os.fsync(self._log.fileno())
+
+    def close(self):
+        if self._log is not None and not self._log.closed:
+            self.sync()
+            self._log.close()
@@ -0,0 +1,58 @@
+import zlib
+
+# Identifiant du dictionnaire utilisé, écrit en tête de chaque corps compressé :
+# un nouveau dictionnaire reçoit un nouvel identifiant, les anciens corps restent lisibles
+DICTIONARY_ID = 1
+# Niveau de compression zlib (compromis entre taux et débit)
+COMPRESSION_LEVEL = 6
+
+# Dictionnaire statique pour le schéma des transactions (JSON compact, clés triées, voir encode_transaction).
+# zlib cherche les correspondances en priorité à la fin du dictionnaire : les fragments les plus fréquents
+# (transferts, identifiants de tokens, wallets) y sont placés en dernier.
+_DICTIONARIES = {
+    DICTIONARY_ID: b"".join((
+        b'Genesis Block',
+        b'{"action":"token_creation","owner":"wallet_creator","tokens":[',
+        b'{"created_at":17',
+        b',"hash":"',
+        b'","identifier":"',
+        b'"},',
+        b'{"action":"unstake","address":"wallet_',
+        b'{"action":"stake","address":"wallet_',
+        b'","timestamp":17',
+        b',"token_id":"',
+        b'"}',
+        b'{"action":"transfer","from":"wallet_creator","timestamp":17',
+        b',"to":"wallet_',
+        b'","token_id":"',
+        b'"}',
+        b'{"action":"transfer","from":"wallet_',
+        b'","timestamp":17',
+        b',"to":"wallet_',
+        b'","token_id":"',
+    )),
+}
+
+
+def compress_body(body, level=COMPRESSION_LEVEL):
+    """
+    Compresse un corps de bloc encodé avec zlib et le dictionnaire du schéma des transactions.
+    :return: identifiant du dictionnaire (1 octet) suivi des données compressées
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 15, 9, zlib.Z_DEFAULT_STRATEGY,
+                                  zdict=_DICTIONARIES[DICTIONARY_ID])
+    return bytes((DICTIONARY_ID,)) + compressor.compress(body) + compressor.flush()
+
+
+def decompress_body(data):
+    """
+    Décompresse un corps produit par compress_body, avec le dictionnaire indiqué dans son premier octet.
+    """
+    dictionary = _DICTIONARIES.get(data[0])
+    if dictionary is None:
+        raise ValueError(f"Dictionnaire de compression inconnu : {data[0]}")
+    decompressor = zlib.decompressobj(zdict=dictionary)
+    body = decompressor.decompress(bytes(data[1:])) + decompressor.flush()
+    if not decompressor.eof:
+        raise ValueError("Corps de bloc compressé tronqué")
+    return body
@@ -0,0 +1,203 @@
+import json
+import struct
+from src.compression import compress_body, decompress_body
+
+# Version du format binaire canonique des blocs (octet de tête de chaque en-tête)
+FORMAT_VERSION = 3
+
+# Modes de calcul du hash d'un bloc
+ENCODING_BINARY = "binary"  # encodage binaire canonique (par défaut)
+ENCODING_JSON = "json"      # compatibilité : chaînes hachées avec json.dumps(sort_keys=True)
+
+# Partie fixe de l'en-tête : version, index, timestamp
+_FIXED_HEADER = struct.Struct(">BQd")
+_U16 = struct.Struct(">H")
+_U32 = struct.Struct(">I")
+_U64 = struct.Struct(">Q")
+# Taille de la racine de Merkle des transactions dans l'en-tête
+MERKLE_ROOT_SIZE = 32
+# Taille de la cible de minage (entier de 256 bits) dans l'en-tête d'un bloc PoW
+TARGET_SIZE = 32
+# Longueur réservée pour encoder une chaîne à None
+_NONE_LEN = 0xFFFF
+# Longueur réservée signalant un corps compressé (suivi de la taille réelle des données compressées)
+_COMPRESSED_BODY = 0xFFFFFFFE
+
+
+def encode_str(value):
+    """
+    Encode une chaîne (ou None) préfixée par sa longueur sur 2 octets.
+    """
+    if value is None:
+        return _U16.pack(_NONE_LEN)
+    data = str(value).encode()
+    if len(data) >= _NONE_LEN:
+        raise ValueError("Chaîne trop longue pour l'en-tête du bloc")
+    return _U16.pack(len(data)) + data
+
+
+def decode_str(data, offset):
+    """
+    Décode une chaîne encodée par encode_str.
+    :return: (valeur, nouvel offset)
+    """
+    (length,) = _U16.unpack_from(data, offset)
+    offset += _U16.size
+    if length == _NONE_LEN:
+        return None, offset
+    return bytes(data[offset:offset + length]).decode(), offset + length
+
+
+def encode_transaction(transaction):
+    """
+    Encode une transaction de façon déterministe (JSON compact, clés triées).
+    """
+    return json.dumps(transaction, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def encode_body(transactions):
+    """
+    Encode la liste des transactions : nombre de transactions puis chaque
+    transaction préfixée par sa longueur.
+    """
+    parts = [_U32.pack(len(transactions))]
+    for transaction in transactions:
+        data = encode_transaction(transaction)
+        parts.append(_U32.pack(len(data)))
+        parts.append(data)
+    return b"".join(parts)
+
+
+def iter_body_records(body):
+    """
+    Itère sur les transactions encodées d'un corps de bloc, sans les décoder.
+    Sert notamment au calcul des feuilles de l'arbre de Merkle.
+    """
+    (count,) = _U32.unpack_from(body, 0)
+    offset = _U32.size
+    for _ in range(count):
+        (length,) = _U32.unpack_from(body, offset)
+        offset += _U32.size
+        yield bytes(body[offset:offset + length])
+        offset += length
+
+
+def decode_body(data, offset=0):
+    """
+    Décode un corps de bloc encodé par encode_body.
+    :return: (liste des transactions, nouvel offset)
+    """
+    (count,) = _U32.unpack_from(data, offset)
+    offset += _U32.size
+    transactions = []
+    for _ in range(count):
+        (length,) = _U32.unpack_from(data, offset)
+        offset += _U32.size
+        transactions.append(json.loads(bytes(data[offset:offset + length])))
+        offset += length
+    return transactions, offset
+
+
+def encode_header(index, timestamp, previous_hash, merkle_root, validator=None, pbft_signature=None):
+    """
+    Encode l'en-tête d'un bloc : partie fixe (version, index, timestamp), chaînes
+    préfixées par leur longueur, puis la racine de Merkle des transactions (32 octets).
+    :param merkle_root: racine de Merkle en hexadécimal
+    """
+    return b"".join((
+        _FIXED_HEADER.pack(FORMAT_VERSION, index, timestamp),
+        encode_str(previous_hash),
+        encode_str(validator),
+        encode_str(pbft_signature),
+        bytes.fromhex(merkle_root),
+    ))
+
+
+def decode_header(data, offset=0):
+    """
+    Décode un en-tête encodé par encode_header.
+    :return: (dictionnaire des champs, nouvel offset)
+    """
+    version, index, timestamp = _FIXED_HEADER.unpack_from(data, offset)
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Version d'encodage de bloc non supportée : {version}")
+    offset += _FIXED_HEADER.size
+    previous_hash, offset = decode_str(data, offset)
+    validator, offset = decode_str(data, offset)
+    pbft_signature, offset = decode_str(data, offset)
+    merkle_root = bytes(data[offset:offset + MERKLE_ROOT_SIZE]).hex()
+    offset += MERKLE_ROOT_SIZE
+    fields = {
+        "index": index,
+        "timestamp": timestamp,
+        "previous_hash": previous_hash,
+        "validator": validator,
+        "pbft_signature": pbft_signature,
+        "merkle_root": merkle_root
+    }
+    return fields, offset
+
+
+def encode_target(target):
+    """
+    Encode la cible de minage d'un bloc PoW (entier de 256 bits, gros-boutiste).
+    """
+    return target.to_bytes(TARGET_SIZE, "big")
+
+
+def decode_target(data, offset):
+    """
+    Décode une cible encodée par encode_target.
+    :return: (cible, nouvel offset)
+    """
+    return int.from_bytes(data[offset:offset + TARGET_SIZE], "big"), offset + TARGET_SIZE
+
+
+def encode_nonce(nonce):
+    """
+    Encode le nonce d'un bloc PoW sur 8 octets.
+    """
+    return _U64.pack(nonce)
+
+
+def decode_nonce(data, offset):
+    """
+    Décode un nonce encodé par encode_nonce.
+    :return: (nonce, nouvel offset)
+    """
+    (nonce,) = _U64.unpack_from(data, offset)
+    return nonce, offset + _U64.size
+
+
+def encode_record(header, body, compress=False):
+    """
+    Assemble un bloc sérialisé : en-tête puis corps préfixé par sa longueur.
+    C'est la forme utilisée pour le stockage et le transport ; le hash ne porte que sur l'en-tête.
+    :param compress: si True, le corps est compressé (zlib avec le dictionnaire du schéma des transactions)
+    """
+    if compress:
+        data = compress_body(body)
+        return b"".join((header, _U32.pack(_COMPRESSED_BODY), _U32.pack(len(data)), data))
+    return b"".join((header, _U32.pack(len(body)), body))
+
+
+def split_record(data, offset):
+    """
+    Extrait le corps d'un bloc sérialisé à partir de la fin de son en-tête.
+    Un corps compressé est décompressé de façon transparente.
+    :return: (corps, nouvel offset)
+    """
+    (length,) = _U32.unpack_from(data, offset)
+    offset += _U32.size
+    if length == _COMPRESSED_BODY:
+        (length,) = _U32.unpack_from(data, offset)
+        offset += _U32.size
+        return decompress_body(data[offset:offset + length]), offset + length
+    return bytes(data[offset:offset + length]), offset + length
+
+
+def encode_legacy_json(fields):
+    """
+    Encodage historique utilisé avant le format binaire (mode ENCODING_JSON).
+    """
+    return json.dumps(fields, sort_keys=True).encode()
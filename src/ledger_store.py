@@ -0,0 +1,295 @@
+import json
+from peewee import SqliteDatabase, Model, IntegerField, FloatField, CharField, TextField, chunked
+from src.token_table import creation_identifiers
+
+# Nombre de lignes insérées par requête (SQLite limite le nombre de paramètres d'une requête)
+_INSERT_BATCH = 200
+
+
+class BlockRecord(Model):
+    """
+    En-tête d'un bloc committé.
+    """
+    index = IntegerField(primary_key=True)
+    hash = CharField(unique=True)
+    previous_hash = CharField()
+    timestamp = FloatField(index=True)
+    validator = CharField(null=True)
+    pbft_signature = TextField(null=True)
+    merkle_root = CharField()
+    tx_count = IntegerField()
+
+    class Meta:
+        table_name = "blocks"
+
+
+class TransactionRecord(Model):
+    """
+    Une ligne par mouvement de token : transfert, stake, unstake, ou token créé par une
+    transaction token_creation (action "creation"). Une transaction par lot donne une ligne par token.
+    """
+    block_index = IntegerField()
+    tx_position = IntegerField()
+    action = CharField()
+    token_id = CharField(null=True, index=True)
+    from_address = CharField(null=True, index=True)
+    to_address = CharField(null=True, index=True)
+    address = CharField(null=True, index=True)
+    timestamp = FloatField(null=True)
+    # Transaction d'origine (JSON), absente pour les tokens créés et les lots : le bloc suffit à la retrouver
+    payload = TextField(null=True)
+
+    class Meta:
+        table_name = "transactions"
+        indexes = ((("block_index", "tx_position"), False),)
+
+
+class WalletRecord(Model):
+    """
+    État d'un wallet après le dernier bloc committé qui l'a touché.
+    """
+    address = CharField(primary_key=True)
+    available = IntegerField()
+    staked = IntegerField()
+    block_index = IntegerField()
+
+    class Meta:
+        table_name = "wallets"
+
+
+class TokenOwnerRecord(Model):
+    """
+    Propriétaire courant de chaque token et indicateur de staking.
+    """
+    token_id = CharField(primary_key=True)
+    owner = CharField(index=True)
+    staked = IntegerField()
+
+    class Meta:
+        table_name = "token_owners"
+
+
+_MODELS = [BlockRecord, TransactionRecord, WalletRecord, TokenOwnerRecord]
+
+
+def _transaction_rows(block):
+    """
+    Décompose les transactions d'un bloc en lignes de la table des transactions.
+    """
+    rows = []
+    for position, transaction in enumerate(block.transactions):
+        if not isinstance(transaction, dict):
+            continue
+        action = transaction.get("action")
+        if action == "token_creation":
+            for token_id in creation_identifiers(transaction):
+                rows.append({
+                    "block_index": block.index,
+                    "tx_position": position,
+                    "action": "creation",
+                    "token_id": token_id,
+                    "from_address": None,
+                    "to_address": None,
+                    "address": transaction.get("owner"),
+                    "timestamp": block.timestamp,
+                    "payload": None
+                })
+        elif "token_ids" in transaction:
+            # Transaction par lot : une ligne par token, sans recopier la transaction (et sa liste) sur chaque ligne
+            for token_id in transaction["token_ids"]:
+                rows.append({
+                    "block_index": block.index,
+                    "tx_position": position,
+                    "action": action,
+                    "token_id": token_id,
+                    "from_address": transaction.get("from"),
+                    "to_address": transaction.get("to"),
+                    "address": transaction.get("address"),
+                    "timestamp": transaction.get("timestamp"),
+                    "payload": None
+                })
+        else:
+            rows.append({
+                "block_index": block.index,
+                "tx_position": position,
+                "action": action or "inconnue",
+                "token_id": transaction.get("token_id"),
+                "from_address": transaction.get("from"),
+                "to_address": transaction.get("to"),
+                "address": transaction.get("address"),
+                "timestamp": transaction.get("timestamp"),
+                "payload": json.dumps(transaction, sort_keys=True)
+            })
+    return rows
+
+
+def _touched_tokens(rows):
+    """
+    Retourne les tokens et les adresses concernés par les lignes d'un bloc.
+    """
+    tokens = set()
+    addresses = set()
+    for row in rows:
+        if row["token_id"] is not None:
+            tokens.add(row["token_id"])
+        for field in ("from_address", "to_address", "address"):
+            if row[field] is not None:
+                addresses.add(row[field])
+    return tokens, addresses
+
+
+class LedgerStore:
+    """
+    Registre SQLite (via peewee) tenu à jour à chaque bloc committé par BlockchainManager :
+      - blocks : en-têtes des blocs,
+      - transactions : une ligne par mouvement de token, indexée par token, émetteur, destinataire et adresse,
+      - wallets / token_owners : état des wallets et propriétaire de chaque token.
+    Chaque bloc est écrit dans une seule transaction SQL : le registre ne contient jamais un bloc à moitié écrit.
+    Les requêtes par wallet ou par token deviennent des recherches indexées au lieu de parcourir la chaîne.
+    """
+
+    def __init__(self, path=":memory:"):
+        """
+        :param path: fichier de la base SQLite (en mémoire par défaut)
+        """
+        self.path = path
+        self.db = SqliteDatabase(path, pragmas={"journal_mode": "wal", "synchronous": "normal"})
+        self.db.connect()
+        with self.db.bind_ctx(_MODELS):
+            self.db.create_tables(_MODELS)
+
+    def __len__(self):
+        """
+        Nombre de blocs enregistrés.
+        """
+        with self.db.bind_ctx(_MODELS):
+            return BlockRecord.select().count()
+
+    def record_block(self, block, wallet_manager=None):
+        """
+        Enregistre un bloc committé, ses transactions et l'état des wallets qu'il a touchés,
+        dans une seule transaction SQL.
+        :param wallet_manager: WalletManager dont l'état (après le bloc) est recopié pour les wallets touchés
+        """
+        rows = _transaction_rows(block)
+        tokens, addresses = _touched_tokens(rows)
+        with self.db.bind_ctx(_MODELS), self.db.atomic():
+            BlockRecord.create(
+                index=block.index,
+                hash=block.hash,
+                previous_hash=block.previous_hash,
+                timestamp=block.timestamp,
+                validator=block.validator,
+                pbft_signature=block.pbft_signature,
+                merkle_root=block.merkle_root,
+                tx_count=len(block.transactions)
+            )
+            for batch in chunked(rows, _INSERT_BATCH):
+                TransactionRecord.insert_many(batch).execute()
+            if wallet_manager is not None:
+                self._record_wallets(block.index, wallet_manager, tokens, addresses)
+
+    def rollback(self, height, wallet_manager=None):
+        """
+        Supprime les blocs d'index supérieur ou égal à `height` et leurs transactions, dans une seule transaction SQL :
+        le registre peut être en avance sur un BlockStore dont la fin non synchronisée a été perdue (arrêt brutal).
+        :param wallet_manager: WalletManager reconstruit jusqu'au dernier bloc conservé ; l'état des wallets et
+                               le propriétaire des tokens touchés par les blocs supprimés en sont recopiés
+        :return: le nombre de blocs supprimés
+        """
+        with self.db.bind_ctx(_MODELS), self.db.atomic():
+            removed = BlockRecord.delete().where(BlockRecord.index >= height).execute()
+            if not removed:
+                return 0
+            rows = list(TransactionRecord.select().where(TransactionRecord.block_index >= height).dicts())
+            tokens, addresses = _touched_tokens(rows)
+            TransactionRecord.delete().where(TransactionRecord.block_index >= height).execute()
+            stale = WalletRecord.select(WalletRecord.address).where(WalletRecord.block_index >= height)
+            addresses.update(row.address for row in stale)
+            # Les états recopiés remplacent les anciens ; ceux des wallets ou tokens disparus sont seulement supprimés
+            for batch in chunked(list(addresses), _INSERT_BATCH):
+                WalletRecord.delete().where(WalletRecord.address.in_(batch)).execute()
+            for batch in chunked(list(tokens), _INSERT_BATCH):
+                TokenOwnerRecord.delete().where(TokenOwnerRecord.token_id.in_(batch)).execute()
+            if wallet_manager is not None:
+                self._record_wallets(height - 1, wallet_manager, tokens, addresses)
+        return removed
+
+    def _record_wallets(self, block_index, wallet_manager, tokens, addresses):
+        """
+        Recopie l'état des wallets touchés et le propriétaire des tokens déplacés.
+        """
+        wallet_rows = []
+        owner_rows = []
+        for address in addresses:
+            wallet = wallet_manager.wallets.get(address)
+            if wallet is None:
+                continue
+            wallet_rows.append({
+                "address": address,
+                "available": wallet.balance(),
+                "staked": wallet.staked_balance(),
+                "block_index": block_index
+            })
+            # L'intersection parcourt le plus petit des deux ensembles
+            for token_id in tokens & wallet.available_tokens:
+                owner_rows.append({"token_id": token_id, "owner": address, "staked": 0})
+            for token_id in tokens & wallet.staked_tokens:
+                owner_rows.append({"token_id": token_id, "owner": address, "staked": 1})
+        for batch in chunked(wallet_rows, _INSERT_BATCH):
+            WalletRecord.replace_many(batch).execute()
+        for batch in chunked(owner_rows, _INSERT_BATCH):
+            TokenOwnerRecord.replace_many(batch).execute()
+
+    def get_block(self, index):
+        """
+        Retourne l'en-tête du bloc d'index donné (dictionnaire), ou None.
+        """
+        with self.db.bind_ctx(_MODELS):
+            row = BlockRecord.select().where(BlockRecord.index == index).dicts().first()
+        return row
+
+    def get_token_history(self, token_id):
+        """
+        Retourne les mouvements d'un token, dans l'ordre de la chaîne (recherche indexée sur token_id).
+        """
+        with self.db.bind_ctx(_MODELS):
+            query = (TransactionRecord.select()
+                     .where(TransactionRecord.token_id == token_id)
+                     .order_by(TransactionRecord.block_index, TransactionRecord.tx_position, TransactionRecord.id))
+            return list(query.dicts())
+
+    def get_wallet_transactions(self, address):
+        """
+        Retourne les mouvements impliquant un wallet (émetteur, destinataire ou adresse de stake/création),
+        dans l'ordre de la chaîne. Chaque colonne est interrogée via son propre index.
+        """
+        with self.db.bind_ctx(_MODELS):
+            by_column = [TransactionRecord.select().where(column == address)
+                         for column in (TransactionRecord.from_address,
+                                        TransactionRecord.to_address,
+                                        TransactionRecord.address)]
+            query = (by_column[0] | by_column[1] | by_column[2]).order_by(
+                TransactionRecord.block_index, TransactionRecord.tx_position, TransactionRecord.id)
+            return list(query.dicts())
+
+    def get_wallet_state(self, address):
+        """
+        Retourne l'état enregistré d'un wallet (soldes disponible et staké), ou None.
+        """
+        with self.db.bind_ctx(_MODELS):
+            return WalletRecord.select().where(WalletRecord.address == address).dicts().first()
+
+    def get_token_owner(self, token_id):
+        """
+        Retourne le propriétaire enregistré d'un token et son indicateur de staking, ou None.
+        """
+        with self.db.bind_ctx(_MODELS):
+            return TokenOwnerRecord.select().where(TokenOwnerRecord.token_id == token_id).dicts().first()
+
+    def close(self):
+        """
+        Ferme la base.
+        """
+        if not self.db.is_closed():
+            self.db.close()
@@ -151,12 +151,15 @@ def stacker_token(bc_manager, address):
             return
         try:
             n = int(nb)
-            to_stake = list(wallet.available_tokens)[:n]
-            for token_id in to_stake:
-                bc_manager.stake_token(token_id, address)
-            print(f"Staking rapide initié pour tokens : {to_stake} (en attente de validation).")
+            to_stake = wallet.first(n)
         except ValueError:
             print("Nombre invalide.")
+            return
+        try:
+            bc_manager.stake_tokens(to_stake, address)
+            print(f"Staking rapide initié pour tokens : {to_stake} (en attente de validation).")
+        except ValueError as e:
+            print(f"[ERREUR] {e}")
     else:
         print("Opération annulée ou mode invalide.")
 
@@ -193,12 +196,15 @@ def unstacker_token(bc_manager, address):
             return
         try:
             n = int(nb)
-            to_unstake = list(wallet.staked_tokens)[:n]
-            for token_id in to_unstake:
-                bc_manager.unstake_token(token_id, address)
-            print(f"Unstaking rapide initié pour tokens : {to_unstake} (en attente de validation).")
+            to_unstake = wallet.first(n, staked=True)
         except ValueError:
             print("Nombre invalide.")
+            return
+        try:
+            bc_manager.unstake_tokens(to_unstake, address)
+            print(f"Unstaking rapide initié pour tokens : {to_unstake} (en attente de validation).")
+        except ValueError as e:
+            print(f"[ERREUR] {e}")
     else:
         print("Opération annulée ou mode invalide.")
 
@@ -231,7 +237,7 @@ def transferer_tokens(bc_manager, address):
             return
         try:
             n = int(nb)
-            tokens_to_transfer = list(wallet.available_tokens)[:n]
+            tokens_to_transfer = wallet.first(n)
             print(f"Transfert rapide initié pour tokens : {tokens_to_transfer}")
         except ValueError:
             print("Nombre invalide.")
@@ -246,12 +252,12 @@ def transferer_tokens(bc_manager, address):
     dest = input("Adresse du wallet destinataire (vide pour annuler): ").strip()
     if not dest:
         return
-    for token_id in tokens_to_transfer:
-        try:
-            bc_manager.transfer_token(token_id, address, dest)
-            print(f"Transfert initié pour token {token_id} (en attente de validation).")
-        except Exception as e:
-            print(f"[ERREUR] {e}")
+    try:
+        # Un seul lot : soldes vérifiés d'abord, une transaction et un retour arrière pour tous les tokens
+        bc_manager.transfer_tokens(tokens_to_transfer, address, dest)
+        print(f"Transfert initié pour {len(tokens_to_transfer)} token(s) (en attente de validation).")
+    except Exception as e:
+        print(f"[ERREUR] {e}")
 
             
             
@@ -303,7 +309,7 @@ def simulate_fake_traffic(bc_manager):
         if not w_src.available_tokens:
             # pas de token à transférer, on passe
             continue
-        token_id = list(w_src.available_tokens)[0]
+        token_id = w_src.first(1)[0]
         # on lance la transaction et on récupère l'objet tx
         tx = bc_manager.transfer_token(token_id, src, dst)
         executed.append(tx)
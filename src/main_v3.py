@@ -55,7 +55,7 @@ if __name__ == "__main__":
     wallet_creator = token_chain.wallet_manager.get_wallet("wallet_creator")
     for i in range(12):
         if wallet_creator.available_tokens:
-            token_id = list(wallet_creator.available_tokens)[0]
+            token_id = wallet_creator.first(1)[0]
             print(f"Transaction {i+1}: wallet_creator transfère un token à wallet_JJ")
             token_chain.transfer_token(token_id, "wallet_creator", "wallet_JJ")
         else:
@@ -66,7 +66,7 @@ if __name__ == "__main__":
     # wallet creator transfert 2 crédit à wallet lina 
     for i in range(2):
         if wallet_creator.available_tokens:
-            token_id = list(wallet_creator.available_tokens)[0]
+            token_id = wallet_creator.first(1)[0]
             print(f"Transaction {i+1}: wallet_creator transfère un token à wallet_Lina")
             token_chain.transfer_token(token_id, "wallet_creator", "wallet_Lina")
         else:
@@ -76,7 +76,7 @@ if __name__ == "__main__":
     # wallet creator transfert 2 crédit à wallet mathis
     for i in range(2):
         if wallet_creator.available_tokens:
-            token_id = list(wallet_creator.available_tokens)[0]
+            token_id = wallet_creator.first(1)[0]
             print(f"Transaction {i+1}: wallet_creator transfère un token à wallet_Mathis")
             token_chain.transfer_token(token_id, "wallet_creator", "wallet_Mathis")
         else:
@@ -88,7 +88,7 @@ if __name__ == "__main__":
     wallet_jj = token_chain.wallet_manager.get_wallet("wallet_JJ")
     for i in range(8):
         if wallet_jj.available_tokens:
-            token_id = list(wallet_jj.available_tokens)[0]
+            token_id = wallet_jj.first(1)[0]
             token_chain.stake_token(token_id, "wallet_JJ")
         else:
             print("  wallet_JJ n'a plus de tokens disponibles pour staker.")
@@ -133,7 +133,7 @@ if __name__ == "__main__":
     wallet_lina = token_chain.wallet_manager.get_wallet("wallet_Lina")
     for j in range(2):
         if wallet_lina.available_tokens:
-            token_id = list(wallet_lina.available_tokens)[0]
+            token_id = wallet_lina.first(1)[0]
             print(f"Transaction {j+1} (seconde simulation): wallet_Lina transfère un token à wallet_Mathis")
             token_chain.transfer_token(token_id, "wallet_Lina", "wallet_Mathis")
         else:
@@ -0,0 +1,78 @@
+import hashlib
+
+# Préfixes distincts pour les feuilles et les nœuds internes (évite les collisions feuille/nœud)
+_LEAF_PREFIX = b"\x00"
+_NODE_PREFIX = b"\x01"
+
+
+def hash_leaf(data):
+    """
+    Calcule le hash d'une feuille de l'arbre de Merkle (une transaction encodée).
+    """
+    return hashlib.sha256(_LEAF_PREFIX + data).digest()
+
+
+def hash_node(left, right):
+    """
+    Calcule le hash d'un nœud interne à partir de ses deux enfants.
+    """
+    return hashlib.sha256(_NODE_PREFIX + left + right).digest()
+
+
+def _next_level(level):
+    """
+    Calcule le niveau supérieur de l'arbre. Un nœud sans frère est remonté tel quel
+    (pas de duplication, pour éviter que deux listes différentes aient la même racine).
+    """
+    parents = [hash_node(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+    if len(level) % 2:
+        parents.append(level[-1])
+    return parents
+
+
+def merkle_root(leaves):
+    """
+    Calcule la racine de Merkle d'une liste de hashes de feuilles.
+    :return: la racine sous forme d'octets (hash de la chaîne vide si aucune feuille)
+    """
+    level = list(leaves)
+    if not level:
+        return hashlib.sha256(b"").digest()
+    while len(level) > 1:
+        level = _next_level(level)
+    return level[0]
+
+
+def merkle_proof(leaves, position):
+    """
+    Construit la preuve d'inclusion de la feuille à la position donnée.
+    :return: liste de couples (hash du frère en hexadécimal, "left" ou "right")
+             indiquant de quel côté le frère se trouve, de la feuille vers la racine
+    """
+    level = list(leaves)
+    if not 0 <= position < len(level):
+        raise ValueError(f"Position {position} hors de l'arbre ({len(level)} feuilles)")
+    proof = []
+    while len(level) > 1:
+        sibling = position ^ 1
+        if sibling < len(level):
+            proof.append((level[sibling].hex(), "left" if sibling < position else "right"))
+        level = _next_level(level)
+        position //= 2
+    return proof
+
+
+def verify_proof(leaf, proof, root):
+    """
+    Vérifie qu'une feuille appartient à l'arbre de racine donnée, en O(log n).
+    :param leaf: hash de la feuille (octets)
+    :param proof: preuve produite par merkle_proof
+    :param root: racine attendue (octets ou hexadécimal)
+    """
+    if isinstance(root, str):
+        root = bytes.fromhex(root)
+    current = leaf
+    for sibling_hex, side in proof:
+        sibling = bytes.fromhex(sibling_hex)
+        current = hash_node(sibling, current) if side == "left" else hash_node(current, sibling)
+    return current == root
@@ -0,0 +1,173 @@
+import hashlib
+import multiprocessing
+from src.encoding import encode_nonce
+
+# Nombre de nonces testés par tâche envoyée à un processus
+CHUNK_SIZE = 20000
+# Fréquence (en nonces) à laquelle un processus vérifie si un nonce plus petit a déjà été trouvé
+_CHECK_EVERY = 1024
+# Nombre de nonces testés entre deux vérifications d'une demande d'interruption du minage
+_INTERRUPT_CHUNK = 4096
+# Intervalle (en secondes) de surveillance d'une demande d'interruption pendant le minage parallèle
+_INTERRUPT_POLL = 0.005
+# Valeur du meilleur nonce partagé tant qu'aucun nonce valide n'a été trouvé
+_NOT_FOUND = 2 ** 63 - 1
+
+# Cible maximale (difficulté minimale), représentable sur les 32 octets de l'en-tête
+MAX_TARGET = (1 << 256) - 1
+
+# Meilleur nonce trouvé, partagé entre les processus (initialisé par _init_worker)
+_best_nonce = None
+
+
+def difficulty_to_target(difficulty):
+    """
+    Convertit une difficulté exprimée en zéros hexadécimaux de tête en cible numérique :
+    un hash commence par `difficulty` zéros si et seulement si sa valeur est inférieure à la cible.
+    """
+    return min(1 << (256 - 4 * difficulty), MAX_TARGET)
+
+
+def hash_meets_target(hex_hash, target):
+    """
+    Vérifie qu'un hash (hexadécimal) respecte la cible (comparaison entière sur 256 bits).
+    """
+    return int(hex_hash, 16) < target
+
+
+def retarget(target, actual_span, expected_span, max_adjustment=4):
+    """
+    Ajuste la cible pour que les prochains blocs soient produits au rythme visé.
+    La cible est multipliée par le rapport durée réelle / durée visée, borné à [1/max_adjustment, max_adjustment] :
+    des blocs trop rapides réduisent la cible (minage plus difficile), des blocs trop lents l'augmentent.
+    :param actual_span: durée réelle (secondes) de la période écoulée
+    :param expected_span: durée visée (secondes) pour cette même période
+    """
+    actual_span = min(max(actual_span, expected_span / max_adjustment), expected_span * max_adjustment)
+    # Rapport en microsecondes pour rester en arithmétique entière sur 256 bits
+    new_target = target * round(actual_span * 1_000_000) // round(expected_span * 1_000_000)
+    return max(1, min(new_target, MAX_TARGET))
+
+
+class MiningTemplate:
+    """
+    Gabarit de minage d'un bloc : l'en-tête sans le nonce est haché une seule fois et l'état
+    intermédiaire de SHA-256 (midstate) est conservé. Chaque tentative ne fait que copier cet état
+    et y ajouter le nonce encodé sur 8 octets.
+    """
+
+    def __init__(self, prefix):
+        """
+        :param prefix: en-tête encodé du bloc, sans le nonce
+        """
+        self.prefix = prefix
+        self._midstate = hashlib.sha256(prefix)
+
+    def hash_nonce(self, nonce):
+        """
+        Retourne le hash (hexadécimal) de l'en-tête complété par le nonce donné.
+        """
+        attempt = self._midstate.copy()
+        attempt.update(encode_nonce(nonce))
+        return attempt.hexdigest()
+
+    def search(self, start, count, target, best_nonce=None):
+        """
+        Cherche le plus petit nonce valide dans l'intervalle [start, start + count).
+        :param target: cible numérique ; un hash est valide si sa valeur entière est inférieure à la cible
+        :param best_nonce: valeur partagée ; la recherche s'arrête dès qu'un nonce plus petit a été trouvé ailleurs
+        :return: ((nonce, hash) ou None, nombre de nonces testés)
+        """
+        midstate_copy = self._midstate.copy
+        pack = encode_nonce
+        from_bytes = int.from_bytes
+        for nonce in range(start, start + count):
+            if best_nonce is not None and nonce % _CHECK_EVERY == 0 and best_nonce.value < nonce:
+                return None, nonce - start
+            attempt = midstate_copy()
+            attempt.update(pack(nonce))
+            digest = attempt.digest()
+            if from_bytes(digest, "big") < target:
+                return (nonce, digest.hex()), nonce - start + 1
+        return None, count
+
+
+def search_range(prefix, start, count, target, best_nonce=None):
+    """
+    Cherche le plus petit nonce valide dans l'intervalle [start, start + count).
+    :return: (nonce, hash) ou None si aucun nonce valide n'a été trouvé
+    """
+    return MiningTemplate(prefix).search(start, count, target, best_nonce)[0]
+
+
+def _init_worker(best_nonce):
+    global _best_nonce
+    _best_nonce = best_nonce
+
+
+def _search_chunk(task):
+    """
+    Tâche exécutée dans un processus du pool : explore un intervalle de nonces et
+    publie le nonce trouvé pour arrêter les processus qui explorent des nonces plus grands.
+    """
+    prefix, start, count, target = task
+    result, attempts = MiningTemplate(prefix).search(start, count, target, _best_nonce)
+    if result is not None:
+        with _best_nonce.get_lock():
+            if result[0] < _best_nonce.value:
+                _best_nonce.value = result[0]
+    return result, attempts
+
+
+def mine(prefix, target, start=0, interrupt=None):
+    """
+    Mine sur un seul cœur : retourne le plus petit nonce valide à partir de start.
+    :param target: cible numérique (voir difficulty_to_target)
+    :param interrupt: threading.Event optionnel ; s'il est levé, le minage s'arrête en quelques millisecondes
+    :return: (nonce, hash, nombre de hashs calculés), ou None si le minage a été interrompu
+    """
+    template = MiningTemplate(prefix)
+    chunk_size = CHUNK_SIZE if interrupt is None else _INTERRUPT_CHUNK
+    attempts = 0
+    while True:
+        if interrupt is not None and interrupt.is_set():
+            return None
+        result, tested = template.search(start, chunk_size, target)
+        attempts += tested
+        if result is not None:
+            return result[0], result[1], attempts
+        start += chunk_size
+
+
+def mine_parallel(prefix, target, workers, start=0, chunk_size=CHUNK_SIZE, interrupt=None):
+    """
+    Mine sur plusieurs processus : l'espace des nonces est découpé en intervalles répartis sur un pool.
+    Les intervalles sont traités par lots ; dès qu'un nonce est trouvé, les processus explorant des
+    nonces plus grands s'arrêtent. Le plus petit nonce valide est retourné, si bien que le résultat
+    est identique à celui du minage sur un seul cœur.
+    :param interrupt: threading.Event optionnel ; s'il est levé, tous les processus sont arrêtés
+    :return: (nonce, hash, nombre de hashs calculés par l'ensemble des processus),
+             ou None si le minage a été interrompu
+    """
+    best_nonce = multiprocessing.Value("q", _NOT_FOUND)
+    attempts = 0
+    with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(best_nonce,)) as pool:
+        batch = workers * 2
+        while True:
+            tasks = [(prefix, start + i * chunk_size, chunk_size, target) for i in range(batch)]
+            pending = pool.map_async(_search_chunk, tasks)
+            while not pending.ready():
+                if interrupt is not None and interrupt.is_set():
+                    # Un meilleur nonce négatif arrête immédiatement tous les processus
+                    best_nonce.value = -1
+                    return None
+                pending.wait(_INTERRUPT_POLL)
+            found = []
+            for result, tested in pending.get():
+                attempts += tested
+                if result is not None:
+                    found.append(result)
+            if found:
+                nonce, hash_attempt = min(found)
+                return nonce, hash_attempt, attempts
+            start += batch * chunk_size
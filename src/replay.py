@@ -0,0 +1,163 @@
+from src.token_table import TokenTable, creation_identifiers
+from src.wallet_manager import WalletManager
+
+
+def iter_blocks(chain, start=0):
+    """
+    Itère sur les blocs de la chaîne à partir de l'index `start`, un bloc à la fois.
+    Avec un BlockStore, chaque bloc est relu depuis le disque puis libéré : la mémoire
+    reste bornée quelle que soit la hauteur de la chaîne.
+    """
+    for index in range(start, len(chain)):
+        yield chain[index]
+
+
+def iter_transactions(blocks):
+    """
+    Itère sur les transactions (dictionnaires) d'un flux de blocs.
+    :return: générateur de (index du bloc, position dans le bloc, transaction)
+    """
+    for block in blocks:
+        for position, transaction in enumerate(block.transactions):
+            if isinstance(transaction, dict):
+                yield block.index, position, transaction
+
+
+def _get_or_create_wallet(wallet_manager, address):
+    try:
+        return wallet_manager.get_wallet(address)
+    except ValueError:
+        return wallet_manager.create_wallet(address)
+
+
+def apply_transaction(transaction, wallet_manager, validators, stakes, token_manager=None, strict=False):
+    """
+    Applique une transaction committée (token_creation, transfer, stake, unstake, leurs versions par lot
+    transfer_batch, stake_batch, unstake_batch et leurs équivalents fongibles transfer_amount, stake_amount,
+    unstake_amount) à un état.
+    :param token_manager: TokenManager où enregistrer les tokens créés, ou None pour ne pas conserver les tokens
+    :param strict: si True, lève ValueError lorsqu'une transaction déplace un token (ou un montant) que le wallet
+                   ne possède pas
+    """
+    action = transaction.get("action")
+    if action == "token_creation":
+        owner = _get_or_create_wallet(wallet_manager, transaction["owner"])
+        if token_manager is not None:
+            if "identifiers" in transaction:
+                token_manager.register_table(TokenTable.from_columns(transaction))
+            else:
+                token_manager.register_tokens(transaction["tokens"])
+        identifiers = creation_identifiers(transaction)
+        if transaction.get("fungible", False):
+            # Offre fongible : le propriétaire est crédité d'un montant, pas de tokens identifiés
+            owner.deposit_amount(len(identifiers))
+        else:
+            owner.deposit_tokens(identifiers)
+        return
+    if action == "transfer":
+        moved = _get_or_create_wallet(wallet_manager, transaction["from"]).withdraw_token(transaction["token_id"])
+        if moved or not strict:
+            _get_or_create_wallet(wallet_manager, transaction["to"]).deposit_token(transaction["token_id"], stake=False)
+    elif action == "transfer_batch":
+        moved = _get_or_create_wallet(wallet_manager, transaction["from"]).withdraw_tokens(transaction["token_ids"])
+        if moved or not strict:
+            _get_or_create_wallet(wallet_manager, transaction["to"]).deposit_tokens(transaction["token_ids"])
+    elif action == "transfer_amount":
+        moved = _get_or_create_wallet(wallet_manager, transaction["from"]).withdraw_amount(transaction["amount"])
+        if moved or not strict:
+            _get_or_create_wallet(wallet_manager, transaction["to"]).deposit_amount(transaction["amount"])
+    elif action in ("stake", "stake_batch", "stake_amount"):
+        wallet = _get_or_create_wallet(wallet_manager, transaction["address"])
+        if action == "stake":
+            moved, amount = wallet.stake_token(transaction["token_id"]), 1
+        elif action == "stake_batch":
+            moved, amount = wallet.stake_tokens(transaction["token_ids"]), len(transaction["token_ids"])
+        else:
+            moved, amount = wallet.stake_amount(transaction["amount"]), transaction["amount"]
+        if moved or not strict:
+            if transaction["address"] not in validators:
+                validators.append(transaction["address"])
+            stakes[transaction["address"]] = stakes.get(transaction["address"], 0) + amount
+    elif action == "unstake":
+        moved = _get_or_create_wallet(wallet_manager, transaction["address"]).unstake_token(transaction["token_id"])
+    elif action == "unstake_batch":
+        moved = _get_or_create_wallet(wallet_manager, transaction["address"]).unstake_tokens(transaction["token_ids"])
+    elif action == "unstake_amount":
+        moved = _get_or_create_wallet(wallet_manager, transaction["address"]).unstake_amount(transaction["amount"])
+    else:
+        return
+    if strict and not moved:
+        if "token_id" in transaction:
+            raise ValueError(f"Transaction {action} invalide : le token {transaction['token_id']} n'est pas disponible")
+        if "token_ids" in transaction:
+            raise ValueError(f"Transaction {action} invalide : les {len(transaction['token_ids'])} tokens "
+                             f"ne sont pas tous disponibles")
+        raise ValueError(f"Transaction {action} invalide : solde insuffisant pour {transaction['amount']} unités")
+
+
+class ReplayEngine:
+    """
+    Reconstruit l'état des wallets à partir de la chaîne seule, en flux : les blocs sont lus un par un
+    et leurs transactions appliquées à un état vierge. Seul l'état (les tokens de chaque wallet) est
+    conservé en mémoire, jamais la chaîne. Le résultat peut être comparé au WalletManager courant.
+    """
+
+    def __init__(self, strict=True):
+        """
+        :param strict: si True, une transaction qui déplace un token absent du wallet interrompt le rejeu
+        """
+        self.strict = strict
+        self.wallet_manager = WalletManager()
+        self.validators = []
+        self.stakes = {}
+        self.height = -1
+        self.transaction_count = 0
+
+    def run(self, chain, start=0):
+        """
+        Rejoue les blocs de la chaîne à partir de l'index `start`.
+        :return: le moteur lui-même (état reconstruit dans wallet_manager, validators et stakes)
+        """
+        for block_index, position, transaction in iter_transactions(iter_blocks(chain, start)):
+            try:
+                apply_transaction(transaction, self.wallet_manager, self.validators, self.stakes, strict=self.strict)
+            except ValueError as error:
+                raise ValueError(f"Bloc {block_index}, transaction {position} : {error}") from error
+            self.transaction_count += 1
+        self.height = len(chain) - 1
+        return self
+
+    def verify(self, wallet_manager):
+        """
+        Compare l'état reconstruit aux wallets courants.
+        :return: liste des écarts ; chaque écart indique l'adresse, le solde concerné ("available", "staked",
+                 ou "available_amount", "staked_amount" pour les unités fongibles), le nombre de tokens (ou d'unités)
+                 selon la chaîne et selon le wallet courant, et le nombre de tokens (ou d'unités) qui diffèrent
+        """
+        discrepancies = []
+        addresses = set(self.wallet_manager.wallets) | set(wallet_manager.wallets)
+        for address in sorted(addresses):
+            replayed = self.wallet_manager.wallets.get(address)
+            live = wallet_manager.wallets.get(address)
+            for field in ("available", "staked"):
+                expected = getattr(replayed, f"{field}_tokens") if replayed is not None else set()
+                actual = getattr(live, f"{field}_tokens") if live is not None else set()
+                if expected != actual:
+                    discrepancies.append({
+                        "address": address,
+                        "field": field,
+                        "chain": len(expected),
+                        "live": len(actual),
+                        "difference": len(expected ^ actual)
+                    })
+                expected = getattr(replayed, f"{field}_amount") if replayed is not None else 0
+                actual = getattr(live, f"{field}_amount") if live is not None else 0
+                if expected != actual:
+                    discrepancies.append({
+                        "address": address,
+                        "field": f"{field}_amount",
+                        "chain": expected,
+                        "live": actual,
+                        "difference": abs(expected - actual)
+                    })
+        return discrepancies
@@ -0,0 +1,194 @@
+import os
+import struct
+import zlib
+from array import array
+from src.encoding import encode_str, decode_str
+from src.token_table import HASH_SIZE, TokenTable
+
+# Signature et version du format des snapshots
+_MAGIC = b"BSNP"
+SNAPSHOT_VERSION = 2
+# Versions lisibles (la version 1 ne contient pas les montants fongibles)
+_READABLE_VERSIONS = (1, 2)
+# En-tête : signature, version, hauteur du bloc
+_HEADER = struct.Struct(">4sBQ")
+_U32 = struct.Struct(">I")
+_U64 = struct.Struct(">Q")
+_DOUBLE = struct.Struct(">d")
+# Taille d'un hash SHA-256 (hash de token) sous forme binaire
+_HASH_SIZE = HASH_SIZE
+
+
+def encode_state(height, block_hash, token_manager, wallet_manager, validators, stakes):
+    """
+    Encode l'état du monde après le bloc `height` sous forme binaire compacte :
+      - table des tokens (identifiant, date de création, hash) ; les wallets ne référencent un token
+        que par sa position dans cette table (4 octets),
+      - wallets (adresse, tokens disponibles, tokens stakés, montants fongibles disponible et staké),
+      - validateurs et montants stakés.
+    Le tout est compressé avec zlib.
+    """
+    table = token_manager.table
+    positions = {}
+    parts = [_U64.pack(token_manager.max_tokens), _U32.pack(len(table))]
+    # Les colonnes de la table sont lues directement : aucun objet Token n'est créé
+    for position, identifier in enumerate(table.identifiers):
+        positions[identifier] = position
+        parts.append(encode_str(identifier))
+        parts.append(_DOUBLE.pack(table.created_at[position]))
+        parts.append(table.hashes[_HASH_SIZE * position:_HASH_SIZE * (position + 1)])
+    parts.append(_U32.pack(len(wallet_manager.wallets)))
+    for wallet in wallet_manager.wallets.values():
+        parts.append(encode_str(wallet.address))
+        for tokens in (wallet.available_tokens, wallet.staked_tokens):
+            parts.append(_U32.pack(len(tokens)))
+            parts.append(struct.pack(f">{len(tokens)}I", *sorted(positions[token_id] for token_id in tokens)))
+        parts.append(_U64.pack(wallet.available_amount))
+        parts.append(_U64.pack(wallet.staked_amount))
+    parts.append(_U32.pack(len(validators)))
+    for validator in validators:
+        parts.append(encode_str(validator))
+        parts.append(_U64.pack(stakes.get(validator, 0)))
+    header = _HEADER.pack(_MAGIC, SNAPSHOT_VERSION, height) + encode_str(block_hash)
+    return header + zlib.compress(b"".join(parts))
+
+
+def decode_state(data):
+    """
+    Décode un snapshot encodé par encode_state.
+    :return: dictionnaire (height, block_hash, max_tokens, tokens, wallets, amounts, validators, stakes) ;
+             tokens est une TokenTable (itérable en objets Token), wallets associe chaque adresse à ses ensembles (disponibles, stakés)
+             et amounts à ses montants fongibles (disponible, staké)
+    """
+    magic, version, height = _HEADER.unpack_from(data, 0)
+    if magic != _MAGIC or version not in _READABLE_VERSIONS:
+        raise ValueError("Snapshot invalide ou de version non supportée")
+    block_hash, offset = decode_str(data, _HEADER.size)
+    body = zlib.decompress(data[offset:])
+    (max_tokens,) = _U64.unpack_from(body, 0)
+    (count,) = _U32.unpack_from(body, _U64.size)
+    offset = _U64.size + _U32.size
+    identifiers = []
+    created = array("d")
+    hashes = []
+    for _ in range(count):
+        identifier, offset = decode_str(body, offset)
+        (created_at,) = _DOUBLE.unpack_from(body, offset)
+        offset += _DOUBLE.size
+        identifiers.append(identifier)
+        created.append(created_at)
+        hashes.append(body[offset:offset + _HASH_SIZE])
+        offset += _HASH_SIZE
+    tokens = TokenTable()
+    tokens.extend(identifiers, created, b"".join(hashes))
+    (count,) = _U32.unpack_from(body, offset)
+    offset += _U32.size
+    wallets = {}
+    amounts = {}
+    for _ in range(count):
+        address, offset = decode_str(body, offset)
+        sets = []
+        for _ in range(2):
+            (size,) = _U32.unpack_from(body, offset)
+            offset += _U32.size
+            indexes = struct.unpack_from(f">{size}I", body, offset)
+            offset += 4 * size
+            sets.append({identifiers[i] for i in indexes})
+        wallets[address] = tuple(sets)
+        if version >= 2:
+            amounts[address] = (_U64.unpack_from(body, offset)[0], _U64.unpack_from(body, offset + _U64.size)[0])
+            offset += 2 * _U64.size
+        else:
+            amounts[address] = (0, 0)
+    (count,) = _U32.unpack_from(body, offset)
+    offset += _U32.size
+    validators = []
+    stakes = {}
+    for _ in range(count):
+        validator, offset = decode_str(body, offset)
+        (stake,) = _U64.unpack_from(body, offset)
+        offset += _U64.size
+        validators.append(validator)
+        stakes[validator] = stake
+    return {
+        "height": height,
+        "block_hash": block_hash,
+        "max_tokens": max_tokens,
+        "tokens": tokens,
+        "wallets": wallets,
+        "amounts": amounts,
+        "validators": validators,
+        "stakes": stakes
+    }
+
+
+class SnapshotStore:
+    """
+    Répertoire de snapshots de l'état du monde (wallets, tokens, stakes), pris tous les `every` blocs.
+    Chaque snapshot est étiqueté par la hauteur et le hash du bloc auquel il correspond ; seuls les
+    `keep` plus récents sont conservés. Au redémarrage, le dernier snapshot cohérent avec la chaîne
+    est chargé et seuls les blocs suivants sont rejoués.
+    """
+
+    def __init__(self, path, every=100, keep=2):
+        """
+        :param path: répertoire des snapshots (créé s'il n'existe pas)
+        :param every: nombre de blocs entre deux snapshots
+        :param keep: nombre de snapshots conservés
+        """
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.every = every
+        self.keep = keep
+
+    def _file(self, height):
+        return os.path.join(self.path, f"snapshot_{height:012d}.bin")
+
+    def heights(self):
+        """
+        Retourne les hauteurs des snapshots disponibles, de la plus récente à la plus ancienne.
+        """
+        heights = []
+        for name in os.listdir(self.path):
+            if name.startswith("snapshot_") and name.endswith(".bin"):
+                heights.append(int(name[len("snapshot_"):-len(".bin")]))
+        return sorted(heights, reverse=True)
+
+    def should_snapshot(self, height):
+        """
+        Indique si un snapshot doit être pris après le bloc `height`.
+        """
+        return height > 0 and height % self.every == 0
+
+    def save(self, height, block_hash, token_manager, wallet_manager, validators, stakes):
+        """
+        Écrit un snapshot de façon atomique (fichier temporaire puis renommage) et supprime les plus anciens.
+        """
+        data = encode_state(height, block_hash, token_manager, wallet_manager, validators, stakes)
+        target = self._file(height)
+        with open(target + ".tmp", "wb") as snapshot_file:
+            snapshot_file.write(data)
+            snapshot_file.flush()
+            os.fsync(snapshot_file.fileno())
+        os.replace(target + ".tmp", target)
+        for old_height in self.heights()[self.keep:]:
+            os.remove(self._file(old_height))
+
+    def load_latest(self, chain):
+        """
+        Charge le snapshot le plus récent dont le bloc correspond à la chaîne donnée
+        (même hauteur et même hash).
+        :return: l'état décodé (voir decode_state), ou None si aucun snapshot n'est utilisable
+        """
+        for height in self.heights():
+            if height >= len(chain):
+                continue
+            with open(self._file(height), "rb") as snapshot_file:
+                data = snapshot_file.read()
+            try:
+                state = decode_state(data)
+            except (ValueError, zlib.error, struct.error):
+                continue
+            if chain[height].hash == state["block_hash"]:
+                return state
+        return None
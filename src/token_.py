@@ -50,5 +50,17 @@ class Token:
             "hash": self.hash
         }
     
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Reconstruit un token existant (identifiant, date de création et hash conservés),
+        par exemple lors du rechargement d'un snapshot ou du rejeu de la chaîne.
+        """
+        token = cls.__new__(cls)
+        token.identifier = data["identifier"]
+        token.created_at = data["created_at"]
+        token.hash = data["hash"]
+        return token
+
     def __repr__(self):
         return f"Token(id={self.identifier[:8]}..., )"
@@ -1,34 +1,203 @@
 import time
+from array import array
+from collections.abc import Mapping
 from src.token_ import Token
+from src.token_registry import TokenRegistry
+from src.token_table import TokenTable, mint_tokens
+
+
+class TokenView:
+    """
+    Vue en lecture seule sur le registre ordonné des tokens : longueur, accès par position,
+    tranches et itération, sans copier la table des tokens.
+    """
+
+    def __init__(self, token_manager):
+        self._manager = token_manager
+
+    def __len__(self):
+        return len(self._manager.table)
+
+    def __getitem__(self, position):
+        # Une tranche ne matérialise que les k tokens demandés
+        if isinstance(position, slice):
+            return [self._manager.get_token_at(i) for i in range(*position.indices(len(self)))]
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError("Position de token hors du registre")
+        return self._manager.get_token_at(position)
+
+    def __iter__(self):
+        for position in range(len(self)):
+            yield self._manager.get_token_at(position)
+
+    def __repr__(self):
+        return f"TokenView({len(self)} tokens)"
+
+
+class TokenMapping(Mapping):
+    """
+    Vue en lecture seule identifiant -> token sur le registre (interface d'un dictionnaire).
+    """
+
+    def __init__(self, token_manager):
+        self._manager = token_manager
+
+    def __getitem__(self, token_id):
+        token = self._manager.get_token(token_id)
+        if token is None:
+            raise KeyError(token_id)
+        return token
+
+    def __contains__(self, token_id):
+        return self._manager.get_position(token_id) is not None
+
+    def __iter__(self):
+        return iter(self._manager.table.identifiers)
+
+    def __len__(self):
+        return len(self._manager.table)
+
 
 class TokenManager:
     def __init__(self, max_tokens=100):
-        self.tokens = {}
         self.max_tokens = max_tokens
+        # Registre ordonné en colonnes (ordre de création)
+        self.table = TokenTable()
+        # Objets Token créés ou enregistrés un par un, par position (les tokens créés en bloc n'en ont pas)
+        self._objects = {}
+        # Numérotation dense des tokens (identifiant <-> entier) utilisée par les bitmaps des wallets : seule
+        # table indexée par identifiant. La position d'un token dans la table s'en déduit par son numéro
+        # (numéro -> position, -1 pour un token hors de la table), sans second dictionnaire de chaînes
+        self.registry = TokenRegistry()
+        self._positions = array("q")
+
+    @property
+    def tokens(self):
+        """Vue identifiant -> token de tous les tokens"""
+        return TokenMapping(self)
+
+    def _set_position(self, number, position):
+        """Associe le numéro d'un token (registre) à sa position dans la table"""
+        if number >= len(self._positions):
+            self._positions.extend([-1] * (number + 1 - len(self._positions)))
+        self._positions[number] = position
+
+    def _add(self, token):
+        """Ajoute un token au registre (à la fin de l'ordre de création, ou à sa place s'il est déjà connu)"""
+        position = self.get_position(token.identifier)
+        if position is None:
+            position = len(self.table)
+            self._set_position(self.registry.intern(token.identifier), position)
+            self.table.append(token.identifier, token.created_at, token.hash)
+        else:
+            self.table.replace(position, token.created_at, token.hash)
+        self._objects[position] = token
+
+    def _add_table(self, table):
+        """Ajoute au registre les tokens d'une table en colonnes (tokens nouveaux uniquement)"""
+        start = len(self.table)
+        for offset, identifier in enumerate(table.identifiers):
+            self._set_position(self.registry.intern(identifier), start + offset)
+        self.table.extend(table.identifiers, table.created_at, table.hashes)
         
     def create_token(self):
         """Crée un nouveau token s'il reste des places disponibles"""
-        if len(self.tokens) >= self.max_tokens:
+        if len(self.table) >= self.max_tokens:
             raise ValueError(f"Nombre maximum de tokens atteint ({self.max_tokens})")
         
         token = Token()
-        self.tokens[token.identifier] = token
+        self._add(token)
         return token
     
     def create_initial_tokens(self, count=100):
         """Crée le nombre défini de tokens initiaux"""
         created_tokens = []
-        for _ in range(min(count, self.max_tokens - len(self.tokens))):
+        for _ in range(min(count, self.max_tokens - len(self.table))):
             token = self.create_token()
             created_tokens.append(token)
         return created_tokens
+
+    def bulk_mint(self, count, seed=None, workers=None, created_at=None):
+        """
+        Crée jusqu'à `count` tokens en bloc (dans la limite de max_tokens) : identifiants et hashes sont
+        générés par lots, sans objet Token, et ajoutés au registre en colonnes.
+        :param seed: graine optionnelle pour des identifiants déterministes
+        :param workers: nombre de processus pour le hachage (voir mint_tokens)
+        :param created_at: date de création commune au lot (par défaut, l'heure courante)
+        :return: TokenTable des tokens créés
+        """
+        count = max(0, min(count, self.max_tokens - len(self.table)))
+        minted = mint_tokens(count, created_at=created_at, seed=seed, workers=workers)
+        if any(self.get_position(identifier) is not None for identifier in minted.identifiers):
+            raise ValueError("Identifiant de token déjà enregistré (graine déjà utilisée ?)")
+        self._add_table(minted)
+        return minted
     
+    def register_token(self, token):
+        """Enregistre un token déjà créé (rejeu de la chaîne ou chargement d'un snapshot)"""
+        self._add(token)
+        return token
+
+    def register_tokens(self, token_dicts):
+        """Enregistre des tokens au format de Token.to_dict (rejeu d'une création de tokens), sans objet Token"""
+        for data in token_dicts:
+            position = self.get_position(data["identifier"])
+            if position is None:
+                self._set_position(self.registry.intern(data["identifier"]), len(self.table))
+                self.table.append(data["identifier"], data["created_at"], data["hash"])
+            else:
+                self.table.replace(position, data["created_at"], data["hash"])
+                self._objects.pop(position, None)
+
+    def register_table(self, table):
+        """Enregistre les tokens d'une table en colonnes (rejeu d'une création de tokens en colonnes)"""
+        if not any(self.get_position(identifier) is not None for identifier in table.identifiers):
+            self._add_table(table)
+            return
+        self.register_tokens(table.to_dicts())
+
+    def load_tokens(self, tokens):
+        """Remplace le registre par les tokens donnés, une TokenTable ou une liste ordonnée de Token
+        (chargement d'un snapshot)"""
+        self.table = TokenTable()
+        # Les numéros du registre sont conservés (les wallets les référencent), seules les positions sont oubliées
+        self._positions = array("q")
+        self._objects = {}
+        if isinstance(tokens, TokenTable):
+            self._add_table(tokens)
+            return
+        for token in tokens:
+            self._add(token)
+
     def get_token(self, token_id):
         """Récupère un token par son identifiant"""
-        return self.tokens.get(token_id)
+        position = self.get_position(token_id)
+        return self.get_token_at(position) if position is not None else None
     
+    def get_token_at(self, position):
+        """Récupère le token à une position du registre (ordre de création) en O(1), ou None"""
+        if 0 <= position < len(self.table):
+            token = self._objects.get(position)
+            return token if token is not None else self.table.token_at(position)
+        return None
+
+    def get_position(self, token_id):
+        """Retourne la position d'un token dans le registre, ou None"""
+        number = self.registry.number(token_id)
+        if number is None or number >= len(self._positions) or self._positions[number] < 0:
+            return None
+        return self._positions[number]
+
+    def get_tokens(self, offset=0, limit=None):
+        """Retourne une page de tokens (ordre de création) en O(limit)"""
+        end = len(self.table) if limit is None else min(offset + limit, len(self.table))
+        return [self.get_token_at(position) for position in range(offset, end)]
+
     def get_all_tokens(self):
-        return list(self.tokens.values())
+        """Retourne une vue ordonnée de tous les tokens, sans copie"""
+        return TokenView(self)
     
     # N'existe pas car les la gestion des tokens en staking est gérée par le wallet
     # def get_staking_tokens(self): 
@@ -36,13 +205,13 @@ class TokenManager:
     
     def get_tokens_value(self):
         """Calcule la valeur totale de tous les tokens"""
-        if not self.tokens:
+        if not len(self.table):
             return 0
             
         # Tous les tokens ont la même valeur dans votre implémentation
         # On prend donc la valeur d'un seul token et on multiplie par le nombre
-        single_value = next(iter(self.tokens.values())).get_value()
-        return single_value * len(self.tokens)
+        single_value = self.get_token_at(0).get_value()
+        return single_value * len(self.table)
     
     # A supprimer car la gestion des tokens en staking est gérée par le wallet
     # def get_staking_tokens_value(self):
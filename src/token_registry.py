@@ -0,0 +1,377 @@
+import re
+from array import array
+from bisect import bisect_left, insort
+from itertools import islice
+
+# Les numéros de tokens sont regroupés par tranches de 2^16 : une tranche est stockée soit comme un tableau
+# trié de ses numéros bas (2 octets par token), soit comme un bitmap de 8 Kio dès qu'elle en contient plus de _ARRAY_MAX
+_CHUNK_BITS = 16
+_CHUNK_MASK = (1 << _CHUNK_BITS) - 1
+_BITMAP_BYTES = 1 << (_CHUNK_BITS - 3)
+_ARRAY_MAX = 4096
+# Une tranche bitmap ne redevient un tableau que sous la moitié du seuil, pour éviter les allers-retours
+_ARRAY_MIN = _ARRAY_MAX // 2
+_NONZERO = re.compile(rb"[^\x00]")
+
+
+def _bitmap_members(bits, reverse=False):
+    """
+    Itère sur les numéros bas d'une tranche bitmap, par ordre croissant (décroissant si reverse).
+    Les octets nuls sont sautés par une recherche en C, sans boucle Python.
+    """
+    data = bits[::-1] if reverse else bits
+    for match in _NONZERO.finditer(data):
+        position = match.start()
+        byte = data[position]
+        if reverse:
+            base = (len(bits) - 1 - position) << 3
+            while byte:
+                highest = byte.bit_length() - 1
+                yield base + highest
+                byte ^= 1 << highest
+        else:
+            base = position << 3
+            while byte:
+                lowest = byte & -byte
+                yield base + lowest.bit_length() - 1
+                byte ^= lowest
+
+
+def _to_bitmap(members):
+    bits = bytearray(_BITMAP_BYTES)
+    for low in members:
+        bits[low >> 3] |= 1 << (low & 7)
+    return bits
+
+
+class TokenRegistry:
+    """
+    Numérotation dense des tokens : chaque identifiant (UUID de 36 caractères) reçoit un entier
+    0, 1, 2... à sa première apparition. Les wallets qui partagent un registre stockent ces entiers
+    dans des TokenBitmap au lieu d'ensembles de chaînes.
+    """
+
+    def __init__(self):
+        self._identifiers = []
+        self._numbers = {}
+
+    def __len__(self):
+        return len(self._identifiers)
+
+    def intern(self, token_id):
+        """
+        Retourne le numéro du token, en lui attribuant le prochain numéro libre s'il est inconnu.
+        """
+        number = self._numbers.get(token_id)
+        if number is None:
+            number = self._numbers[token_id] = len(self._identifiers)
+            self._identifiers.append(token_id)
+        return number
+
+    def number(self, token_id):
+        """
+        Retourne le numéro du token, ou None s'il n'a jamais été enregistré.
+        """
+        return self._numbers.get(token_id)
+
+    def identifier(self, number):
+        """
+        Retourne l'identifiant du token de numéro donné.
+        """
+        return self._identifiers[number]
+
+
+class TokenBitmap:
+    """
+    Ensemble de numéros de tokens du registre, découpé en tranches de 2^16 numéros (à la manière des
+    roaring bitmaps) : une tranche peu remplie est un tableau trié de 2 octets par token, une tranche dense
+    un bitmap de 8 Kio, et une tranche vide n'existe pas. Un wallet coûte donc de l'ordre de 2 octets par
+    token détenu, quelle que soit l'offre totale, et au plus un bit par token de l'offre.
+    L'interface reprend celle d'un ensemble (in, len, itération, add, discard...) ; l'itération suit l'ordre
+    des numéros, donc l'ordre d'enregistrement des tokens. Entre deux ensembles d'un même registre, les
+    opérations groupées (union, différence) portent sur des tranches entières.
+    first(n) et last(n) ne parcourent que les tranches non vides, dans l'ordre des numéros.
+    """
+
+    def __init__(self, registry, token_ids=()):
+        """
+        :param registry: TokenRegistry partagé qui numérote les tokens
+        :param token_ids: identifiants à ajouter à la création
+        """
+        self.registry = registry
+        # Tranches non vides : clé (numéro >> 16) -> array("H") trié ou bytearray, et nombre de tokens de chacune
+        self._chunks = {}
+        self._sizes = {}
+        self._keys = []  # clés des tranches, triées
+        self._count = 0
+        self.update(token_ids)
+
+    def _set(self, number):
+        key, low = number >> _CHUNK_BITS, number & _CHUNK_MASK
+        chunk = self._chunks.get(key)
+        if chunk is None:
+            self._chunks[key] = array("H", [low])
+            self._sizes[key] = 1
+            insort(self._keys, key)
+            self._count += 1
+            return True
+        if isinstance(chunk, bytearray):
+            mask = 1 << (low & 7)
+            if chunk[low >> 3] & mask:
+                return False
+            chunk[low >> 3] |= mask
+        else:
+            position = bisect_left(chunk, low)
+            if position < len(chunk) and chunk[position] == low:
+                return False
+            chunk.insert(position, low)
+            if len(chunk) > _ARRAY_MAX:
+                self._chunks[key] = _to_bitmap(chunk)
+        self._sizes[key] += 1
+        self._count += 1
+        return True
+
+    def _unset(self, number):
+        key, low = number >> _CHUNK_BITS, number & _CHUNK_MASK
+        chunk = self._chunks.get(key)
+        if chunk is None:
+            return False
+        if isinstance(chunk, bytearray):
+            mask = 1 << (low & 7)
+            if not chunk[low >> 3] & mask:
+                return False
+            chunk[low >> 3] ^= mask
+        else:
+            position = bisect_left(chunk, low)
+            if position == len(chunk) or chunk[position] != low:
+                return False
+            del chunk[position]
+        self._count -= 1
+        self._resized(key, self._sizes[key] - 1)
+        return True
+
+    def _resized(self, key, size):
+        """
+        Enregistre la nouvelle taille d'une tranche : une tranche vide est supprimée, un bitmap trop peu
+        rempli redevient un tableau.
+        """
+        if size == 0:
+            del self._chunks[key]
+            del self._sizes[key]
+            del self._keys[bisect_left(self._keys, key)]
+            return
+        self._sizes[key] = size
+        chunk = self._chunks[key]
+        if isinstance(chunk, bytearray) and size < _ARRAY_MIN:
+            self._chunks[key] = array("H", _bitmap_members(chunk))
+
+    def _has(self, number):
+        chunk = self._chunks.get(number >> _CHUNK_BITS)
+        if chunk is None:
+            return False
+        low = number & _CHUNK_MASK
+        if isinstance(chunk, bytearray):
+            return bool(chunk[low >> 3] & (1 << (low & 7)))
+        position = bisect_left(chunk, low)
+        return position < len(chunk) and chunk[position] == low
+
+    def add(self, token_id):
+        self._set(self.registry.intern(token_id))
+
+    def discard(self, token_id):
+        """
+        Retire le token s'il est présent.
+        :return: True si le token était présent
+        """
+        number = self.registry.number(token_id)
+        return number is not None and self._unset(number)
+
+    def remove(self, token_id):
+        if not self.discard(token_id):
+            raise KeyError(token_id)
+
+    def update(self, token_ids):
+        """
+        Ajoute des tokens ; un autre ensemble du même registre est fusionné tranche par tranche.
+        """
+        if isinstance(token_ids, TokenBitmap) and token_ids.registry is self.registry:
+            for key in token_ids._keys:
+                self._merge_chunk(key, token_ids._chunks[key], token_ids._sizes[key])
+            return
+        for token_id in token_ids:
+            self.add(token_id)
+
+    def difference_update(self, token_ids):
+        """
+        Retire des tokens ; pour un autre ensemble du même registre, seules les tranches communes sont parcourues.
+        """
+        if isinstance(token_ids, TokenBitmap) and token_ids.registry is self.registry:
+            for key in token_ids._keys:
+                if key in self._chunks:
+                    self._subtract_chunk(key, token_ids._chunks[key])
+            return
+        for token_id in token_ids:
+            self.discard(token_id)
+
+    def _merge_chunk(self, key, other, other_size):
+        chunk = self._chunks.get(key)
+        if chunk is None:
+            # Tranche absente : copie directe
+            self._chunks[key] = other[:]
+            self._sizes[key] = other_size
+            insort(self._keys, key)
+            self._count += other_size
+            return
+        if isinstance(chunk, bytearray) or isinstance(other, bytearray):
+            # Au moins un bitmap : union des deux tranches vues comme de grands entiers (une passe en C)
+            value = int.from_bytes(self._bitmap(chunk), "little") | int.from_bytes(self._bitmap(other), "little")
+            merged = bytearray(value.to_bytes(_BITMAP_BYTES, "little"))
+            size = value.bit_count()
+        else:
+            merged = array("H", sorted(set(chunk).union(other)))
+            size = len(merged)
+            if size > _ARRAY_MAX:
+                merged = _to_bitmap(merged)
+        self._chunks[key] = merged
+        self._count += size - self._sizes[key]
+        self._sizes[key] = size
+        if isinstance(merged, bytearray):
+            self._resized(key, size)
+
+    def _subtract_chunk(self, key, other):
+        chunk = self._chunks[key]
+        if isinstance(chunk, bytearray):
+            value = int.from_bytes(chunk, "little") & ~int.from_bytes(self._bitmap(other), "little")
+            self._chunks[key] = bytearray(value.to_bytes(_BITMAP_BYTES, "little"))
+            size = value.bit_count()
+        else:
+            if isinstance(other, bytearray):
+                kept = [low for low in chunk if not other[low >> 3] & (1 << (low & 7))]
+            else:
+                removed = set(other)
+                kept = [low for low in chunk if low not in removed]
+            self._chunks[key] = array("H", kept)
+            size = len(kept)
+        self._count -= self._sizes[key] - size
+        self._resized(key, size)
+
+    @staticmethod
+    def _bitmap(chunk):
+        return chunk if isinstance(chunk, bytearray) else _to_bitmap(chunk)
+
+    def _chunk_members(self, key):
+        """
+        Itère sur les numéros bas d'une tranche, par ordre croissant.
+        """
+        chunk = self._chunks[key]
+        return _bitmap_members(chunk) if isinstance(chunk, bytearray) else iter(chunk)
+
+    def first(self, count):
+        """
+        Retourne les `count` premiers tokens (ordre des numéros), ou moins si l'ensemble en contient moins.
+        Le coût dépend de `count` et du nombre de tranches, pas de l'offre totale.
+        """
+        identifier = self.registry.identifier
+        result = []
+        for key in self._keys:
+            need = count - len(result)
+            if need <= 0:
+                break
+            chunk = self._chunks[key]
+            # Tranche tableau : découpage direct ; tranche bitmap : parcours des seuls octets non nuls
+            lows = islice(_bitmap_members(chunk), need) if isinstance(chunk, bytearray) else chunk[:need]
+            base = key << _CHUNK_BITS
+            result.extend(identifier(base + low) for low in lows)
+        return result
+
+    def last(self, count):
+        """
+        Retourne les `count` derniers tokens, dans l'ordre des numéros, ou moins si l'ensemble en contient moins.
+        """
+        identifier = self.registry.identifier
+        result = []
+        for key in reversed(self._keys):
+            need = count - len(result)
+            if need <= 0:
+                break
+            chunk = self._chunks[key]
+            lows = islice(_bitmap_members(chunk, True), need) if isinstance(chunk, bytearray) else chunk[:-need - 1:-1]
+            base = key << _CHUNK_BITS
+            result.extend(identifier(base + low) for low in lows)
+        result.reverse()
+        return result
+
+    def clear(self):
+        self._chunks = {}
+        self._sizes = {}
+        self._keys = []
+        self._count = 0
+
+    def numbers(self):
+        """
+        Itère sur les numéros des tokens présents, par ordre croissant (seules les tranches non vides sont parcourues).
+        """
+        for key in list(self._keys):
+            base = key << _CHUNK_BITS
+            for low in self._chunk_members(key):
+                yield base + low
+
+    def __iter__(self):
+        identifier = self.registry.identifier
+        for number in self.numbers():
+            yield identifier(number)
+
+    def __contains__(self, token_id):
+        number = self.registry.number(token_id)
+        return number is not None and self._has(number)
+
+    def __len__(self):
+        return self._count
+
+    def nbytes(self):
+        """
+        Retourne la taille des tranches stockées (octets), hors structures Python.
+        """
+        return sum(len(chunk) * chunk.itemsize if isinstance(chunk, array) else len(chunk)
+                   for chunk in self._chunks.values())
+
+    def copy(self):
+        clone = TokenBitmap(self.registry)
+        clone._chunks = {key: chunk[:] for key, chunk in self._chunks.items()}
+        clone._sizes = dict(self._sizes)
+        clone._keys = list(self._keys)
+        clone._count = self._count
+        return clone
+
+    def __eq__(self, other):
+        if isinstance(other, TokenBitmap) and other.registry is self.registry:
+            if self._count != other._count or self._keys != other._keys:
+                return False
+            for key in self._keys:
+                mine, theirs = self._chunks[key], other._chunks[key]
+                if type(mine) is type(theirs):
+                    if mine != theirs:
+                        return False
+                elif list(self._chunk_members(key)) != list(other._chunk_members(key)):
+                    return False
+            return True
+        if isinstance(other, (TokenBitmap, set, frozenset)):
+            return len(self) == len(other) and all(token_id in self for token_id in other)
+        return NotImplemented
+
+    def __and__(self, other):
+        # Intersection avec un ensemble quelconque : seuls les éléments de l'autre ensemble sont testés
+        return {token_id for token_id in other if token_id in self}
+
+    __rand__ = __and__
+
+    def __sub__(self, other):
+        return {token_id for token_id in self if token_id not in other}
+
+    def __xor__(self, other):
+        return set(self) ^ set(other)
+
+    __rxor__ = __xor__
+
+    def __repr__(self):
+        return "{" + ", ".join(repr(token_id) for token_id in self) + "}" if self._count else "set()"
@@ -0,0 +1,188 @@
+import hashlib
+import os
+import random
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from json.encoder import encode_basestring_ascii
+from src.token_ import Token
+
+# Taille d'un hash SHA-256 sous forme binaire
+HASH_SIZE = 32
+# Nombre de tokens hachés par tâche lorsque le hachage est réparti sur plusieurs processus
+HASH_BATCH_SIZE = 50_000
+
+
+def _format_uuid4(value):
+    """
+    Formate un entier de 128 bits en UUID version 4 (mêmes bits de version et de variante que uuid.uuid4).
+    """
+    value = (value & ~(0xF000 << 64) | (0x4000 << 64)) & ~(0xC000 << 48) | (0x8000 << 48)
+    digits = "%032x" % value
+    return f"{digits[:8]}-{digits[8:12]}-{digits[12:16]}-{digits[16:20]}-{digits[20:]}"
+
+
+def generate_identifiers(count, seed=None):
+    """
+    Génère `count` identifiants UUID4 en un seul lot.
+    :param seed: graine optionnelle ; avec une graine, les identifiants sont déterministes (tests, réseaux de démonstration)
+    """
+    if seed is not None:
+        getrandbits = random.Random(seed).getrandbits
+        return [_format_uuid4(getrandbits(128)) for _ in range(count)]
+    data = os.urandom(16 * count)
+    return [_format_uuid4(int.from_bytes(data[i:i + 16], "big")) for i in range(0, 16 * count, 16)]
+
+
+def token_hash(identifier, created_at):
+    """
+    Calcule le hash d'un token, identique à Token.calculate_hash (JSON à clés triées de l'identifiant et
+    de la date de création) mais sans passer par json.dumps ni par un objet Token.
+    :return: hash binaire (32 octets)
+    """
+    return hashlib.sha256(('{"created_at": %r, "identifier": %s}'
+                           % (created_at, encode_basestring_ascii(identifier))).encode()).digest()
+
+
+def hash_tokens(identifiers, created_at):
+    """
+    Calcule les hashes d'un lot de tokens.
+    :return: hashes binaires concaténés (32 octets par token, dans l'ordre des identifiants)
+    """
+    return b"".join(token_hash(identifier, timestamp) for identifier, timestamp in zip(identifiers, created_at))
+
+
+def _hash_chunk(chunk):
+    # Tâche exécutée dans un processus du pool
+    return hash_tokens(*chunk)
+
+
+def mint_tokens(count, created_at=None, seed=None, workers=None, batch_size=HASH_BATCH_SIZE):
+    """
+    Crée `count` tokens en bloc, directement sous forme de table en colonnes (sans objet Token ni dictionnaire).
+    :param created_at: date de création commune au lot (par défaut, l'heure courante)
+    :param seed: graine optionnelle pour des identifiants déterministes
+    :param workers: nombre de processus pour le hachage ; None ou 1 pour hacher dans le processus courant
+    :param batch_size: nombre de tokens par tâche envoyée au pool
+    :return: TokenTable des tokens créés
+    """
+    created_at = time.time() if created_at is None else created_at
+    identifiers = generate_identifiers(count, seed)
+    timestamps = array("d", [created_at]) * count
+    if workers is not None and workers > 1 and count > batch_size:
+        chunks = [(identifiers[i:i + batch_size], timestamps[i:i + batch_size]) for i in range(0, count, batch_size)]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            digests = b"".join(executor.map(_hash_chunk, chunks))
+    else:
+        digests = hash_tokens(identifiers, timestamps)
+    table = TokenTable()
+    table.extend(identifiers, timestamps, digests)
+    return table
+
+
+def creation_identifiers(transaction):
+    """
+    Retourne les identifiants des tokens créés par une transaction token_creation, qu'elle soit en colonnes
+    (identifiers, created_at, hashes) ou au format historique (tokens : un dictionnaire Token.to_dict par token).
+    """
+    if "identifiers" in transaction:
+        return transaction["identifiers"]
+    return [token_data.get("identifier") for token_data in transaction.get("tokens", [])]
+
+
+class TokenTable:
+    """
+    Table des tokens en colonnes : identifiants, dates de création (array de doubles) et hashes binaires
+    concaténés. Un token n'y coûte que son identifiant et 40 octets, contre un objet Token, son dictionnaire
+    d'attributs et un hash hexadécimal de 64 caractères. Les objets Token ne sont créés qu'à la demande.
+    """
+
+    def __init__(self):
+        self.identifiers = []
+        self.created_at = array("d")
+        self.hashes = bytearray()
+
+    def __len__(self):
+        return len(self.identifiers)
+
+    def append(self, identifier, created_at, token_hash_hex):
+        self.identifiers.append(identifier)
+        self.created_at.append(created_at)
+        self.hashes += bytes.fromhex(token_hash_hex)
+
+    def extend(self, identifiers, created_at, digests):
+        """
+        Ajoute un lot de tokens.
+        :param digests: hashes binaires concaténés (32 octets par token)
+        """
+        if len(created_at) != len(identifiers) or len(digests) != HASH_SIZE * len(identifiers):
+            raise ValueError("Colonnes de tokens de tailles incohérentes")
+        self.identifiers.extend(identifiers)
+        self.created_at.extend(created_at)
+        self.hashes += digests
+
+    def replace(self, position, created_at, token_hash_hex):
+        """
+        Remplace la date de création et le hash du token à une position (token réenregistré).
+        """
+        self.created_at[position] = created_at
+        self.hashes[HASH_SIZE * position:HASH_SIZE * (position + 1)] = bytes.fromhex(token_hash_hex)
+
+    def hash_at(self, position):
+        """
+        Retourne le hash hexadécimal du token à une position.
+        """
+        return self.hashes[HASH_SIZE * position:HASH_SIZE * (position + 1)].hex()
+
+    def to_dict(self, position):
+        """
+        Retourne le token à une position au format de Token.to_dict.
+        """
+        return {
+            "identifier": self.identifiers[position],
+            "created_at": self.created_at[position],
+            "hash": self.hash_at(position)
+        }
+
+    def to_dicts(self, start=0, end=None):
+        """
+        Retourne les tokens des positions [start, end) au format de Token.to_dict (transaction token_creation).
+        """
+        end = len(self) if end is None else end
+        return [self.to_dict(position) for position in range(start, end)]
+
+    def to_columns(self):
+        """
+        Retourne la table en colonnes pour une transaction token_creation : la liste des identifiants, la date
+        de création (une seule valeur si elle est commune à tous les tokens, comme pour un lot créé en bloc)
+        et les hashes concaténés en une seule chaîne hexadécimale. Aucun objet n'est créé par token.
+        """
+        created_at = self.created_at.tolist()
+        if len(self) and self.created_at.count(self.created_at[0]) == len(self):
+            created_at = self.created_at[0]
+        return {"identifiers": self.identifiers, "created_at": created_at, "hashes": self.hashes.hex()}
+
+    @classmethod
+    def from_columns(cls, columns):
+        """
+        Reconstruit une table à partir des colonnes d'une transaction token_creation (voir to_columns).
+        """
+        table = cls()
+        identifiers = list(columns["identifiers"])
+        created_at = columns["created_at"]
+        if isinstance(created_at, (int, float)):
+            timestamps = array("d", [created_at]) * len(identifiers)
+        else:
+            timestamps = array("d", created_at)
+        table.extend(identifiers, timestamps, bytes.fromhex(columns["hashes"]))
+        return table
+
+    def token_at(self, position):
+        """
+        Crée un objet Token pour le token à une position.
+        """
+        return Token.from_dict(self.to_dict(position))
+
+    def __iter__(self):
+        for position in range(len(self)):
+            yield self.token_at(position)
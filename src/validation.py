@@ -0,0 +1,86 @@
+import math
+import multiprocessing
+from src.miner import hash_meets_target
+
+# Nombre de tranches par processus : des tranches plus petites équilibrent mieux la charge
+_SHARDS_PER_WORKER = 4
+
+
+def _validate_range(task):
+    """
+    Vérifie une tranche de blocs sérialisés dans un processus du pool.
+    Chaque bloc est reconstruit à partir de sa forme binaire (ce qui recalcule sa racine de Merkle
+    et son hash), puis comparé au hash enregistré et relié au bloc précédent.
+    :return: l'index du premier bloc invalide de la tranche, ou None
+    """
+    block_cls, encoding, check_target, first_index, previous, records = task
+    if previous is None:
+        # Le premier enregistrement est celui du bloc qui précède la tranche (vérifié par la tranche précédente)
+        try:
+            anchor = block_cls.from_bytes(records[0][1], encoding=encoding)
+        except ValueError:
+            return first_index - 1
+        previous, records = (anchor.hash, anchor.timestamp), records[1:]
+    previous_hash, previous_timestamp = previous
+    for offset, (stored_hash, data) in enumerate(records):
+        index = first_index + offset
+        try:
+            block = block_cls.from_bytes(data, encoding=encoding)
+        except ValueError:
+            return index
+        # Sans hash enregistré (enregistrement relu d'un BlockStore), le hash recalculé est vérifié par le chaînage
+        if stored_hash is not None and block.hash != stored_hash:
+            return index
+        if check_target and not hash_meets_target(block.hash, block.target):
+            return index
+        if block.timestamp < previous_timestamp or block.previous_hash != previous_hash:
+            return index
+        previous_hash, previous_timestamp = block.hash, block.timestamp
+    return None
+
+
+def _iter_tasks(blocks, shard_size, check_target, end=None):
+    """
+    Découpe la chaîne (jusqu'à l'index `end` exclu) en tranches. Chaque tranche emporte le hash et l'horodatage
+    du bloc qui la précède, ce qui permet de vérifier le chaînage aux frontières entre tranches.
+    Le processus principal ne fait que rassembler les octets : pour une chaîne stockée (BlockStore), les
+    enregistrements sont envoyés tels qu'ils sont lus, sans désérialiser aucun bloc (celui qui précède la
+    tranche est envoyé avec elle) ; pour une chaîne en mémoire, les transactions étant gelées, le corps
+    mis en cache est réutilisé et seul l'en-tête est encodé.
+    Le décodage et le recalcul des racines de Merkle et des hashs se font dans les processus du pool.
+    """
+    end = len(blocks) if end is None else end
+    read_record = getattr(blocks, "read_record", None)
+    for start in range(1, end, shard_size):
+        stop = min(start + shard_size, end)
+        if read_record is not None:
+            records = [(None, read_record(index)) for index in range(start - 1, stop)]
+            yield blocks.block_cls, blocks.encoding, check_target, start, None, records
+        else:
+            previous = blocks[start - 1]
+            records = [(block.hash, block.to_bytes()) for block in blocks[start:stop]]
+            yield type(blocks[start]), blocks[start].encoding, check_target, start, \
+                (previous.hash, previous.timestamp), records
+
+
+def find_first_invalid_block(blocks, workers, check_target=False, shard_size=None, end=None):
+    """
+    Valide toute une chaîne en parallèle : la chaîne est découpée en tranches vérifiées par un pool
+    de processus (recalcul des hashs, chaînage, et cible pour une chaîne PoW), les frontières entre
+    tranches étant recousues grâce au hash du bloc précédant chaque tranche.
+    :param blocks: séquence des blocs de la chaîne (génésis compris)
+    :param check_target: vérifie aussi que chaque hash respecte la cible de son bloc (chaîne PoW)
+    :param end: index du premier bloc à ne pas vérifier (toute la chaîne par défaut)
+    :return: l'index du premier bloc invalide, ou None si la chaîne est valide
+    """
+    end = len(blocks) if end is None else end
+    if end < 2:
+        return None
+    if shard_size is None:
+        shard_size = max(1, math.ceil((end - 1) / (workers * _SHARDS_PER_WORKER)))
+    with multiprocessing.Pool(workers) as pool:
+        # Les résultats arrivent dans l'ordre des tranches : le premier échec est le premier bloc invalide
+        for invalid_index in pool.imap(_validate_range, _iter_tasks(blocks, shard_size, check_target, end)):
+            if invalid_index is not None:
+                return invalid_index
+    return None
@@ -1,11 +1,18 @@
 # wallet.py
 import uuid
+from src.token_registry import TokenRegistry, TokenBitmap
 
 class Wallet:
-    def __init__(self, address=None):
+    def __init__(self, address=None, registry=None):
         self.address = address or str(uuid.uuid4()) # Si une adresse est fournie, on l'utilise, sinon on en génère une unique.
-        self.available_tokens = set()
-        self.staked_tokens = set()
+        # Les tokens sont stockés sous forme de numéros (attribués par le registre, partagé par tous les wallets
+        # d'un même WalletManager) dans des ensembles compressés par tranches (TokenBitmap)
+        self.registry = registry if registry is not None else TokenRegistry()
+        self.available_tokens = TokenBitmap(self.registry)
+        self.staked_tokens = TokenBitmap(self.registry)
+        # Mode fongible : unités interchangeables comptées sans identifiant de token
+        self.available_amount = 0
+        self.staked_amount = 0
     
     def deposit_token(self, token_id, stake=False):
         """Ajoute un token dans le wallet.
@@ -17,32 +24,103 @@ class Wallet:
     
     def withdraw_token(self, token_id):
         """Retire un token du solde disponible (pour un transfert par exemple)."""
-        if token_id in self.available_tokens:
-            self.available_tokens.remove(token_id)
-            return True
-        return False
+        return self.available_tokens.discard(token_id)
 
     def stake_token(self, token_id):
         """Déplace un token du solde disponible vers le solde staké."""
-        if token_id in self.available_tokens:
-            self.available_tokens.remove(token_id)
+        if self.available_tokens.discard(token_id):
             self.staked_tokens.add(token_id)
             return True
         return False
 
     def unstake_token(self, token_id):
         """Déplace un token du solde staké vers le solde disponible."""
-        if token_id in self.staked_tokens:
-            self.staked_tokens.remove(token_id)
+        if self.staked_tokens.discard(token_id):
             self.available_tokens.add(token_id)
             return True
         return False
 
+    def first(self, n, staked=False):
+        """Retourne les n premiers tokens du wallet (ordre d'enregistrement des tokens), sans les retirer."""
+        return (self.staked_tokens if staked else self.available_tokens).first(n)
+
+    def last(self, n, staked=False):
+        """Retourne les n derniers tokens du wallet (ordre d'enregistrement des tokens), sans les retirer."""
+        return (self.staked_tokens if staked else self.available_tokens).last(n)
+
+    def take(self, n):
+        """Retire et retourne les n premiers tokens disponibles ; rien n'est retiré s'il y en a moins de n."""
+        if len(self.available_tokens) < n:
+            raise ValueError(f"Le wallet {self.address} n'a que {len(self.available_tokens)} token(s) disponible(s)")
+        token_ids = self.available_tokens.first(n)
+        self.withdraw_tokens(token_ids)
+        return token_ids
+
+    def pop_any(self):
+        """Retire et retourne un token disponible (le premier, pour un choix déterministe)."""
+        return self.take(1)[0]
+
+    def deposit_tokens(self, token_ids, stake=False):
+        """Ajoute un lot de tokens dans le wallet."""
+        (self.staked_tokens if stake else self.available_tokens).update(token_ids)
+
+    def withdraw_tokens(self, token_ids):
+        """Retire un lot de tokens du solde disponible, seulement s'ils y sont tous (sinon rien n'est retiré).
+        Chaque token coûte un test et un retrait dans sa tranche : le coût dépend du lot, pas de la taille du wallet."""
+        if not all(token_id in self.available_tokens for token_id in token_ids):
+            return False
+        self.available_tokens.difference_update(token_ids)
+        return True
+
+    def stake_tokens(self, token_ids):
+        """Déplace un lot de tokens du solde disponible vers le solde staké, seulement s'ils sont tous disponibles."""
+        if not self.withdraw_tokens(token_ids):
+            return False
+        self.staked_tokens.update(token_ids)
+        return True
+
+    def unstake_tokens(self, token_ids):
+        """Déplace un lot de tokens du solde staké vers le solde disponible, seulement s'ils sont tous stakés."""
+        if not all(token_id in self.staked_tokens for token_id in token_ids):
+            return False
+        self.staked_tokens.difference_update(token_ids)
+        self.available_tokens.update(token_ids)
+        return True
+
+    def deposit_amount(self, amount, stake=False):
+        """Ajoute des unités fongibles dans le wallet (en O(1), quel que soit le montant)."""
+        if stake:
+            self.staked_amount += amount
+        else:
+            self.available_amount += amount
+
+    def withdraw_amount(self, amount):
+        """Retire des unités fongibles du solde disponible, si le solde est suffisant."""
+        if 0 <= amount <= self.available_amount:
+            self.available_amount -= amount
+            return True
+        return False
+
+    def stake_amount(self, amount):
+        """Déplace des unités fongibles du solde disponible vers le solde staké."""
+        if self.withdraw_amount(amount):
+            self.staked_amount += amount
+            return True
+        return False
+
+    def unstake_amount(self, amount):
+        """Déplace des unités fongibles du solde staké vers le solde disponible."""
+        if 0 <= amount <= self.staked_amount:
+            self.staked_amount -= amount
+            self.available_amount += amount
+            return True
+        return False
+
     def balance(self):
-        return len(self.available_tokens)
+        return len(self.available_tokens) + self.available_amount
 
     def staked_balance(self):
-        return len(self.staked_tokens)
+        return len(self.staked_tokens) + self.staked_amount
 
     def total_balance(self):
         return self.balance() + self.staked_balance()
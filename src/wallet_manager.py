@@ -1,12 +1,15 @@
 # wallet_manager.py
 from src.wallet import Wallet
+from src.token_registry import TokenRegistry
 
 class WalletManager:
-    def __init__(self):
+    def __init__(self, registry=None):
         self.wallets = {}
+        # Registre de numérotation des tokens partagé par tous les wallets
+        self.registry = registry if registry is not None else TokenRegistry()
     
     def create_wallet(self, address=None):
-        wallet = Wallet(address)
+        wallet = Wallet(address, self.registry)
         self.wallets[wallet.address] = wallet
         return wallet
     
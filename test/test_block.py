@@ -3,6 +3,7 @@ import json
 import time
 import unittest
 from src.block import Block
+from src.encoding import ENCODING_JSON
 
 class TestBlock(unittest.TestCase):
     def test_block_properties(self):
@@ -12,7 +13,7 @@ class TestBlock(unittest.TestCase):
         transactions = ["Genesis Block"]
         fixed_time = 1234567890.0
 
-        block = Block(index, previous_hash, transactions, fixed_time)
+        block = Block(index, previous_hash, transactions, fixed_time, encoding=ENCODING_JSON)
 
         # Vérifie que les attributs sont correctement initialisés
         self.assertEqual(block.index, index)
@@ -35,6 +36,68 @@ class TestBlock(unittest.TestCase):
         self.assertEqual(block.hash, expected_hash)
         self.assertEqual(block.hash, block.calculate_hash())
 
+    def test_binary_hash(self):
+        fixed_time = 1234567890.0
+        block = Block(1, "abc123", [{"action": "transfer", "token_id": "t1"}], fixed_time, "Alice", "SIG")
+        expected_hash = hashlib.sha256(block.header_bytes()).hexdigest()
+        self.assertEqual(block.hash, expected_hash)
+        self.assertEqual(block.hash, block.calculate_hash())
+        # Le mode binaire ne produit pas le même hash que le mode JSON historique
+        legacy = Block(1, "abc123", [{"action": "transfer", "token_id": "t1"}], fixed_time, "Alice", "SIG",
+                       encoding=ENCODING_JSON)
+        self.assertNotEqual(block.hash, legacy.hash)
+
+    def test_to_bytes_roundtrip(self):
+        fixed_time = 1234567890.0
+        transactions = [{"action": "transfer", "token_id": "t1", "from": "a", "to": "b"}, "Texte libre"]
+        block = Block(3, "abc123", transactions, fixed_time, "Alice", None)
+        restored = Block.from_bytes(block.to_bytes())
+        self.assertEqual(restored.index, block.index)
+        self.assertEqual(restored.previous_hash, block.previous_hash)
+        self.assertEqual(restored.timestamp, block.timestamp)
+        self.assertEqual(restored.transactions, transactions)
+        self.assertEqual(restored.validator, "Alice")
+        self.assertIsNone(restored.pbft_signature)
+        self.assertEqual(restored.hash, block.hash)
+
+    def test_body_cache_invalidated_on_reassignment(self):
+        block = Block(1, "abc123", ["Transaction A"], 1234567890.0)
+        body = block.body_bytes()
+        self.assertIs(block.body_bytes(), body)
+        block.transactions = ["Transaction B"]
+        self.assertIsNot(block.body_bytes(), body)
+        self.assertNotEqual(block.hash, block.calculate_hash())
+
+    def test_transactions_are_frozen(self):
+        transactions = [{"action": "transfer", "token_ids": ["t1", "t2"], "to": "bob"}]
+        block = Block(1, "abc123", transactions, 1234567890.0)
+        # Le bloc garde sa propre copie gelée : la liste d'origine reste modifiable sans effet sur le bloc
+        transactions[0]["to"] = "mallory"
+        self.assertEqual(block.transactions[0]["to"], "bob")
+        self.assertIsInstance(block.transactions[0], dict)
+        with self.assertRaises(TypeError):
+            block.transactions[0]["to"] = "mallory"
+        with self.assertRaises(TypeError):
+            block.transactions[0]["token_ids"].append("t3")
+        with self.assertRaises(TypeError):
+            block.transactions.pop()
+        self.assertEqual(block.hash, block.calculate_hash())
+        restored = Block.from_bytes(block.to_bytes())
+        with self.assertRaises(TypeError):
+            restored.transactions[0]["to"] = "mallory"
+
+    def test_seal_rehashes_header_only(self):
+        transactions = [{"action": "transfer", "token_id": f"t{i}"} for i in range(3)]
+        candidate = Block(1, "abc123", transactions, 1234567890.0)
+        body = candidate.body_bytes()
+        root = candidate.merkle_root
+        candidate.seal("Alice", "SIG", 1234567891.0)
+        # Le corps encodé et la racine de Merkle sont réutilisés
+        self.assertIs(candidate.body_bytes(), body)
+        self.assertEqual(candidate.merkle_root, root)
+        expected = Block(1, "abc123", transactions, 1234567891.0, "Alice", "SIG")
+        self.assertEqual(candidate.hash, expected.hash)
+
     def test_hash_difference_with_different_transactions(self):
         index = 1
         previous_hash = "abc123"
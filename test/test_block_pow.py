@@ -5,6 +5,7 @@ import json
 import time
 import unittest
 from src.block_pow import BlockPow
+from src.encoding import ENCODING_JSON
 
 class TestBlockPow(unittest.TestCase):
     def test_block(self):
@@ -14,9 +15,9 @@ class TestBlockPow(unittest.TestCase):
         difficulty = 2
         t = time.time()
 
-        block = BlockPow(index, previous_hash, transactions, difficulty, t)
+        block = BlockPow(index, previous_hash, transactions, difficulty, t, encoding=ENCODING_JSON)
         # Création d'un second bloc avec une légère différence dans les transactions
-        block2 = BlockPow(index, previous_hash, ["Genesis block"], difficulty, t)
+        block2 = BlockPow(index, previous_hash, ["Genesis block"], difficulty, t, encoding=ENCODING_JSON)
 
         self.assertEqual(block.index, index)
         self.assertEqual(block.previous_hash, previous_hash)
@@ -35,5 +36,22 @@ class TestBlockPow(unittest.TestCase):
         self.assertEqual(block.hash, expected_hash)
         self.assertEqual(str(block), f"Block({index}, {previous_hash}, {t}, {transactions}, {block.nonce}, {block.hash})")
 
+    def test_binary_block(self):
+        t = 1234567890.0
+        block = BlockPow(1, "abc123", ["Transaction 1"], 2, t)
+        self.assertTrue(block.hash.startswith("00"))
+        self.assertEqual(block.hash, hashlib.sha256(block.header_bytes()).hexdigest())
+
+        restored = BlockPow.from_bytes(block.to_bytes(), difficulty=2)
+        self.assertEqual(restored.nonce, block.nonce)
+        self.assertEqual(restored.transactions, block.transactions)
+        self.assertEqual(restored.hash, block.hash)
+
+    def test_given_nonce_skips_mining(self):
+        t = 1234567890.0
+        block = BlockPow(1, "abc123", ["Transaction 1"], 2, t)
+        copy = BlockPow(1, "abc123", ["Transaction 1"], 2, t, nonce=block.nonce)
+        self.assertEqual(copy.hash, block.hash)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,220 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from src.block import Block
+from src.block_pow import BlockPow
+from src.block_store import BlockStore
+from src.blockchain import Blockchain
+from src.blockchain_manager import BlockchainManager
+from src.blockchain_pow import BlockchainPow
+
+class TestBlockStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_append_and_read(self):
+        store = BlockStore(self.path, sync_every=2)
+        blocks = [Block(i, f"prev{i}", [{"action": "transfer", "token_id": f"t{i}"}], 1000.0 + i) for i in range(5)]
+        for block in blocks:
+            store.append(block)
+        self.assertEqual(len(store), 5)
+        for block in blocks:
+            self.assertEqual(store[block.index].hash, block.hash)
+        self.assertEqual(store[-1].index, 4)
+        self.assertEqual([b.index for b in store[1:3]], [1, 2])
+        self.assertEqual([b.hash for b in store], [b.hash for b in blocks])
+        with self.assertRaises(ValueError):
+            store.append(Block(7, "prev", [], 1000.0))
+        store.close()
+
+    def test_reopen_blockchain(self):
+        blockchain = Blockchain(store=BlockStore(self.path))
+        for i in range(3):
+            blockchain.add_transaction(f"Transaction {i}")
+            blockchain.add_block("Alice", f"PBFT_Signature_{i}")
+        hashes = [block.hash for block in blockchain.chain]
+        blockchain.store.close()
+
+        reopened = Blockchain(store=BlockStore(self.path))
+        self.assertEqual(len(reopened.chain), 4)
+        self.assertEqual([block.hash for block in reopened.chain], hashes)
+        self.assertTrue(reopened.is_chain_valid())
+        reopened.add_transaction("Transaction 3")
+        reopened.add_block("Bob", "PBFT_Signature_3")
+        self.assertEqual(reopened.get_last_block().previous_hash, hashes[-1])
+        self.assertTrue(reopened.is_chain_valid(full=True))
+        reopened.store.close()
+
+    def test_lookup_index_built_on_first_lookup(self):
+        blockchain = Blockchain(store=BlockStore(self.path))
+        for i in range(3):
+            blockchain.add_transaction(f"Transaction {i}")
+            blockchain.add_block("Alice", f"PBFT_Signature_{i}")
+        hashes = [block.hash for block in blockchain.chain]
+        blockchain.store.close()
+
+        # La réouverture ne relit pas les en-têtes : l'index est construit à la première recherche
+        store = BlockStore(self.path)
+        with patch.object(BlockStore, "iter_headers", autospec=True, side_effect=BlockStore.iter_headers) as headers:
+            reopened = Blockchain(store=store)
+            reopened.add_transaction("Transaction 3")
+            reopened.add_block("Bob", "PBFT_Signature_3")
+            self.assertEqual(headers.call_count, 0)
+            self.assertEqual(reopened.get_block_by_hash(hashes[2]).index, 2)
+            self.assertEqual(reopened.get_block_by_hash(reopened.get_last_block().hash).index, 4)
+            self.assertEqual(len(reopened.get_blocks_between(0, float("inf"))), 5)
+            self.assertEqual(headers.call_count, 1)
+        store.close()
+
+    def test_lru_cache_is_bounded(self):
+        store = BlockStore(self.path, cache_size=3)
+        for i in range(10):
+            store.append(Block(i, "prev", [f"Transaction {i}"], 1000.0 + i))
+        self.assertEqual(len(store._cache), 3)
+        first = store[0]
+        self.assertIs(store[0], first)
+        self.assertIs(store[-1], store[9])
+        self.assertEqual((store.hits, store.misses), (3, 1))
+        # Un parcours complet ne remplit pas le cache
+        self.assertEqual([block.index for block in store], list(range(10)))
+        self.assertEqual(set(store._cache), {0, 8, 9})
+        for i in range(4):
+            store[i]
+        self.assertEqual(set(store._cache), {1, 2, 3})
+        store.close()
+
+    def test_manager_history_with_small_cache(self):
+        manager = BlockchainManager(initial_supply=100, transaction_threshold=1,
+                                    store=BlockStore(self.path, cache_size=2))
+        origin = manager.wallet_manager.get_wallet("wallet_creator")
+        token = sorted(origin.available_tokens)[0]
+        for target in ("wallet_JJ", "wallet_Lina", "wallet_Mathis"):
+            owner = "wallet_creator" if target == "wallet_JJ" else previous
+            manager.transfer_token(token, owner, target)
+            previous = target
+        history = manager.get_token_history(token)
+        self.assertEqual([event["action"] for event in history], ["creation", "transfer", "transfer", "transfer"])
+        self.assertEqual(history[-1]["block_index"], manager.get_last_block().index)
+        self.assertLessEqual(len(manager.store._cache), 2)
+        manager.store.close()
+
+    def test_prune_archives_old_bodies(self):
+        blockchain = Blockchain(store=BlockStore(self.path), prune_depth=2)
+        for i in range(6):
+            blockchain.add_transaction({"action": "transfer", "token_id": f"t{i}", "from": "a", "to": "b"})
+            blockchain.add_block("Alice", f"PBFT_Signature_{i}")
+        store = blockchain.store
+        hashes = [block.hash for block in blockchain.chain]
+        # Élagage par lots : le journal est réécrit lorsque 2 * prune_depth blocs ne sont pas élagués
+        self.assertEqual(store.pruned_height, 4)
+        self.assertTrue(os.path.exists(os.path.join(self.path, "bodies.archive")))
+        self.assertTrue(blockchain.is_chain_valid(full=True))
+        store.close()
+
+        reopened = BlockStore(self.path, cache_size=1)
+        self.assertEqual(reopened.pruned_height, 4)
+        self.assertTrue(reopened.is_pruned(3))
+        self.assertFalse(reopened.is_pruned(4))
+        # Les corps archivés sont relus à la demande
+        self.assertEqual([block.hash for block in reopened], hashes)
+        self.assertEqual(reopened[3].transactions[0]["token_id"], "t2")
+        reopened.close()
+
+    def test_pruned_headers_validated_without_archive(self):
+        blockchain = Blockchain(store=BlockStore(self.path))
+        for i in range(5):
+            blockchain.add_transaction(f"Transaction {i}")
+            blockchain.add_block("Alice", f"PBFT_Signature_{i}")
+        self.assertEqual(blockchain.prune(depth=1), 5)
+        blockchain.store.close()
+        os.remove(os.path.join(self.path, "bodies.archive"))
+        reopened = BlockStore(self.path)
+        self.assertIsNone(reopened.find_invalid_header(1, reopened.pruned_height))
+        with self.assertRaises(FileNotFoundError):
+            reopened[2]
+        reopened.close()
+
+    def test_tampered_pruned_header_detected(self):
+        blockchain = Blockchain(store=BlockStore(self.path))
+        for i in range(4):
+            blockchain.add_transaction(f"Transaction {i}")
+            blockchain.add_block("Alice", f"PBFT_Signature_{i}")
+        blockchain.prune(depth=1)
+        blockchain.store.close()
+        # Altération de la signature PBFT du bloc 2 directement dans les en-têtes élagués
+        log_path = os.path.join(self.path, "headers.log")
+        with open(log_path, "rb") as log_file:
+            data = log_file.read()
+        with open(log_path, "wb") as log_file:
+            log_file.write(data.replace(b"PBFT_Signature_1", b"PBFT_Signature_X"))
+        reopened = Blockchain(store=BlockStore(self.path))
+        self.assertFalse(reopened.is_chain_valid())
+        self.assertEqual(reopened.store.find_invalid_header(1, 4), 3)
+        reopened.store.close()
+
+    def test_prune_drops_whole_segments(self):
+        store = BlockStore(self.path, segment_size=3)
+        blocks = [Block(i, "prev", [f"Transaction {i}"], 1000.0 + i) for i in range(8)]
+        for block in blocks:
+            store.append(block)
+        self.assertEqual(store._segments, [0, 3, 6])
+        kept = store.segment_path(3)
+        kept_size = os.path.getsize(kept)
+        self.assertEqual(store.prune(4), 4)
+        # Seul le segment entièrement élagué est supprimé ; les autres ne sont pas réécrits
+        self.assertFalse(os.path.exists(store.segment_path(0)))
+        self.assertEqual(os.path.getsize(kept), kept_size)
+        self.assertEqual(store.prune(7), 3)
+        self.assertFalse(os.path.exists(kept))
+        store.close()
+        reopened = BlockStore(self.path, segment_size=3)
+        self.assertEqual(reopened.pruned_height, 7)
+        self.assertEqual([block.hash for block in reopened], [block.hash for block in blocks])
+        reopened.append(Block(8, "prev", ["Transaction 8"], 1008.0))
+        self.assertEqual(reopened[8].transactions, ["Transaction 8"])
+        reopened.close()
+
+    def test_prune_pow_chain(self):
+        blockchain = BlockchainPow(difficulty=1, store=BlockStore(self.path, block_cls=BlockPow), prune_depth=1)
+        for i in range(3):
+            blockchain.add_block([f"Transaction {i}"])
+        self.assertGreater(blockchain.store.pruned_height, 0)
+        self.assertTrue(blockchain.is_chain_valid(full=True))
+        self.assertEqual(blockchain.chain[1].transactions, ["Transaction 0"])
+        blockchain.store.close()
+
+    def test_prune_requires_store(self):
+        with self.assertRaises(ValueError):
+            Blockchain(prune_depth=2)
+
+    def test_truncated_tail_is_recovered(self):
+        store = BlockStore(self.path)
+        for i in range(3):
+            store.append(Block(i, "prev", [f"Transaction {i}"], 1000.0 + i))
+        store.close()
+        # Écriture interrompue : le dernier enregistrement est incomplet
+        log_path = store.segment_path(0)
+        with open(log_path, "r+b") as log_file:
+            log_file.truncate(os.path.getsize(log_path) - 5)
+        store = BlockStore(self.path)
+        self.assertEqual(len(store), 2)
+        store.append(Block(2, "prev", ["Transaction 2"], 1002.0))
+        self.assertEqual(store[2].transactions, ["Transaction 2"])
+        store.close()
+
+    def test_reopen_pow_chain(self):
+        blockchain = BlockchainPow(difficulty=2, store=BlockStore(self.path, block_cls=BlockPow))
+        blockchain.add_block(["Transaction 1"])
+        blockchain.store.close()
+        reopened = BlockchainPow(difficulty=2, store=BlockStore(self.path, block_cls=BlockPow))
+        self.assertEqual(len(reopened.chain), 2)
+        self.assertTrue(reopened.is_chain_valid())
+        reopened.store.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -11,8 +11,10 @@ Les tests portent sur :
 
 import time
 import unittest
+from unittest.mock import patch
 from src.block import Block
 from src.blockchain import Blockchain
+from src.encoding import ENCODING_JSON
 
 class TestBlockchain(unittest.TestCase):
     def setUp(self):
@@ -39,6 +41,88 @@ class TestBlockchain(unittest.TestCase):
         self.blockchain.chain[1].transactions = ["Tampered Transaction"]
         self.assertFalse(self.blockchain.is_chain_valid())
 
+    def test_add_candidate_block(self):
+        self.blockchain.add_transaction("Transaction 1")
+        candidate = self.blockchain.create_candidate_block(self.blockchain.pending_transactions)
+        self.blockchain.add_block("Alice", "PBFT_Signature_1", block=candidate)
+        self.assertIs(self.blockchain.chain[1], candidate)
+        self.assertEqual(candidate.validator, "Alice")
+        self.assertTrue(self.blockchain.is_chain_valid())
+        # Un candidat qui ne prolonge pas la chaîne est refusé
+        stale = Block(1, "0", ["Transaction 2"])
+        with self.assertRaises(ValueError):
+            self.blockchain.add_block("Alice", "PBFT_Signature_2", block=stale)
+
+    def test_legacy_json_chain(self):
+        # Une chaîne hachée à l'ancienne (json.dumps) reste vérifiable en mode compatibilité
+        legacy = Blockchain(encoding=ENCODING_JSON)
+        legacy.add_transaction({"action": "transfer", "token_id": "t1"})
+        legacy.add_block("Alice", "PBFT_Signature_1")
+        self.assertTrue(legacy.is_chain_valid())
+        legacy.chain[1].transactions = ["Tampered Transaction"]
+        self.assertFalse(legacy.is_chain_valid())
+
+    def test_transaction_proof(self):
+        transactions = [{"action": "transfer", "token_id": f"t{i}"} for i in range(5)]
+        for tx in transactions:
+            self.blockchain.add_transaction(tx)
+        self.blockchain.add_block("Alice", "PBFT_Signature_1")
+        for position, tx in enumerate(transactions):
+            proof = self.blockchain.get_transaction_proof(1, position)
+            self.assertEqual(proof["merkle_root"], self.blockchain.chain[1].merkle_root)
+            self.assertTrue(self.blockchain.verify_proof(tx, proof))
+        proof = self.blockchain.get_transaction_proof(1, 2)
+        self.assertFalse(self.blockchain.verify_proof(transactions[3], proof))
+        with self.assertRaises(ValueError):
+            self.blockchain.get_transaction_proof(1, 5)
+
+    def test_incremental_validation(self):
+        for i in range(3):
+            self.blockchain.add_transaction(f"Transaction {i}")
+            self.blockchain.add_block("Alice", f"PBFT_Signature_{i}")
+        self.assertTrue(self.blockchain.is_chain_valid())
+        self.blockchain.add_transaction("Transaction 3")
+        self.blockchain.add_block("Alice", "PBFT_Signature_3")
+        # Seul le nouveau bloc est revérifié
+        with patch.object(Block, "calculate_hash", autospec=True, side_effect=lambda b: b.hash) as calculate:
+            self.assertTrue(self.blockchain.is_chain_valid())
+        self.assertEqual([call.args[0].index for call in calculate.call_args_list], [4])
+
+    def test_tampering_validated_block_is_detected(self):
+        for i in range(3):
+            self.blockchain.add_transaction(f"Transaction {i}")
+            self.blockchain.add_block("Alice", f"PBFT_Signature_{i}")
+        self.assertTrue(self.blockchain.is_chain_valid())
+        # Modification d'un bloc ancien, déjà couvert par le watermark
+        self.blockchain.chain[1].validator = "Mallory"
+        self.assertFalse(self.blockchain.is_chain_valid())
+        self.blockchain.chain[1].validator = "Alice"
+        self.assertTrue(self.blockchain.is_chain_valid())
+        # Les transactions d'un bloc validé ne peuvent être changées que par réaffectation, qui est suivie
+        with self.assertRaises(TypeError):
+            self.blockchain.chain[2].transactions[0] = "Tampered Transaction"
+        self.assertEqual(self.blockchain._verified_height, 3)
+        self.blockchain.chain[2].transactions = ["Tampered Transaction"]
+        self.assertEqual(self.blockchain._verified_height, 1)
+        self.assertFalse(self.blockchain.is_chain_valid())
+
+    def test_in_place_tampering_is_refused(self):
+        self.blockchain.add_transaction({"action": "transfer", "token_id": "t1", "to": "bob"})
+        self.blockchain.add_block("Alice", "PBFT_Signature_1")
+        self.assertTrue(self.blockchain.is_chain_valid())
+        # Les transactions d'un bloc sont gelées : une modification sur place est refusée
+        transactions = self.blockchain.chain[1].transactions
+        with self.assertRaises(TypeError):
+            transactions[0]["to"] = "mallory"
+        with self.assertRaises(TypeError):
+            transactions.append("Tampered Transaction")
+        self.assertEqual(transactions[0]["to"], "bob")
+        self.assertTrue(self.blockchain.is_chain_valid())
+        # Une copie reste modifiable, sans effet sur le bloc
+        event = transactions[0].copy()
+        event["to"] = "mallory"
+        self.assertTrue(self.blockchain.is_chain_valid())
+
     def test_get_last_block(self):
         self.blockchain.add_transaction("Transaction 1")
         self.blockchain.add_block("Alice", "PBFT_Signature_1")
@@ -53,5 +137,17 @@ class TestBlockchain(unittest.TestCase):
         self.blockchain.add_block("Bob", "PBFT_Signature_2")
         self.assertEqual(len(self.blockchain.chain), 3)
 
+    def test_lookup_by_hash_and_time(self):
+        for i in range(3):
+            self.blockchain.add_transaction(f"Transaction {i}")
+            with patch("src.block.time.time", return_value=4e9 + i):
+                self.blockchain.add_block("Alice", f"PBFT_Signature_{i}")
+        chain = self.blockchain.chain
+        self.assertIs(self.blockchain.get_block_by_hash(chain[2].hash), chain[2])
+        self.assertIsNone(self.blockchain.get_block_by_hash("inconnu"))
+        self.assertEqual([b.index for b in self.blockchain.get_blocks_between(4e9, 4e9 + 1)], [1, 2])
+        self.assertEqual([b.index for b in self.blockchain.get_blocks_between(4e9 + 1.5, 5e9)], [3])
+        self.assertEqual(self.blockchain.get_blocks_between(1.0, 2.0), [])
+
 if __name__ == '__main__':
     unittest.main()
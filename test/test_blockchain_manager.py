@@ -1,5 +1,7 @@
+import tempfile
 import unittest
 import time
+from src.block_store import BlockStore
 from src.blockchain_manager import BlockchainManager
 
 class TestBlockchainManager(unittest.TestCase):
@@ -79,5 +81,153 @@ class TestBlockchainManager(unittest.TestCase):
         self.assertIn(token, self.origin.staked_tokens)
         self.assertNotIn(token, self.origin.available_tokens)
 
+    def test_token_history_with_proofs(self):
+        token = self.get_origin_token()
+        self.blockchain.manual_votes = {v: True for v in self.validators}
+        self.blockchain.transfer_token(token, "wallet_creator", "wallet_JJ")
+        self.blockchain.commit_pending_transactions()
+        history = self.blockchain.get_token_history(token, with_proofs=True)
+        self.assertEqual([event["action"] for event in history], ["creation", "transfer"])
+        for event in history:
+            self.assertTrue(self.blockchain.verify_proof(None, event["proof"]))
+        transfer = history[-1]
+        tx = {k: v for k, v in transfer.items() if k not in ("block_hash", "block_index", "proof")}
+        self.assertTrue(self.blockchain.verify_proof(tx, transfer["proof"]))
+
+    def test_reopen_store_keeps_history(self):
+        with tempfile.TemporaryDirectory() as path:
+            manager = BlockchainManager(initial_supply=100, transaction_threshold=10, store=BlockStore(path))
+            hashes = [block.hash for block in manager.chain]
+            manager.store.close()
+            reopened = BlockchainManager(initial_supply=100, transaction_threshold=10, store=BlockStore(path))
+            # Pas de nouveau bloc d'offre initiale à la réouverture
+            self.assertEqual([block.hash for block in reopened.chain], hashes)
+            # La création en colonnes est rejouée à l'identique
+            self.assertEqual(reopened.token_manager.table.identifiers, manager.token_manager.table.identifiers)
+            self.assertEqual(reopened.token_manager.table.hashes, manager.token_manager.table.hashes)
+            reopened.store.close()
+
+    def test_initial_supply_is_columnar(self):
+        creation = self.blockchain.chain[1].transactions[0]
+        self.assertEqual(creation["action"], "token_creation")
+        self.assertNotIn("tokens", creation)
+        table = self.blockchain.token_manager.table
+        self.assertEqual(list(creation["identifiers"]), table.identifiers)
+        self.assertEqual(creation["hashes"], table.hashes.hex())
+
+    def test_transfer_tokens_batch(self):
+        tokens = sorted(self.origin.available_tokens)[:10]
+        self.blockchain.manual_votes = {v: True for v in self.validators}
+        transaction = self.blockchain.transfer_tokens(tokens, "wallet_creator", "wallet_JJ")
+        # Une seule transaction et un seul retour arrière pour tout le lot
+        self.assertEqual(transaction["action"], "transfer_batch")
+        self.assertEqual(len(self.blockchain.pending_transactions), 1)
+        self.assertEqual(len(self.blockchain.pending_rollbacks), 1)
+        self.blockchain.commit_pending_transactions()
+        jj = self.blockchain.wallet_manager.get_wallet("wallet_JJ")
+        self.assertTrue(all(token in jj.available_tokens for token in tokens))
+        self.assertEqual(self.blockchain.verify_wallets(), [])
+        history = self.blockchain.get_token_history(tokens[3], with_proofs=True)
+        self.assertEqual([(e["action"], e["token_id"]) for e in history],
+                         [("creation", tokens[3]), ("transfer_batch", tokens[3])])
+        self.assertTrue(self.blockchain.verify_proof(None, history[-1]["proof"]))
+
+    def test_transfer_tokens_checks_balance_first(self):
+        tokens = sorted(self.origin.available_tokens)[:3] + ["inconnu"]
+        with self.assertRaises(ValueError):
+            self.blockchain.transfer_tokens(tokens, "wallet_creator", "wallet_JJ")
+        # Rien n'a bougé
+        self.assertTrue(all(token in self.origin.available_tokens for token in tokens[:3]))
+        self.assertEqual(self.blockchain.pending_transactions, [])
+
+    def test_stake_tokens_batch_rollback(self):
+        tokens = sorted(self.origin.available_tokens)[:5]
+        self.blockchain.manual_votes = {v: False for v in self.validators}
+        self.blockchain.stake_tokens(tokens, "wallet_creator")
+        self.assertEqual(len(self.origin.staked_tokens), 5)
+        self.blockchain.commit_pending_transactions()
+        self.assertEqual(len(self.origin.staked_tokens), 0)
+        self.blockchain.manual_votes = {v: True for v in self.validators}
+        self.blockchain.stake_tokens(tokens, "wallet_creator")
+        self.blockchain.unstake_tokens(tokens[:2], "wallet_creator")
+        self.blockchain.commit_pending_transactions()
+        self.assertEqual(len(self.origin.staked_tokens), 3)
+        self.assertEqual(self.blockchain.verify_wallets(), [])
+
+    def test_wallet_for_user(self):
+        # Un crédit nul crée le wallet sans transaction par lot vide
+        wallet = self.blockchain.create_wallet_for_user("wallet_Zero", initial_credit=0)
+        self.assertEqual(wallet.balance(), 0)
+        self.assertEqual(self.blockchain.pending_transactions, [])
+        self.blockchain.create_wallet_for_user("wallet_Five")
+        self.assertEqual(self.blockchain.wallet_manager.get_wallet("wallet_Five").balance(), 5)
+        # Un crédit impossible est refusé avant la création du wallet
+        with self.assertRaises(ValueError):
+            self.blockchain.create_wallet_for_user("wallet_Rich", initial_credit=1000)
+        with self.assertRaises(ValueError):
+            self.blockchain.wallet_manager.get_wallet("wallet_Rich")
+        self.assertEqual(self.blockchain.create_initial_wallet("wallet_Init", initial_credit=0).balance(), 0)
+        self.assertEqual(len(self.blockchain.pending_transactions), 1)
+
+    def test_fungible_transfer_amount(self):
+        manager = BlockchainManager(initial_supply=100, transaction_threshold=10, fungible=True)
+        origin = manager.wallet_manager.get_wallet("wallet_creator")
+        # Offre initiale créditée en unités : 100 - 3 x 15 crédités aux validateurs
+        self.assertEqual(origin.balance(), 55)
+        self.assertEqual(len(origin.available_tokens), 0)
+        self.assertEqual(manager.wallet_manager.get_wallet("wallet_Lina").staked_balance(), 1)
+        manager.transfer_amount("wallet_creator", "wallet_JJ", 50)
+        # Un seul mouvement, une seule transaction
+        self.assertEqual(len(manager.pending_transactions), 1)
+        self.assertEqual(origin.balance(), 5)
+        with self.assertRaises(ValueError):
+            manager.transfer_amount("wallet_creator", "wallet_JJ", 6)
+        manager.commit_pending_transactions()
+        self.assertEqual(manager.wallet_manager.get_wallet("wallet_JJ").balance(), 64)
+        self.assertEqual(manager.verify_wallets(), [])
+
+    def test_fungible_rollback_on_consensus_failure(self):
+        manager = BlockchainManager(initial_supply=100, transaction_threshold=10, fungible=True)
+        manager.manual_votes = {v: False for v in manager.validators}
+        manager.transfer_amount("wallet_creator", "wallet_JJ", 10)
+        manager.stake_amount("wallet_creator", 5)
+        manager.commit_pending_transactions()
+        origin = manager.wallet_manager.get_wallet("wallet_creator")
+        self.assertEqual((origin.balance(), origin.staked_balance()), (55, 0))
+        self.assertEqual(manager.wallet_manager.get_wallet("wallet_JJ").balance(), 14)
+
+    def test_fungible_wallet_for_user(self):
+        manager = BlockchainManager(initial_supply=100, transaction_threshold=10, fungible=True)
+        # Un crédit nul crée le wallet sans transaction
+        wallet = manager.create_wallet_for_user("wallet_Zero", initial_credit=0)
+        self.assertEqual(wallet.balance(), 0)
+        self.assertEqual(manager.pending_transactions, [])
+        manager.create_wallet_for_user("wallet_Five")
+        self.assertEqual(manager.wallet_manager.get_wallet("wallet_Five").balance(), 5)
+        # Un crédit impossible est refusé avant la création du wallet
+        with self.assertRaises(ValueError):
+            manager.create_wallet_for_user("wallet_Rich", initial_credit=1000)
+        with self.assertRaises(ValueError):
+            manager.wallet_manager.get_wallet("wallet_Rich")
+
+    def test_fungible_initial_wallet_without_stake(self):
+        manager = BlockchainManager(initial_supply=100, transaction_threshold=10, fungible=True)
+        # Crédit nul ou aucun stake demandé : pas de stake d'un montant nul
+        wallet = manager.create_and_stake_initial_wallet("wallet_Zero", initial_credit=0)
+        self.assertEqual((wallet.balance(), wallet.staked_balance()), (0, 0))
+        wallet = manager.create_and_stake_initial_wallet("wallet_NoStake", initial_credit=5, stake_count=0)
+        self.assertEqual((wallet.balance(), wallet.staked_balance()), (5, 0))
+        self.assertNotIn("wallet_NoStake", manager.validators)
+
+    def test_failed_rollback_is_reported(self):
+        tokens = sorted(self.origin.available_tokens)[:3]
+        self.blockchain.transfer_tokens(tokens, "wallet_creator", "wallet_JJ")
+        undo = self.blockchain.pending_rollbacks[-1]
+        # Le lot a quitté le wallet destinataire : le retour arrière ne peut pas le lui reprendre
+        self.blockchain.wallet_manager.get_wallet("wallet_JJ").withdraw_tokens(tokens[:1])
+        with self.assertRaises(ValueError):
+            undo()
+        self.assertTrue(all(token not in self.origin.available_tokens for token in tokens))
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,7 +1,10 @@
+import asyncio
 import time
 import unittest
 from src.blockchain_pow import BlockchainPow
 from src.block_pow import BlockPow
+from src.encoding import ENCODING_JSON
+from src.miner import hash_meets_target
 
 class TestBlockchainPow(unittest.TestCase):
 
@@ -26,6 +29,22 @@ class TestBlockchainPow(unittest.TestCase):
         self.blockchain.chain[1].transactions = ["Tampered Transaction"]
         self.assertFalse(self.blockchain.is_chain_valid())
 
+    def test_in_place_tampering_is_refused(self):
+        self.blockchain.add_block([{"action": "transfer", "token_id": "t1", "to": "bob"}])
+        self.assertTrue(self.blockchain.is_chain_valid())
+        with self.assertRaises(TypeError):
+            self.blockchain.chain[1].transactions[0]["to"] = "mallory"
+        self.assertTrue(self.blockchain.is_chain_valid())
+
+    def test_incremental_validation(self):
+        self.blockchain.add_block(["Transaction 1"])
+        self.assertTrue(self.blockchain.is_chain_valid())
+        self.blockchain.add_block(["Transaction 2"])
+        self.assertTrue(self.blockchain.is_chain_valid())
+        self.blockchain.chain[1].nonce += 1
+        self.assertFalse(self.blockchain.is_chain_valid())
+        self.assertFalse(self.blockchain.is_chain_valid(full=True))
+
     def test_get_last_block(self):
         self.blockchain.add_block(["Transaction 1"])
         last_block = self.blockchain.get_last_block()
@@ -37,5 +56,87 @@ class TestBlockchainPow(unittest.TestCase):
         self.blockchain.add_block(["Transaction 2"])
         self.assertEqual(len(self.blockchain.chain), 3)
 
+    def test_retargeting(self):
+        # Blocs produits quasi instantanément alors que 60 s sont visées : la cible doit baisser
+        blockchain = BlockchainPow(difficulty=1, block_interval=60, retarget_interval=2)
+        for i in range(4):
+            blockchain.add_block([f"Transaction {i}"])
+        targets = [block.target for block in blockchain.chain]
+        self.assertEqual(targets[:3], [blockchain.initial_target] * 3)
+        self.assertEqual(targets[3], blockchain.initial_target // 4)
+        self.assertEqual(targets[4], targets[3])
+        self.assertTrue(blockchain.is_chain_valid())
+
+    def test_retargeting_legacy_json_chain(self):
+        # Le minage en mode ENCODING_JSON respecte aussi la cible réajustée
+        blockchain = BlockchainPow(difficulty=1, encoding=ENCODING_JSON, block_interval=60, retarget_interval=2)
+        for i in range(4):
+            blockchain.add_block([f"Transaction {i}"])
+        self.assertEqual(blockchain.chain[3].target, blockchain.initial_target // 4)
+        self.assertTrue(all(hash_meets_target(block.hash, block.target) for block in blockchain.chain))
+        self.assertTrue(blockchain.is_chain_valid())
+
+    def test_invalid_intervals_rejected(self):
+        with self.assertRaises(ValueError):
+            BlockchainPow(difficulty=1, block_interval=0)
+        with self.assertRaises(ValueError):
+            BlockchainPow(difficulty=1, block_interval=60, retarget_interval=0)
+
+    def test_invalid_target(self):
+        self.blockchain.add_block(["Transaction 1"])
+        block = self.blockchain.chain[1]
+        # Un bloc miné avec une cible plus facile que celle imposée est refusé
+        easy = BlockPow(2, block.hash, ["Transaction 2"], 1)
+        self.assertFalse(self.blockchain.receive_block(easy))
+
+    def test_background_mining(self):
+        future = self.blockchain.start_mining(["Transaction 1"])
+        block = future.result(timeout=30)
+        self.assertIs(self.blockchain.get_last_block(), block)
+        self.assertEqual(block.transactions, ["Transaction 1"])
+        self.assertTrue(self.blockchain.is_chain_valid())
+
+    def test_cancel_background_mining(self):
+        # Difficulté inatteignable : seul l'annulation peut terminer le minage
+        blockchain = BlockchainPow(difficulty=2)
+        blockchain.next_target = lambda: 1
+        future = blockchain.start_mining(["Transaction 1"])
+        time.sleep(0.05)
+        started = time.perf_counter()
+        blockchain.cancel_mining()
+        self.assertIsNone(future.result(timeout=5))
+        self.assertLess(time.perf_counter() - started, 1)
+        self.assertEqual(len(blockchain.chain), 1)
+
+    def test_restart_on_new_tip(self):
+        blockchain = BlockchainPow(difficulty=2)
+        blockchain.next_target = lambda: 1
+        future = blockchain.start_mining(["Transaction minée"])
+        time.sleep(0.05)
+        # Un bloc concurrent arrive : le minage doit repartir sur ce nouveau dernier bloc
+        competitor = BlockPow(1, blockchain.get_last_block().hash, ["Bloc concurrent"], 2)
+        del blockchain.next_target
+        self.assertTrue(blockchain.receive_block(competitor))
+        block = future.result(timeout=30)
+        self.assertEqual(block.index, 2)
+        self.assertEqual(block.previous_hash, competitor.hash)
+        self.assertTrue(blockchain.is_chain_valid())
+
+    def test_receive_invalid_block(self):
+        stale = BlockPow(1, "0", ["Bloc invalide"], 2)
+        self.assertFalse(self.blockchain.receive_block(stale))
+        self.assertEqual(len(self.blockchain.chain), 1)
+
+    def test_mine_async(self):
+        block = asyncio.run(self.blockchain.mine_async(["Transaction 1"]))
+        self.assertIs(self.blockchain.get_last_block(), block)
+
+    def test_lookup_by_hash(self):
+        self.blockchain.add_block(["Transaction 1"])
+        competitor = BlockPow(2, self.blockchain.get_last_block().hash, ["Bloc reçu"], 2)
+        self.assertTrue(self.blockchain.receive_block(competitor))
+        self.assertIs(self.blockchain.get_block_by_hash(competitor.hash), competitor)
+        self.assertEqual(self.blockchain.get_blocks_between(competitor.timestamp, competitor.timestamp), [competitor])
+
 if __name__ == '__main__':
     unittest.main()
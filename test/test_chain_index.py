@@ -0,0 +1,151 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from src.block import Block
+from src.block_store import BlockStore
+from src.blockchain import Blockchain
+from src.blockchain_manager import BlockchainManager
+from src.chain_index import ChainIndex, address_keys, token_keys
+
+def make_chain():
+    blocks = [Block(0, "0", ["Genesis Block"], 1000.0)]
+    blocks.append(Block(1, blocks[-1].hash, [{"action": "token_creation", "owner": "a",
+                                              "tokens": [{"identifier": "t1"}, {"identifier": "t2"}]}], 1001.0))
+    blocks.append(Block(2, blocks[-1].hash, [{"action": "transfer", "token_id": "t1", "from": "a", "to": "b"},
+                                             {"action": "stake", "token_id": "t2", "address": "a"},
+                                             {"action": "stake", "token_id": "t1", "address": "b"}], 1002.0))
+    return blocks
+
+class TestChainIndex(unittest.TestCase):
+    def test_index_positions(self):
+        index = ChainIndex(token_keys)
+        index.update(make_chain())
+        self.assertEqual(index.get("t1"), [(1, 0), (2, 0), (2, 2)])
+        self.assertEqual(index.get("t2"), [(1, 0), (2, 1)])
+        self.assertEqual(index.get("t3"), [])
+        self.assertEqual(index.height, 3)
+        with self.assertRaises(ValueError):
+            index.add_block(make_chain()[1])
+
+    def test_address_index_pages(self):
+        index = ChainIndex(address_keys)
+        index.update(make_chain())
+        self.assertEqual(index.get("a"), [(1, 0), (2, 0), (2, 1)])
+        self.assertEqual(index.get("b"), [(2, 0), (2, 2)])
+        self.assertEqual(index.get_page("a", since_block=2), [(2, 0), (2, 1)])
+        self.assertEqual(index.get_page("a", limit=2), [(1, 0), (2, 0)])
+        self.assertEqual(index.get_page("a", since_block=2, offset=1, limit=5), [(2, 1)])
+        self.assertEqual(index.get_page("a", since_block=3), [])
+
+    def test_persisted_index_reloaded(self):
+        with tempfile.TemporaryDirectory() as path:
+            file_path = os.path.join(path, "tokens.idx")
+            index = ChainIndex(token_keys, file_path)
+            index.update(make_chain())
+            index.close()
+            # Écriture interrompue : la fin du journal est incomplète
+            with open(file_path, "ab") as index_file:
+                index_file.write(b"\x00\x00\x00")
+            reloaded = ChainIndex(token_keys, file_path)
+            self.assertEqual(reloaded.entries, index.entries)
+            self.assertEqual(reloaded.height, 3)
+            reloaded.rebuild(make_chain()[:2])
+            self.assertEqual(reloaded.get("t1"), [(1, 0)])
+            reloaded.close()
+
+    def test_manager_history_uses_index(self):
+        manager = BlockchainManager(initial_supply=100, transaction_threshold=10)
+        origin = manager.wallet_manager.get_wallet("wallet_creator")
+        token = sorted(origin.available_tokens)[0]
+        manager.transfer_token(token, "wallet_creator", "wallet_JJ")
+        manager.commit_pending_transactions()
+        self.assertEqual(manager.token_index.get(token), [(1, 0), (2, 0)])
+        history = manager.get_token_history(token)
+        self.assertEqual([e["action"] for e in history], ["creation", "transfer"])
+        self.assertEqual(history[1]["block_hash"], manager.chain[2].hash)
+
+    def test_manager_wallet_history(self):
+        manager = BlockchainManager(initial_supply=100, transaction_threshold=10)
+        origin = manager.wallet_manager.get_wallet("wallet_creator")
+        for token in sorted(origin.available_tokens)[:3]:
+            manager.transfer_token(token, "wallet_creator", "wallet_JJ")
+        manager.commit_pending_transactions()
+        history = manager.get_wallet_history("wallet_creator", limit=1000)
+        # Création des tokens, 3 transferts par lot initiaux et 3 transferts
+        self.assertEqual(len(history), 7)
+        self.assertEqual(history[0]["action"], "token_creation")
+        self.assertEqual(history[0]["token_count"], len(manager.token_manager.tokens))
+        recent = manager.get_wallet_history("wallet_creator", since_block=2, limit=2)
+        self.assertEqual([(e["block_index"], e["tx_position"]) for e in recent], [(2, 0), (2, 1)])
+        following = manager.get_wallet_history("wallet_creator", since_block=2, limit=2, offset=2)
+        self.assertEqual([(e["block_index"], e["tx_position"]) for e in following], [(2, 2)])
+        self.assertEqual(following[0]["to"], "wallet_JJ")
+        jj = manager.get_wallet_history("wallet_JJ")
+        self.assertEqual([e["action"] for e in jj].count("stake"), 1)
+
+    def test_manager_index_persisted_with_store(self):
+        with tempfile.TemporaryDirectory() as path:
+            manager = BlockchainManager(initial_supply=100, transaction_threshold=10, store=BlockStore(path))
+            token = sorted(manager.wallet_manager.get_wallet("wallet_creator").available_tokens)[0]
+            expected = manager.get_token_history(token)
+            manager.store.close()
+            manager.token_index.close()
+            manager.address_index.close()
+            self.assertTrue(os.path.exists(os.path.join(path, "tokens.idx")))
+            reopened = BlockchainManager(initial_supply=100, transaction_threshold=10, store=BlockStore(path))
+            self.assertEqual(reopened.token_index.height, len(reopened.chain))
+            self.assertEqual(reopened.get_token_history(token), expected)
+            self.assertEqual(reopened.address_index.height, len(reopened.chain))
+            self.assertTrue(reopened.get_wallet_history("wallet_Lina"))
+            reopened.store.close()
+            reopened.token_index.close()
+            reopened.address_index.close()
+
+    def test_index_matches_chain_tip(self):
+        chain = make_chain()
+        index = ChainIndex(token_keys)
+        index.update(chain)
+        self.assertTrue(index.matches(chain))
+        self.assertFalse(index.matches(chain[:2]))
+        # Même hauteur, mais dernier bloc remplacé
+        other = chain[:2] + [Block(2, chain[1].hash, [{"action": "stake", "token_id": "t2", "address": "a"}], 1002.0)]
+        self.assertFalse(index.matches(other))
+        index.rebuild(other)
+        self.assertEqual(index.get("t1"), [(1, 0)])
+
+    def test_manager_index_synced_and_rebuilt_after_crash(self):
+        with tempfile.TemporaryDirectory() as path:
+            store = BlockStore(path, sync_every=16)
+            manager = BlockchainManager(initial_supply=100, transaction_threshold=10, store=store)
+            # L'index est écrit sur disque à chaque synchronisation du stockage
+            with patch("os.fsync", side_effect=os.fsync) as fsync:
+                store.flush()
+            synced_files = [call.args[0] for call in fsync.call_args_list]
+            self.assertIn(manager.token_index._log.fileno(), synced_files)
+            self.assertIn(manager.address_index._log.fileno(), synced_files)
+            synced = {name: os.path.getsize(os.path.join(path, name))
+                      for name in os.listdir(path) if not name.endswith(".idx") or name == "blocks.idx"}
+            token = sorted(manager.wallet_manager.get_wallet("wallet_creator").available_tokens)[0]
+            manager.transfer_token(token, "wallet_creator", "wallet_Lina")
+            manager.commit_pending_transactions()
+            manager.token_index.close()
+            manager.address_index.close()
+            store.close()
+            # Arrêt brutal : le bloc non synchronisé est perdu, puis un autre bloc prend sa place
+            for name, size in synced.items():
+                os.truncate(os.path.join(path, name), size)
+            store = BlockStore(path)
+            blockchain = Blockchain(store=store)
+            blockchain.add_transaction({"action": "stake", "token_id": token, "address": "wallet_creator"})
+            blockchain.add_block("Alice", "PBFT")
+            store.close()
+            reopened = BlockchainManager(initial_supply=100, transaction_threshold=10, store=BlockStore(path))
+            self.assertEqual(reopened.token_index.tip_hash, reopened.chain[-1].hash)
+            self.assertEqual([event["action"] for event in reopened.get_token_history(token)], ["creation", "stake"])
+            reopened.store.close()
+            reopened.token_index.close()
+            reopened.address_index.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import tempfile
+import time
+import unittest
+import uuid
+import zlib
+from src.block import Block
+from src.block_pow import BlockPow
+from src.block_store import BlockStore
+from src.compression import compress_body, decompress_body
+from src.encoding import encode_body
+
+def transfers(count):
+    return [{"action": "transfer", "token_id": str(uuid.uuid4()), "from": "wallet_creator",
+             "to": "wallet_JJ", "timestamp": time.time()} for _ in range(count)]
+
+class TestCompression(unittest.TestCase):
+    def test_roundtrip(self):
+        body = encode_body(transfers(20))
+        self.assertEqual(decompress_body(compress_body(body)), body)
+
+    def test_dictionary_helps_small_bodies(self):
+        body = encode_body(transfers(2))
+        self.assertLess(len(compress_body(body)), len(zlib.compress(body)))
+
+    def test_unknown_dictionary_rejected(self):
+        data = bytearray(compress_body(encode_body(transfers(1))))
+        data[0] = 255
+        with self.assertRaises(ValueError):
+            decompress_body(bytes(data))
+
+    def test_compressed_block_roundtrip(self):
+        block = Block(1, "prev", transfers(10), 1000.0, "Alice", "sig")
+        data = block.to_bytes(compress=True)
+        self.assertLess(len(data), len(block.to_bytes()))
+        restored = Block.from_bytes(data)
+        self.assertEqual(restored.hash, block.hash)
+        self.assertEqual(restored.transactions, block.transactions)
+        pow_block = BlockPow(1, "prev", transfers(5), difficulty=1, timestamp=1000.0)
+        self.assertEqual(BlockPow.from_bytes(pow_block.to_bytes(compress=True)).hash, pow_block.hash)
+
+    def test_store_reads_compressed_and_plain_records(self):
+        with tempfile.TemporaryDirectory() as path:
+            store = BlockStore(path, compress=False)
+            store.append(Block(0, "0", ["Genesis Block"], 1000.0))
+            store.close()
+            store = BlockStore(path)
+            store.append(Block(1, store[0].hash, transfers(10), 1001.0))
+            store.close()
+            store = BlockStore(path)
+            self.assertEqual(store[0].transactions, ["Genesis Block"])
+            self.assertEqual(len(store[1].transactions), 10)
+            store.close()
+
+if __name__ == '__main__':
+    unittest.main()
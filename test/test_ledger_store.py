@@ -0,0 +1,135 @@
+import os
+import tempfile
+import unittest
+from src.block_store import BlockStore
+from src.blockchain_manager import BlockchainManager
+from src.ledger_store import LedgerStore
+
+class TestLedgerStore(unittest.TestCase):
+    def setUp(self):
+        self.ledger = LedgerStore()
+        self.manager = BlockchainManager(initial_supply=100, transaction_threshold=10, ledger=self.ledger)
+        self.origin = self.manager.wallet_manager.get_wallet("wallet_creator")
+
+    def tearDown(self):
+        self.ledger.close()
+
+    def test_blocks_recorded(self):
+        self.assertEqual(len(self.ledger), len(self.manager.chain))
+        header = self.ledger.get_block(1)
+        self.assertEqual(header["hash"], self.manager.chain[1].hash)
+        self.assertEqual(header["merkle_root"], self.manager.chain[1].merkle_root)
+
+    def test_token_history_matches_chain_scan(self):
+        token = sorted(self.origin.available_tokens)[0]
+        self.manager.transfer_token(token, "wallet_creator", "wallet_JJ")
+        self.manager.stake_token(token, "wallet_JJ")
+        self.manager.commit_pending_transactions()
+        from_ledger = self.manager.get_token_history(token, with_proofs=True)
+        self.manager.ledger = None
+        from_scan = self.manager.get_token_history(token, with_proofs=True)
+        self.assertEqual(from_ledger, from_scan)
+        self.assertEqual([e["action"] for e in from_ledger], ["creation", "transfer", "stake"])
+
+    def test_batch_history_matches_chain_scan(self):
+        tokens = sorted(self.origin.available_tokens)[:4]
+        self.manager.transfer_tokens(tokens, "wallet_creator", "wallet_JJ")
+        self.manager.stake_tokens(tokens[:2], "wallet_JJ")
+        self.manager.commit_pending_transactions()
+        from_ledger = self.manager.get_token_history(tokens[0], with_proofs=True)
+        self.manager.ledger = None
+        self.assertEqual(from_ledger, self.manager.get_token_history(tokens[0], with_proofs=True))
+        self.assertEqual([e["action"] for e in from_ledger], ["creation", "transfer_batch", "stake_batch"])
+        self.assertEqual(self.ledger.get_token_owner(tokens[1])["staked"], 1)
+        self.assertEqual(self.ledger.get_token_owner(tokens[3]), {"token_id": tokens[3], "owner": "wallet_JJ", "staked": 0})
+
+    def test_wallet_state_and_transactions(self):
+        token = sorted(self.origin.available_tokens)[0]
+        self.manager.transfer_token(token, "wallet_creator", "wallet_Lina")
+        self.manager.commit_pending_transactions()
+        lina = self.manager.wallet_manager.get_wallet("wallet_Lina")
+        state = self.ledger.get_wallet_state("wallet_Lina")
+        self.assertEqual((state["available"], state["staked"]), (lina.balance(), lina.staked_balance()))
+        self.assertEqual(self.ledger.get_token_owner(token), {"token_id": token, "owner": "wallet_Lina", "staked": 0})
+        actions = [row["action"] for row in self.manager.get_wallet_transactions("wallet_Lina")]
+        # 15 tokens reçus par lot (une ligne par token) et 1 stake à l'initialisation, puis le transfert ci-dessus
+        self.assertEqual(actions.count("transfer_batch"), 15)
+        self.assertEqual(actions.count("transfer"), 1)
+        self.assertEqual(actions.count("stake"), 1)
+
+    def test_failed_consensus_not_recorded(self):
+        height = len(self.ledger)
+        self.manager.manual_votes = {v: False for v in self.manager.validators}
+        token = sorted(self.origin.available_tokens)[0]
+        self.manager.transfer_token(token, "wallet_creator", "wallet_JJ")
+        self.manager.commit_pending_transactions()
+        self.assertEqual(len(self.ledger), height)
+        self.assertEqual(len(self.ledger.get_token_history(token)), 1)
+
+    def test_persisted_file(self):
+        with tempfile.TemporaryDirectory() as path:
+            db_path = os.path.join(path, "ledger.db")
+            ledger = LedgerStore(db_path)
+            BlockchainManager(initial_supply=100, transaction_threshold=10, ledger=ledger)
+            ledger.close()
+            reopened = LedgerStore(db_path)
+            self.assertEqual(len(reopened), 2)
+            reopened.close()
+
+    def test_catch_up_records_wallet_state(self):
+        # Un registre ajouté à une chaîne rouverte rattrape les blocs avec l'état des wallets
+        with tempfile.TemporaryDirectory() as path:
+            store = BlockStore(os.path.join(path, "chain"))
+            manager = BlockchainManager(initial_supply=100, transaction_threshold=10, store=store)
+            origin = manager.wallet_manager.get_wallet("wallet_creator")
+            token = sorted(origin.available_tokens)[0]
+            manager.transfer_token(token, "wallet_creator", "wallet_Lina")
+            manager.commit_pending_transactions()
+            store.close()
+            store = BlockStore(os.path.join(path, "chain"))
+            ledger = LedgerStore()
+            reopened = BlockchainManager(initial_supply=100, transaction_threshold=10, store=store, ledger=ledger)
+            lina = reopened.wallet_manager.get_wallet("wallet_Lina")
+            state = ledger.get_wallet_state("wallet_Lina")
+            self.assertEqual((state["available"], state["staked"]), (lina.balance(), lina.staked_balance()))
+            self.assertEqual(ledger.get_token_owner(token), {"token_id": token, "owner": "wallet_Lina", "staked": 0})
+            ledger.close()
+            store.close()
+
+    def test_ledger_ahead_of_store_is_rolled_back(self):
+        # Arrêt brutal : le registre a enregistré des blocs dont le stockage n'a pas encore fait le fsync
+        with tempfile.TemporaryDirectory() as path:
+            chain_path = os.path.join(path, "chain")
+            store = BlockStore(chain_path, sync_every=16)
+            ledger = LedgerStore(os.path.join(path, "ledger.db"))
+            manager = BlockchainManager(initial_supply=100, transaction_threshold=10, store=store, ledger=ledger)
+            store.flush()
+            synced = {name: os.path.getsize(os.path.join(chain_path, name)) for name in os.listdir(chain_path)}
+            height = len(store)
+            token = sorted(manager.wallet_manager.get_wallet("wallet_creator").available_tokens)[0]
+            manager.transfer_token(token, "wallet_creator", "wallet_Lina")
+            manager.commit_pending_transactions()
+            self.assertEqual(len(ledger), height + 1)
+            store.close()
+            ledger.close()
+            # Seule la partie synchronisée du stockage survit
+            for name, size in synced.items():
+                os.truncate(os.path.join(chain_path, name), size)
+            store = BlockStore(chain_path)
+            ledger = LedgerStore(os.path.join(path, "ledger.db"))
+            reopened = BlockchainManager(initial_supply=100, transaction_threshold=10, store=store, ledger=ledger)
+            self.assertEqual(len(ledger), height)
+            self.assertEqual(ledger.get_token_history(token)[-1]["action"], "creation")
+            self.assertEqual(ledger.get_token_owner(token)["owner"], "wallet_creator")
+            origin = reopened.wallet_manager.get_wallet("wallet_creator")
+            self.assertEqual(ledger.get_wallet_state("wallet_creator")["available"], origin.balance())
+            # La chaîne repart de la fin du stockage sans conflit dans le registre
+            reopened.transfer_token(token, "wallet_creator", "wallet_JJ")
+            reopened.commit_pending_transactions()
+            self.assertEqual(len(ledger), height + 1)
+            self.assertEqual(ledger.get_token_owner(token)["owner"], "wallet_JJ")
+            ledger.close()
+            store.close()
+
+if __name__ == '__main__':
+    unittest.main()
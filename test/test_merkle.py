@@ -0,0 +1,35 @@
+import hashlib
+import unittest
+from src.merkle import hash_leaf, hash_node, merkle_root, merkle_proof, verify_proof
+
+class TestMerkle(unittest.TestCase):
+    def setUp(self):
+        self.leaves = [hash_leaf(f"tx{i}".encode()) for i in range(5)]
+
+    def test_root_of_empty_and_single(self):
+        self.assertEqual(merkle_root([]), hashlib.sha256(b"").digest())
+        self.assertEqual(merkle_root(self.leaves[:1]), self.leaves[0])
+
+    def test_root_of_two_leaves(self):
+        self.assertEqual(merkle_root(self.leaves[:2]), hash_node(self.leaves[0], self.leaves[1]))
+
+    def test_proofs_for_every_position(self):
+        root = merkle_root(self.leaves)
+        for position, leaf in enumerate(self.leaves):
+            proof = merkle_proof(self.leaves, position)
+            self.assertTrue(verify_proof(leaf, proof, root))
+            self.assertTrue(verify_proof(leaf, proof, root.hex()))
+
+    def test_invalid_proof(self):
+        root = merkle_root(self.leaves)
+        proof = merkle_proof(self.leaves, 2)
+        self.assertFalse(verify_proof(self.leaves[3], proof, root))
+        with self.assertRaises(ValueError):
+            merkle_proof(self.leaves, 5)
+
+    def test_odd_leaf_is_not_duplicated(self):
+        # Dupliquer la dernière feuille ne doit pas donner la même racine
+        self.assertNotEqual(merkle_root(self.leaves), merkle_root(self.leaves + self.leaves[-1:]))
+
+if __name__ == '__main__':
+    unittest.main()
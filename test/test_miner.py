@@ -0,0 +1,77 @@
+import hashlib
+import threading
+import time
+import unittest
+from src.block_pow import BlockPow
+from src.blockchain_pow import BlockchainPow
+from src.encoding import encode_nonce
+from src.miner import MiningTemplate, mine, mine_parallel, search_range, difficulty_to_target, retarget, MAX_TARGET
+
+class TestMiner(unittest.TestCase):
+    def setUp(self):
+        self.prefix = b"en-tete de test"
+
+    def test_mine_finds_first_valid_nonce(self):
+        nonce, hash_attempt, attempts = mine(self.prefix, difficulty_to_target(2))
+        self.assertEqual(attempts, nonce + 1)
+        self.assertTrue(hash_attempt.startswith("00"))
+        self.assertEqual(hash_attempt, hashlib.sha256(self.prefix + encode_nonce(nonce)).hexdigest())
+        # Aucun nonce plus petit n'est valide
+        self.assertIsNone(search_range(self.prefix, 0, nonce, difficulty_to_target(2)))
+
+    def test_parallel_matches_single_core(self):
+        expected = mine(self.prefix, difficulty_to_target(3))
+        self.assertEqual(mine_parallel(self.prefix, difficulty_to_target(3), workers=2, chunk_size=500)[:2], expected[:2])
+
+    def test_template_midstate(self):
+        template = MiningTemplate(self.prefix)
+        for nonce in (0, 1, 2 ** 40):
+            expected = hashlib.sha256(self.prefix + encode_nonce(nonce)).hexdigest()
+            self.assertEqual(template.hash_nonce(nonce), expected)
+
+    def test_odd_difficulty(self):
+        nonce, hash_attempt, _ = mine(self.prefix, difficulty_to_target(3))
+        self.assertTrue(hash_attempt.startswith("000"))
+        self.assertIsNone(search_range(self.prefix, 0, nonce, difficulty_to_target(3)))
+
+    def test_parallel_block_is_identical(self):
+        t = 1234567890.0
+        single = BlockPow(1, "abc123", ["Transaction 1"], 2, t)
+        parallel = BlockPow(1, "abc123", ["Transaction 1"], 2, t, workers=2)
+        self.assertEqual(parallel.nonce, single.nonce)
+        self.assertEqual(parallel.hash, single.hash)
+        self.assertGreater(single.hashrate, 0)
+
+    def test_target_matches_hex_difficulty(self):
+        for difficulty in range(1, 5):
+            target = difficulty_to_target(difficulty)
+            self.assertLess(int("0" * difficulty + "f" * (64 - difficulty), 16), target)
+            self.assertGreaterEqual(int("0" * (difficulty - 1) + "1" + "0" * (64 - difficulty), 16), target)
+
+    def test_retarget(self):
+        target = difficulty_to_target(3)
+        # Blocs deux fois trop rapides : cible divisée par deux
+        self.assertEqual(retarget(target, 50, 100), target // 2)
+        # Ajustement borné à un facteur 4
+        self.assertEqual(retarget(target, 0, 100), target // 4)
+        self.assertEqual(retarget(target, 1000, 100), target * 4)
+        self.assertEqual(retarget(MAX_TARGET, 1000, 100), MAX_TARGET)
+
+    def test_interrupt(self):
+        interrupt = threading.Event()
+        interrupt.set()
+        self.assertIsNone(mine(self.prefix, 1, interrupt=interrupt))
+        # Interruption du minage parallèle pendant la recherche
+        interrupt = threading.Event()
+        threading.Timer(0.1, interrupt.set).start()
+        started = time.perf_counter()
+        self.assertIsNone(mine_parallel(self.prefix, 1, workers=2, interrupt=interrupt))
+        self.assertLess(time.perf_counter() - started, 5)
+
+    def test_parallel_blockchain_is_valid(self):
+        blockchain = BlockchainPow(difficulty=2, workers=2)
+        blockchain.add_block(["Transaction 1"])
+        self.assertTrue(blockchain.is_chain_valid())
+
+if __name__ == '__main__':
+    unittest.main()
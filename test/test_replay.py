@@ -0,0 +1,65 @@
+import tempfile
+import unittest
+from src.block import Block
+from src.block_store import BlockStore
+from src.blockchain_manager import BlockchainManager
+from src.replay import ReplayEngine, iter_blocks, iter_transactions
+
+class TestReplay(unittest.TestCase):
+    def setUp(self):
+        self.manager = BlockchainManager(initial_supply=100, transaction_threshold=10)
+        self.origin = self.manager.wallet_manager.get_wallet("wallet_creator")
+
+    def test_replay_matches_live_wallets(self):
+        tokens = sorted(self.origin.available_tokens)[:3]
+        for token in tokens:
+            self.manager.transfer_token(token, "wallet_creator", "wallet_JJ")
+        self.manager.stake_token(tokens[0], "wallet_JJ")
+        self.manager.unstake_token(tokens[0], "wallet_JJ")
+        self.manager.commit_pending_transactions()
+        engine = ReplayEngine().run(self.manager.chain)
+        self.assertEqual(engine.verify(self.manager.wallet_manager), [])
+        self.assertEqual(engine.stakes, self.manager.stakes)
+        self.assertEqual(engine.height, self.manager.get_last_block().index)
+        self.assertEqual(self.manager.verify_wallets(), [])
+
+    def test_out_of_band_change_detected(self):
+        token = sorted(self.origin.available_tokens)[0]
+        # Modification d'un wallet sans transaction dans la chaîne
+        self.origin.withdraw_token(token)
+        self.manager.wallet_manager.get_wallet("wallet_Lina").deposit_token(token)
+        discrepancies = self.manager.verify_wallets()
+        self.assertEqual({(d["address"], d["field"]) for d in discrepancies},
+                         {("wallet_creator", "available"), ("wallet_Lina", "available")})
+        lina = next(d for d in discrepancies if d["address"] == "wallet_Lina")
+        self.assertEqual((lina["live"] - lina["chain"], lina["difference"]), (1, 1))
+
+    def test_strict_rejects_unknown_token(self):
+        blocks = [
+            Block(0, "0", ["Genesis Block"], 1000.0),
+            Block(1, "x", [{"action": "transfer", "token_id": "t1", "from": "a", "to": "b"}], 1001.0)
+        ]
+        with self.assertRaises(ValueError):
+            ReplayEngine().run(blocks)
+        lenient = ReplayEngine(strict=False).run(blocks)
+        self.assertEqual(lenient.wallet_manager.get_wallet("b").available_tokens, {"t1"})
+
+    def test_streams_from_block_store(self):
+        with tempfile.TemporaryDirectory() as path:
+            store = BlockStore(path)
+            store.append(Block(0, "0", ["Genesis Block"], 1000.0))
+            store.append(Block(1, store[0].hash, [{"action": "token_creation", "owner": "a",
+                                                   "tokens": [{"identifier": f"t{i}"} for i in range(50)]}], 1001.0))
+            for index in range(2, 12):
+                transfers = [{"action": "transfer", "token_id": f"t{(index - 2) * 5 + i}", "from": "a", "to": "b"}
+                             for i in range(5)]
+                store.append(Block(index, store[-1].hash, transfers, 1000.0 + index))
+            self.assertEqual(sum(1 for _ in iter_transactions(iter_blocks(store))), 51)
+            engine = ReplayEngine().run(store)
+            self.assertEqual(engine.wallet_manager.get_wallet("b").balance(), 50)
+            self.assertEqual(engine.wallet_manager.get_wallet("a").balance(), 0)
+            self.assertEqual(engine.transaction_count, 51)
+            store.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import os
+import tempfile
+import unittest
+from src.block_store import BlockStore
+from src.blockchain_manager import BlockchainManager
+from src.snapshot import SnapshotStore, encode_state, decode_state
+
+def wallet_state(manager):
+    return {address: (set(w.available_tokens), set(w.staked_tokens))
+            for address, w in manager.wallet_manager.wallets.items()}
+
+class TestSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.blocks_path = os.path.join(self.tmp.name, "blocks")
+        self.snapshots_path = os.path.join(self.tmp.name, "snapshots")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def open_manager(self, every=2):
+        return BlockchainManager(initial_supply=100, transaction_threshold=2,
+                                 store=BlockStore(self.blocks_path),
+                                 snapshots=SnapshotStore(self.snapshots_path, every=every))
+
+    def make_activity(self, manager, transfers):
+        origin = manager.wallet_manager.get_wallet("wallet_creator")
+        for token in sorted(origin.available_tokens)[:transfers]:
+            manager.transfer_token(token, "wallet_creator", "wallet_Lina")
+        lina = manager.wallet_manager.get_wallet("wallet_Lina")
+        manager.stake_token(sorted(lina.available_tokens)[0], "wallet_Lina")
+        manager.commit_pending_transactions()
+
+    def test_encode_decode_roundtrip(self):
+        manager = BlockchainManager(initial_supply=100, transaction_threshold=10)
+        last = manager.get_last_block()
+        state = decode_state(encode_state(last.index, last.hash, manager.token_manager,
+                                          manager.wallet_manager, manager.validators, manager.stakes))
+        self.assertEqual(state["height"], last.index)
+        self.assertEqual(state["block_hash"], last.hash)
+        self.assertEqual([t.to_dict() for t in state["tokens"]],
+                         [t.to_dict() for t in manager.token_manager.get_all_tokens()])
+        self.assertEqual(state["wallets"], wallet_state(manager))
+        self.assertEqual(state["stakes"], manager.stakes)
+
+    def test_fungible_amounts_roundtrip(self):
+        manager = BlockchainManager(initial_supply=100, transaction_threshold=10, fungible=True)
+        last = manager.get_last_block()
+        state = decode_state(encode_state(last.index, last.hash, manager.token_manager,
+                                          manager.wallet_manager, manager.validators, manager.stakes))
+        self.assertEqual(state["amounts"], {address: (w.available_amount, w.staked_amount)
+                                            for address, w in manager.wallet_manager.wallets.items()})
+        self.assertEqual(state["amounts"]["wallet_Lina"], (14, 1))
+
+    def test_restart_loads_snapshot_and_replays_tail(self):
+        manager = self.open_manager(every=2)
+        self.make_activity(manager, transfers=4)
+        snapshots = SnapshotStore(self.snapshots_path)
+        self.assertTrue(snapshots.heights())
+        expected_wallets, expected_stakes = wallet_state(manager), dict(manager.stakes)
+        manager.store.close()
+
+        reopened = self.open_manager(every=2)
+        self.assertEqual(wallet_state(reopened), expected_wallets)
+        self.assertEqual(reopened.stakes, expected_stakes)
+        self.assertEqual(len(reopened.token_manager.tokens), len(manager.token_manager.tokens))
+        # Seuls les blocs postérieurs au dernier snapshot sont rejoués
+        self.assertEqual(reopened.restore_state(), snapshots.heights()[0] + 1)
+        reopened.store.close()
+
+    def test_restart_without_snapshot_replays_chain(self):
+        manager = BlockchainManager(initial_supply=100, transaction_threshold=2, store=BlockStore(self.blocks_path))
+        self.make_activity(manager, transfers=3)
+        expected = wallet_state(manager)
+        manager.store.close()
+        reopened = BlockchainManager(initial_supply=100, transaction_threshold=2, store=BlockStore(self.blocks_path))
+        self.assertEqual(wallet_state(reopened), expected)
+        reopened.store.close()
+
+    def test_snapshot_for_other_chain_ignored(self):
+        manager = self.open_manager(every=1)
+        manager.store.close()
+        # Une autre chaîne dans un nouveau stockage, avec les snapshots de la première
+        other_path = os.path.join(self.tmp.name, "other")
+        other = BlockchainManager(initial_supply=100, store=BlockStore(other_path))
+        other.store.close()
+        snapshots = SnapshotStore(self.snapshots_path, every=1)
+        reopened = BlockchainManager(initial_supply=100, store=BlockStore(other_path), snapshots=snapshots)
+        self.assertEqual(reopened.restore_state(), 1)
+        reopened.store.close()
+
+    def test_keeps_latest_snapshots(self):
+        manager = self.open_manager(every=1)
+        self.make_activity(manager, transfers=6)
+        heights = SnapshotStore(self.snapshots_path).heights()
+        self.assertEqual(len(heights), 2)
+        self.assertEqual(heights[0], manager.get_last_block().index)
+        manager.store.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -36,3 +36,55 @@ class TestTokenManager(unittest.TestCase):
         self.assertIsNone(self.token_manager.get_token("nonexistent_id"))
 
 
+
+    def test_ordered_registry(self):
+        tokens = self.token_manager.create_initial_tokens(count=10)
+        self.assertIs(self.token_manager.get_token_at(3), tokens[3])
+        self.assertIsNone(self.token_manager.get_token_at(10))
+        self.assertEqual(self.token_manager.get_position(tokens[7].identifier), 7)
+        self.assertEqual(self.token_manager.get_tokens(offset=2, limit=3), tokens[2:5])
+        # Réenregistrer un token connu ne change pas sa position
+        self.token_manager.register_token(Token.from_dict(tokens[1].to_dict()))
+        self.assertEqual(self.token_manager.get_position(tokens[1].identifier), 1)
+        self.assertEqual(len(self.token_manager.tokens), 10)
+
+    def test_bulk_mint(self):
+        self.token_manager.create_initial_tokens(count=10)
+        minted = self.token_manager.bulk_mint(500, seed=3)
+        # L'offre est limitée par max_tokens
+        self.assertEqual(len(minted), 90)
+        self.assertEqual(len(self.token_manager.tokens), 100)
+        identifier = minted.identifiers[5]
+        self.assertEqual(self.token_manager.get_position(identifier), 15)
+        token = self.token_manager.get_token(identifier)
+        self.assertEqual(token.hash, token.calculate_hash())
+        self.assertEqual(self.token_manager.registry.number(identifier), 15)
+        self.assertEqual(self.token_manager.get_tokens(offset=14, limit=2)[1].identifier, identifier)
+        self.assertEqual(len(self.token_manager.bulk_mint(10)), 0)
+
+    def test_positions_follow_registry_numbers(self):
+        # Un token connu du registre (déposé dans un wallet) mais hors de la table n'a pas de position
+        self.token_manager.registry.intern("external")
+        minted = self.token_manager.bulk_mint(3, seed=1)
+        self.assertIsNone(self.token_manager.get_position("external"))
+        self.assertNotIn("external", self.token_manager.tokens)
+        self.assertEqual([self.token_manager.get_position(i) for i in minted.identifiers], [0, 1, 2])
+        # Rechargement dans un autre ordre : les numéros restent, les positions suivent la nouvelle table
+        self.token_manager.load_tokens(list(reversed(list(self.token_manager.table))))
+        self.assertEqual(self.token_manager.get_position(minted.identifiers[2]), 0)
+        self.assertEqual(self.token_manager.registry.number(minted.identifiers[2]), 3)
+
+    def test_bulk_mint_is_deterministic_with_seed(self):
+        other = TokenManager(max_tokens=100)
+        self.assertEqual(self.token_manager.bulk_mint(20, seed=9).identifiers, other.bulk_mint(20, seed=9).identifiers)
+
+    def test_all_tokens_view(self):
+        tokens = self.token_manager.create_initial_tokens(count=5)
+        view = self.token_manager.get_all_tokens()
+        self.assertEqual(len(view), 5)
+        self.assertIs(view[-1], tokens[-1])
+        self.assertEqual(view[1:3], tokens[1:3])
+        self.assertEqual(list(view), tokens)
+        # La vue suit le registre sans être recopiée
+        token = self.token_manager.create_token()
+        self.assertIs(view[5], token)
@@ -0,0 +1,131 @@
+import unittest
+from unittest.mock import patch
+from src.token_registry import TokenRegistry, TokenBitmap
+from src.token_manager import TokenManager
+from src.wallet_manager import WalletManager
+
+
+class TestTokenRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry = TokenRegistry()
+
+    def test_intern_is_dense_and_stable(self):
+        # Les numéros sont attribués dans l'ordre d'apparition et ne changent plus
+        self.assertEqual(self.registry.intern("a"), 0)
+        self.assertEqual(self.registry.intern("b"), 1)
+        self.assertEqual(self.registry.intern("a"), 0)
+        self.assertEqual(self.registry.identifier(1), "b")
+        self.assertIsNone(self.registry.number("c"))
+        self.assertEqual(len(self.registry), 2)
+
+    def test_bitmap_behaves_like_a_set(self):
+        bitmap = TokenBitmap(self.registry, ["a", "b", "c"])
+        bitmap.add("b")
+        self.assertEqual(len(bitmap), 3)
+        self.assertIn("c", bitmap)
+        self.assertNotIn("d", bitmap)
+        self.assertTrue(bitmap.discard("b"))
+        self.assertFalse(bitmap.discard("b"))
+        with self.assertRaises(KeyError):
+            bitmap.remove("b")
+        # Itération dans l'ordre des numéros, comparaison avec un ensemble
+        self.assertEqual(list(bitmap), ["a", "c"])
+        self.assertEqual(bitmap, {"a", "c"})
+        self.assertEqual({"a", "x"} & bitmap, {"a"})
+        self.assertEqual(bitmap ^ {"a"}, {"c"})
+        self.assertEqual(repr(TokenBitmap(self.registry)), "set()")
+
+    def test_bulk_operations_between_bitmaps(self):
+        # Union et différence entre ensembles du même registre, tranche par tranche
+        identifiers = [f"token{i}" for i in range(100)]
+        first = TokenBitmap(self.registry, identifiers[:60])
+        second = TokenBitmap(self.registry, identifiers[40:])
+        first.difference_update(second)
+        self.assertEqual(len(first), 40)
+        self.assertEqual(list(first), identifiers[:40])
+        first.update(second)
+        self.assertEqual(len(first), 100)
+        self.assertEqual(first, TokenBitmap(self.registry, identifiers))
+        copy = first.copy()
+        copy.clear()
+        self.assertEqual(len(copy), 0)
+        self.assertEqual(len(first), 100)
+
+    def test_first_and_last_follow_registration_order(self):
+        identifiers = [f"token{i}" for i in range(50)]
+        bitmap = TokenBitmap(self.registry, identifiers)
+        self.assertEqual(bitmap.first(3), identifiers[:3])
+        self.assertEqual(bitmap.last(3), identifiers[-3:])
+        # Les retraits en tête et en queue sont sautés
+        for token_id in identifiers[:20] + identifiers[45:]:
+            bitmap.discard(token_id)
+        bitmap.discard("token22")
+        self.assertEqual(bitmap.first(3), ["token20", "token21", "token23"])
+        self.assertEqual(bitmap.last(2), ["token43", "token44"])
+        self.assertEqual(bitmap.first(100), [t for t in identifiers[20:45] if t != "token22"])
+        bitmap.add("token0")
+        self.assertEqual(bitmap.first(1), ["token0"])
+        self.assertEqual(TokenBitmap(self.registry).first(5), [])
+
+    def test_sparse_sets_stay_small(self):
+        # Un seul token de numéro élevé ne coûte qu'une tranche de 2 octets, pas un bitmap de toute l'offre
+        for i in range(300_000):
+            self.registry.intern(f"token{i}")
+        bitmap = TokenBitmap(self.registry, ["token299999"])
+        self.assertEqual(bitmap.nbytes(), 2)
+        scattered = ["token3", "token70000", "token140000", "token210000", "token299999"]
+        bitmap.update(scattered)
+        self.assertEqual(bitmap.nbytes(), 10)
+        bitmap.difference_update(scattered)
+        self.assertEqual((len(bitmap), bitmap.nbytes(), bitmap.first(1)), (0, 0, []))
+
+    def test_first_and_last_skip_empty_chunks(self):
+        for i in range(300_000):
+            self.registry.intern(f"token{i}")
+        scattered = ["token5", "token70000", "token140000", "token210000", "token299999"]
+        bitmap = TokenBitmap(self.registry, scattered)
+        # Seules les tranches non vides sont parcourues, aucun octet des tranches vides n'est lu
+        with patch("src.token_registry._bitmap_members", side_effect=AssertionError):
+            self.assertEqual(bitmap.first(5), scattered)
+            self.assertEqual(bitmap.last(2), scattered[-2:])
+        # Dans une tranche dense (bitmap), les octets nuls laissés par les retraits sont sautés
+        dense = TokenBitmap(self.registry, [f"token{i}" for i in range(60_000)])
+        dense.difference_update([f"token{i}" for i in range(1, 40_000)])
+        dense.difference_update([f"token{i}" for i in range(50_000, 59_999)])
+        dense.add("token299999")
+        self.assertEqual(dense.first(3), ["token0", "token40000", "token40001"])
+        self.assertEqual(dense.last(3), ["token49999", "token59999", "token299999"])
+
+    def test_dense_chunks_switch_to_bitmaps(self):
+        identifiers = [f"token{i}" for i in range(10_000)]
+        bitmap = TokenBitmap(self.registry, identifiers)
+        # Au-delà de 4096 tokens, la tranche devient un bitmap de 8 Kio
+        self.assertEqual(bitmap.nbytes(), 8192)
+        self.assertEqual(bitmap.first(2), identifiers[:2])
+        self.assertEqual(bitmap.last(2), identifiers[-2:])
+        sparse = TokenBitmap(self.registry, identifiers[::1000])
+        self.assertEqual(sparse, TokenBitmap(self.registry, identifiers[::1000]))
+        # Opérations groupées entre une tranche bitmap et une tranche tableau
+        bitmap.difference_update(sparse)
+        self.assertEqual(len(bitmap), 9990)
+        self.assertNotIn("token1000", bitmap)
+        bitmap.update(sparse)
+        self.assertEqual(bitmap, TokenBitmap(self.registry, identifiers))
+        # Sous 2048 tokens, la tranche redevient un tableau trié
+        bitmap.difference_update(identifiers[:9000])
+        self.assertEqual(bitmap.nbytes(), 2000)
+        self.assertEqual(list(bitmap), identifiers[9000:])
+
+    def test_wallets_share_token_manager_numbering(self):
+        # Les wallets du gestionnaire utilisent les numéros attribués par le TokenManager
+        token_manager = TokenManager(max_tokens=5)
+        tokens = token_manager.create_initial_tokens(5)
+        wallet_manager = WalletManager(registry=token_manager.registry)
+        wallet = wallet_manager.create_wallet("alice")
+        wallet.deposit_token(tokens[3].identifier)
+        self.assertEqual(list(wallet.available_tokens.numbers()), [3])
+        self.assertEqual(len(token_manager.registry), 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+import uuid
+from src.token_ import Token
+from src.token_table import TokenTable, generate_identifiers, mint_tokens, token_hash
+
+
+class TestTokenTable(unittest.TestCase):
+    def test_hash_matches_token(self):
+        # Le hash calculé en bloc est celui de Token.calculate_hash
+        token = Token()
+        self.assertEqual(token_hash(token.identifier, token.created_at).hex(), token.hash)
+
+    def test_identifiers_are_uuid4_and_seedable(self):
+        identifiers = generate_identifiers(100)
+        self.assertEqual(len(set(identifiers)), 100)
+        for identifier in identifiers[:10]:
+            self.assertEqual(uuid.UUID(identifier).version, 4)
+            self.assertEqual(str(uuid.UUID(identifier)), identifier)
+        self.assertEqual(generate_identifiers(5, seed=42), generate_identifiers(5, seed=42))
+        self.assertNotEqual(generate_identifiers(5, seed=42), generate_identifiers(5, seed=43))
+
+    def test_mint_tokens_columns(self):
+        table = mint_tokens(10, created_at=1700000000.5, seed=1)
+        self.assertEqual(len(table), 10)
+        tokens = list(table)
+        for token in tokens:
+            self.assertEqual(token.hash, token.calculate_hash())
+        self.assertEqual(table.to_dicts(2, 4), [token.to_dict() for token in tokens[2:4]])
+
+    def test_columns_round_trip(self):
+        table = mint_tokens(10, created_at=1700000000.5, seed=1)
+        columns = table.to_columns()
+        self.assertEqual(columns["created_at"], 1700000000.5)
+        copy = TokenTable.from_columns(columns)
+        self.assertEqual(copy.identifiers, table.identifiers)
+        self.assertEqual(copy.hashes, table.hashes)
+        self.assertEqual(copy.created_at, table.created_at)
+        # Dates de création différentes : une valeur par token
+        table.created_at[3] = 1.0
+        self.assertEqual(TokenTable.from_columns(table.to_columns()).created_at, table.created_at)
+
+    def test_process_pool_gives_same_table(self):
+        sequential = mint_tokens(30, created_at=1.5, seed=7)
+        parallel = mint_tokens(30, created_at=1.5, seed=7, workers=2, batch_size=8)
+        self.assertEqual(parallel.identifiers, sequential.identifiers)
+        self.assertEqual(parallel.hashes, sequential.hashes)
+
+    def test_inconsistent_columns_rejected(self):
+        with self.assertRaises(ValueError):
+            TokenTable().extend(["a", "b"], [1.0, 2.0], bytes(32))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+import tempfile
+import unittest
+from unittest.mock import patch
+from src.block import Block
+from src.block_pow import BlockPow
+from src.block_store import BlockStore
+from src.blockchain import Blockchain
+from src.blockchain_pow import BlockchainPow
+from src.encoding import ENCODING_JSON
+from src.validation import _iter_tasks, find_first_invalid_block
+
+class TestParallelValidation(unittest.TestCase):
+    def setUp(self):
+        self.blockchain = Blockchain()
+        for i in range(20):
+            self.blockchain.add_transaction({"action": "transfer", "token_id": f"t{i}"})
+            self.blockchain.add_block("Alice", f"PBFT_Signature_{i}")
+
+    def test_valid_chain(self):
+        self.assertIsNone(find_first_invalid_block(self.blockchain.chain, workers=2, shard_size=3))
+        self.assertTrue(self.blockchain.is_chain_valid(workers=2))
+
+    def test_first_invalid_index(self):
+        self.blockchain.chain[12].transactions = ["Tampered Transaction"]
+        self.blockchain.chain[7].pbft_signature = "Forged"
+        self.assertEqual(find_first_invalid_block(self.blockchain.chain, workers=2, shard_size=3), 7)
+        self.assertFalse(self.blockchain.is_chain_valid(workers=2))
+
+    def test_parent_does_not_reencode_bodies(self):
+        # Les corps mis en cache sont réutilisés : le processus principal n'encode que les en-têtes
+        with patch("src.base_block.encode_body") as encode_body:
+            tasks = list(_iter_tasks(self.blockchain.chain, 3, False))
+        encode_body.assert_not_called()
+        self.assertEqual(sum(len(task[-1]) for task in tasks), 20)
+
+    def test_store_records_sent_as_stored(self):
+        with tempfile.TemporaryDirectory() as path:
+            store = BlockStore(path, cache_size=1)
+            blockchain = Blockchain(store=store)
+            for i in range(12):
+                blockchain.add_transaction({"action": "transfer", "token_id": f"t{i}"})
+                blockchain.add_block("Alice", f"PBFT_Signature_{i}")
+            # Aucun bloc n'est désérialisé : chaque tranche emporte aussi l'enregistrement du bloc qui la précède
+            with patch.object(Block, "from_bytes", autospec=True, side_effect=Block.from_bytes) as from_bytes:
+                tasks = list(_iter_tasks(store, 4, False))
+            from_bytes.assert_not_called()
+            self.assertEqual([[record for _, record in task[-1]] for task in tasks],
+                             [[store.read_record(i) for i in range(start - 1, start + 4)] for start in (1, 5, 9)])
+            self.assertIsNone(find_first_invalid_block(store, workers=2, shard_size=4))
+            self.assertTrue(blockchain.is_chain_valid(workers=2))
+            store.close()
+
+    def test_parent_does_not_decode_stored_chain(self):
+        for blockchain_cls, block_cls in ((Blockchain, Block), (BlockchainPow, BlockPow)):
+            with tempfile.TemporaryDirectory() as path:
+                store = BlockStore(path, block_cls=block_cls, cache_size=1)
+                if blockchain_cls is Blockchain:
+                    blockchain = Blockchain(store=store)
+                    for i in range(12):
+                        blockchain.add_transaction({"action": "transfer", "token_id": f"t{i}"})
+                        blockchain.add_block("Alice", f"PBFT_Signature_{i}")
+                else:
+                    blockchain = BlockchainPow(difficulty=1, block_interval=1, retarget_interval=3, store=store)
+                    for i in range(12):
+                        blockchain.add_block([f"Transaction {i}"])
+                # Calendrier des cibles lu dans les en-têtes, blocs décodés dans les processus du pool
+                with patch.object(block_cls, "from_bytes", autospec=True,
+                                  side_effect=block_cls.from_bytes) as from_bytes:
+                    self.assertTrue(blockchain.is_chain_valid(workers=2))
+                from_bytes.assert_not_called()
+                store.close()
+
+    def test_broken_link_at_shard_boundary(self):
+        # Le bloc 4 ouvre une tranche : son chaînage est vérifié grâce au hash transmis avec la tranche
+        block = self.blockchain.chain[4]
+        block.previous_hash = "0" * 64
+        block.hash = block.calculate_hash()
+        self.assertEqual(find_first_invalid_block(self.blockchain.chain, workers=2, shard_size=3), 4)
+
+    def test_legacy_json_chain(self):
+        legacy = Blockchain(encoding=ENCODING_JSON)
+        for i in range(5):
+            legacy.add_transaction(f"Transaction {i}")
+            legacy.add_block("Alice", f"PBFT_Signature_{i}")
+        self.assertTrue(legacy.is_chain_valid(workers=2))
+
+    def test_pow_chain(self):
+        blockchain = BlockchainPow(difficulty=2)
+        for i in range(6):
+            blockchain.add_block([f"Transaction {i}"])
+        self.assertTrue(blockchain.is_chain_valid(workers=2))
+        # Cible modifiée (et hash recalculé) : refusée par le calendrier des cibles
+        block = blockchain.chain[3]
+        block.target = block.target * 16
+        block.hash = block.calculate_hash()
+        self.assertEqual(blockchain.find_invalid_block(workers=2), 3)
+        self.assertFalse(blockchain.is_chain_valid(workers=2))
+
+if __name__ == '__main__':
+    unittest.main()
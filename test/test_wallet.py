@@ -79,5 +79,40 @@ class TestWallet(unittest.TestCase):
         self.assertIn("available: 1", representation)
         self.assertIn("staked: 1", representation)
 
+    def test_batch_operations_are_all_or_nothing(self):
+        self.wallet.deposit_tokens(["a", "b", "c"])
+        self.assertFalse(self.wallet.withdraw_tokens(["a", "x"]))
+        self.assertEqual(self.wallet.balance(), 3)
+        self.assertTrue(self.wallet.stake_tokens(["a", "b"]))
+        self.assertEqual(set(self.wallet.staked_tokens), {"a", "b"})
+        self.assertFalse(self.wallet.unstake_tokens(["a", "c"]))
+        self.assertTrue(self.wallet.unstake_tokens(["a"]))
+        self.assertTrue(self.wallet.withdraw_tokens(["a", "c"]))
+        self.assertEqual((self.wallet.balance(), self.wallet.staked_balance()), (0, 1))
+
+    def test_ordered_selection(self):
+        self.wallet.deposit_tokens(["a", "b", "c", "d"])
+        self.wallet.stake_token("b")
+        self.assertEqual(self.wallet.first(2), ["a", "c"])
+        self.assertEqual(self.wallet.last(1), ["d"])
+        self.assertEqual(self.wallet.first(5, staked=True), ["b"])
+        self.assertEqual(self.wallet.take(2), ["a", "c"])
+        self.assertEqual(self.wallet.pop_any(), "d")
+        with self.assertRaises(ValueError):
+            self.wallet.pop_any()
+        self.assertEqual(self.wallet.total_balance(), 1)
+
+    def test_fungible_amounts(self):
+        # Les unités fongibles s'ajoutent aux tokens identifiés dans les soldes
+        self.wallet.deposit_token(self.token1)
+        self.wallet.deposit_amount(10)
+        self.assertEqual(self.wallet.balance(), 11)
+        self.assertTrue(self.wallet.stake_amount(4))
+        self.assertFalse(self.wallet.withdraw_amount(7))
+        self.assertTrue(self.wallet.unstake_amount(1))
+        self.assertFalse(self.wallet.unstake_amount(4))
+        self.assertEqual((self.wallet.available_amount, self.wallet.staked_amount), (7, 3))
+        self.assertEqual(self.wallet.total_balance(), 11)
+
 if __name__ == "__main__":
     unittest.main()